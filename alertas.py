@@ -0,0 +1,365 @@
+# Alertas de mercado por e-mail. As assinaturas (e-mail, ticker, condições)
+# ficam em DIRETORIO_DADOS/alertas.json. A cada atualização do histórico
+# (aquecimento.py) e quando a página Mercado cadastra um alerta, `avaliar` lê
+# o estado incremental dos indicadores (indicadores_incrementais.py) e
+# enfileira um aviso para cada assinatura com condição disparada no último
+# candle.
+#
+# A entrega fica com uma thread de fundo, então a página só enfileira e nunca
+# espera o SMTP. A thread:
+# - junta os avisos do mesmo destinatário que chegam em até ESPERA_LOTE
+#   segundos num único e-mail;
+# - reusa a conexão SMTP entre lotes e a fecha depois de OCIOSO segundos parada;
+# - ignora um aviso igual (destinatário, ticker, candle e condições) a outro já
+#   na fila; depois da entrega a repetição é barrada pela chave gravada na
+#   assinatura ("entregue"), então a memória não cresce com o tempo;
+# - tenta de novo com espera exponencial quando o servidor falha.
+#
+# Servidor: variáveis IMPACTO_SMTP_HOST, IMPACTO_SMTP_PORTA e
+# IMPACTO_SMTP_SEGURANCA (starttls, ssl ou nenhuma), ou smtp_host, smtp_port e
+# smtp_security em st.secrets; credenciais em smtp_email e smtp_password.
+#
+# Avaliação manual de todas as assinaturas, esperando as entregas:
+#     python alertas.py
+#
+# Testes contra um servidor SMTP local: tests/test_alertas.py.
+
+import json
+import logging
+import math
+import os
+import queue
+import smtplib
+import threading
+import time
+from dataclasses import dataclass, field
+from email.message import EmailMessage
+
+import streamlit as st
+
+from historico import DIRETORIO_DADOS, gravar_atomico
+from indicadores_incrementais import IndicadoresIncrementais, sincronizar
+
+log = logging.getLogger(__name__)
+
+ARQUIVO_ASSINATURAS = DIRETORIO_DADOS / "alertas.json"
+LOTE = 50               # avisos por lote
+ESPERA_LOTE = 2.0       # segundos esperando mais avisos antes de enviar
+OCIOSO = 60.0           # segundos até fechar a conexão sem uso
+TENTATIVAS = 4
+ESPERA_INICIAL = 2.0    # segundos; dobra a cada nova tentativa
+
+# Mesmos limiares dos pontos de entrada da página Mercado.
+CONDICOES = {
+    "EWMA": ("Retorno acima da volatilidade EWMA", lambda v, close: v["Daily Returns"] * 100 > v["EWMA Volatility"]),
+    "CCI": ("CCI acima de 100", lambda v, close: v["CCI"] > 100),
+    "Estocástico": ("Estocástico acima de 80", lambda v, close: v["Estocástico"] > 80),
+    "Bandas de Bollinger": ("Fechamento acima da banda superior", lambda v, close: close > v["Bollinger High"]),
+    "RSI": ("RSI acima de 70", lambda v, close: v["RSI"] > 70),
+}
+
+
+@dataclass(frozen=True)
+class ConfigSMTP:
+    host: str = "smtp.gmail.com"
+    porta: int = 587
+    seguranca: str = "starttls"
+    usuario: str = ""
+    senha: str = ""
+    timeout: float = 20.0
+
+    @classmethod
+    def do_ambiente(cls) -> "ConfigSMTP":
+        try:
+            segredos = dict(st.secrets)
+        except FileNotFoundError:
+            segredos = {}
+        return cls(
+            host=os.environ.get("IMPACTO_SMTP_HOST", segredos.get("smtp_host", cls.host)),
+            porta=int(os.environ.get("IMPACTO_SMTP_PORTA", segredos.get("smtp_port", cls.porta))),
+            seguranca=os.environ.get("IMPACTO_SMTP_SEGURANCA", segredos.get("smtp_security", cls.seguranca)),
+            usuario=segredos.get("smtp_email", os.environ.get("SMTP_EMAIL", "")),
+            senha=segredos.get("smtp_password", os.environ.get("SMTP_PASSWORD", "")),
+        )
+
+    def conectar(self) -> smtplib.SMTP:
+        if self.seguranca == "ssl":
+            conexao = smtplib.SMTP_SSL(self.host, self.porta, timeout=self.timeout)
+        else:
+            conexao = smtplib.SMTP(self.host, self.porta, timeout=self.timeout)
+            if self.seguranca == "starttls":
+                conexao.starttls()
+        if self.usuario:
+            conexao.login(self.usuario, self.senha)
+        return conexao
+
+
+# ---------------------------------------------------------------------------
+# Avaliação das condições
+# ---------------------------------------------------------------------------
+
+@dataclass(frozen=True)
+class Aviso:
+    email: str
+    ticker: str
+    data: str                   # último candle avaliado (ISO)
+    disparadas: tuple           # nomes de CONDICOES disparadas
+    status: tuple               # (indicador, texto) de todas as condições
+
+    @property
+    def chave(self) -> str:
+        return "|".join((self.email, self.ticker, self.data) + self.disparadas)
+
+
+def status_condicoes(incrementais: IndicadoresIncrementais) -> dict[str, tuple[bool, str]]:
+    """Para cada condição: se disparou no último candle e o texto do status."""
+    if incrementais.ultima_data is None:
+        return {}
+    valores, close = incrementais.valores, incrementais.ultimo_candle[2]
+    status = {}
+    for nome, (descricao, teste) in CONDICOES.items():
+        try:
+            disparou = bool(teste(valores, close))
+        except KeyError:
+            disparou = False
+        status[nome] = (disparou, descricao if disparou else "Normal")
+    return status
+
+
+def _ler_assinaturas() -> list[dict]:
+    try:
+        return json.loads(ARQUIVO_ASSINATURAS.read_text())
+    except (FileNotFoundError, ValueError):
+        return []
+
+
+_trava_assinaturas = threading.Lock()
+
+
+def _gravar_assinaturas(assinaturas: list[dict]) -> None:
+    ARQUIVO_ASSINATURAS.parent.mkdir(parents=True, exist_ok=True)
+    gravar_atomico(ARQUIVO_ASSINATURAS, lambda caminho: caminho.write_text(json.dumps(assinaturas, ensure_ascii=False, indent=1)))
+
+
+def assinaturas(ticker: str | None = None) -> list[dict]:
+    return [a for a in _ler_assinaturas() if isinstance(a, dict) and (ticker is None or a.get("ticker") == ticker)]
+
+
+def assinar(email: str, ticker: str, condicoes) -> None:
+    """Cadastra (ou troca as condições de) um alerta; sem condições, cancela."""
+    condicoes = [c for c in CONDICOES if c in set(condicoes)]
+    with _trava_assinaturas:
+        todas, entregue = [], None
+        for assinatura in _ler_assinaturas():
+            if (assinatura["email"], assinatura["ticker"]) == (email, ticker):
+                entregue = assinatura.get("entregue")
+            else:
+                todas.append(assinatura)
+        if condicoes:
+            todas.append({"email": email, "ticker": ticker, "condicoes": condicoes, "entregue": entregue})
+        _gravar_assinaturas(todas)
+
+
+def _registrar_entrega(aviso: Aviso) -> None:
+    with _trava_assinaturas:
+        todas = _ler_assinaturas()
+        for assinatura in todas:
+            if (assinatura["email"], assinatura["ticker"]) == (aviso.email, aviso.ticker):
+                assinatura["entregue"] = aviso.chave
+        _gravar_assinaturas(todas)
+
+
+def avaliar(ticker: str, incrementais: IndicadoresIncrementais | None = None) -> int:
+    """Enfileira os avisos das assinaturas de `ticker`; devolve quantos entraram na fila."""
+    pendentes = assinaturas(ticker)
+    if not pendentes:
+        return 0
+    incrementais = incrementais or sincronizar(ticker)
+    status = status_condicoes(incrementais)
+    if not status:
+        return 0
+    textos = tuple((nome, texto) for nome, (_, texto) in status.items())
+    enfileirados = 0
+    for assinatura in pendentes:
+        disparadas = tuple(c for c in assinatura["condicoes"] if status.get(c, (False,))[0])
+        if not disparadas:
+            continue
+        aviso = Aviso(assinatura["email"], ticker, incrementais.ultima_data.date().isoformat(), disparadas, textos)
+        if aviso.chave != assinatura.get("entregue"):
+            enfileirados += servico().enfileirar(aviso)
+    return enfileirados
+
+
+def avaliar_assinaturas() -> int:
+    """Avalia todos os tickers com assinatura (chamado a cada atualização do histórico).
+
+    Um ticker com erro (histórico indisponível, assinatura malformada) é
+    registrado no log e não impede os demais nem derruba a thread de aquecimento.
+    """
+    enfileirados = 0
+    for ticker in dict.fromkeys(a.get("ticker") for a in assinaturas() if a.get("ticker")):
+        try:
+            enfileirados += avaliar(ticker)
+        except Exception:
+            log.exception("Falha ao avaliar os alertas de %s", ticker)
+    return enfileirados
+
+
+# ---------------------------------------------------------------------------
+# Entrega em segundo plano
+# ---------------------------------------------------------------------------
+
+def _mensagem(remetente: str, email: str, avisos: list[Aviso]) -> EmailMessage:
+    mensagem = EmailMessage()
+    tickers = ", ".join(dict.fromkeys(a.ticker for a in avisos))
+    mensagem["Subject"] = f"Alerta de Mercado - {tickers}"
+    mensagem["From"] = remetente
+    mensagem["To"] = email
+    blocos = []
+    for aviso in avisos:
+        linhas = [f"Alerta para o ativo {aviso.ticker} ({aviso.data}):"]
+        linhas += [f"{nome}: {texto}" for nome, texto in aviso.status]
+        blocos.append("\n".join(linhas))
+    mensagem.set_content("\n\n".join(blocos))
+    return mensagem
+
+
+@dataclass
+class ServicoAlertas:
+    config: ConfigSMTP = field(default_factory=ConfigSMTP.do_ambiente)
+    lote: int = LOTE
+    espera_lote: float = ESPERA_LOTE
+    ocioso: float = OCIOSO
+    tentativas: int = TENTATIVAS
+    espera_inicial: float = ESPERA_INICIAL
+    ao_entregar: object = None      # função(aviso) chamada depois de cada entrega
+    entregues: int = 0
+    emails: int = 0
+    conexoes: int = 0
+    falhas: int = 0
+
+    def __post_init__(self):
+        self.fila: queue.Queue = queue.Queue()
+        self._chaves: set[str] = set()      # na fila ou em entrega
+        self._trava = threading.Lock()
+        self._conexao: smtplib.SMTP | None = None
+        self._parar = threading.Event()
+        self._thread = threading.Thread(target=self._executar, name="alertas", daemon=True)
+        self._thread.start()
+
+    def enfileirar(self, aviso: Aviso) -> bool:
+        """Coloca `aviso` na fila sem esperar; False se um igual ainda está na fila."""
+        with self._trava:
+            if aviso.chave in self._chaves:
+                return False
+            self._chaves.add(aviso.chave)
+        self.fila.put(aviso)
+        return True
+
+    def aguardar(self, timeout: float | None = None) -> bool:
+        """Espera a fila esvaziar (verificação e encerramento); True se esvaziou."""
+        limite = time.monotonic() + (timeout if timeout is not None else math.inf)
+        while self.fila.unfinished_tasks and time.monotonic() < limite:
+            time.sleep(0.01)
+        return not self.fila.unfinished_tasks
+
+    def parar(self) -> None:
+        self._parar.set()
+        self.fila.put(None)
+        self._thread.join()
+
+    def _executar(self):
+        while not self._parar.is_set():
+            try:
+                primeiro = self.fila.get(timeout=self.ocioso)
+            except queue.Empty:
+                self._fechar()
+                continue
+            lote = [primeiro]
+            limite = time.monotonic() + self.espera_lote
+            while len(lote) < self.lote and primeiro is not None:
+                try:
+                    lote.append(self.fila.get(timeout=max(limite - time.monotonic(), 0)))
+                except queue.Empty:
+                    break
+            avisos = [a for a in lote if a is not None]
+            try:
+                if avisos:
+                    self._entregar(avisos)
+            except Exception:
+                log.exception("Falha ao entregar %d alertas", len(avisos))
+                with self._trava:
+                    self._chaves.difference_update(a.chave for a in avisos)
+            finally:
+                for _ in lote:
+                    self.fila.task_done()
+        self._fechar()
+
+    def _entregar(self, avisos: list[Aviso]):
+        por_email: dict[str, list[Aviso]] = {}
+        for aviso in avisos:
+            por_email.setdefault(aviso.email, []).append(aviso)
+        for email, grupo in por_email.items():
+            if self._enviar(_mensagem(self.config.usuario, email, grupo)):
+                self.emails += 1
+                self.entregues += len(grupo)
+                if self.ao_entregar is not None:
+                    for aviso in grupo:
+                        self.ao_entregar(aviso)
+            else:
+                # Falhou de vez: a próxima avaliação tenta de novo.
+                self.falhas += len(grupo)
+            # Entregue (e gravado por `ao_entregar`) ou desistido: a chave sai da memória.
+            with self._trava:
+                self._chaves.difference_update(a.chave for a in grupo)
+
+    def _enviar(self, mensagem: EmailMessage) -> bool:
+        for tentativa in range(self.tentativas):
+            if tentativa and self._parar.wait(self.espera_inicial * 2 ** (tentativa - 1)):
+                return False
+            try:
+                self._conectar().send_message(mensagem)
+                return True
+            except smtplib.SMTPRecipientsRefused:
+                return False        # endereço recusado: tentar de novo não adianta
+            except (smtplib.SMTPException, OSError):
+                self._fechar()
+        return False
+
+    def _conectar(self) -> smtplib.SMTP:
+        if self._conexao is not None:
+            try:
+                if self._conexao.noop()[0] == 250:
+                    return self._conexao
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._fechar()
+        self._conexao = self.config.conectar()
+        self.conexoes += 1
+        return self._conexao
+
+    def _fechar(self):
+        if self._conexao is not None:
+            try:
+                self._conexao.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._conexao = None
+
+
+_servico: ServicoAlertas | None = None
+_trava_servico = threading.Lock()
+
+
+def servico() -> ServicoAlertas:
+    """Serviço de entrega compartilhado pelo processo (criado no primeiro uso)."""
+    global _servico
+    with _trava_servico:
+        if _servico is None:
+            _servico = ServicoAlertas(ao_entregar=_registrar_entrega)
+        return _servico
+
+
+if __name__ == "__main__":
+    print(f"{avaliar_assinaturas()} avisos enfileirados")
+    servico().aguardar()
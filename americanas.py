@@ -0,0 +1,165 @@
+# Opções americanas (exercício antecipado), como as opções de açúcar nº 11 da
+# ICE, que são sobre o futuro (carrego zero). Dois métodos:
+# - árvore binomial (CRR ou Leisen-Reimer) com os strikes no primeiro eixo:
+#   uma única indução retroativa precifica a escada inteira;
+# - Longstaff-Schwartz sobre trajetórias de Monte Carlo (monte_carlo.py)
+#   compartilhadas por todos os strikes, com as regressões de cada data
+#   resolvidas em lote.
+# Ambos devolvem a fronteira de exercício (preço crítico por data e strike) e
+# o tempo gasto; o preço europeu vem da fórmula fechada, para o prêmio do
+# exercício antecipado.
+
+import math
+import time
+from dataclasses import dataclass
+
+import numpy as np
+
+from black_scholes import black_scholes
+from monte_carlo import GBM, simular
+
+PONTOS_FRONTEIRA = 400      # grade de preços em que a fronteira do Longstaff-Schwartz é localizada
+
+
+@dataclass
+class ResultadoAmericano:
+    precos: np.ndarray              # (strikes,)
+    europeus: np.ndarray            # mesmo contrato sem exercício antecipado
+    tempos: np.ndarray              # datas de exercício (anos)
+    fronteira: np.ndarray           # (strikes, datas): preço crítico; NaN se não há exercício
+    segundos: float
+    erro_padrao: np.ndarray | None = None
+
+    @property
+    def premio(self) -> np.ndarray:
+        """Prêmio do exercício antecipado sobre a europeia."""
+        return self.precos - self.europeus
+
+
+def _sinal(tipo: str) -> int:
+    if tipo not in ('call', 'put'):
+        raise ValueError("Tipo de opção inválido. Use 'call' ou 'put'.")
+    return 1 if tipo == 'call' else -1
+
+
+def europeias(S, strikes, T, r, sigma, tipo='put', carrego=0.0) -> np.ndarray:
+    """Preço europeu com custo de carrego `carrego` (0 para futuros: Black-76)."""
+    return black_scholes(S * math.exp((carrego - r) * T), np.asarray(strikes, dtype=float), T, r, sigma, tipo)
+
+
+def _peizer_pratt(z, n: int):
+    return 0.5 + np.sign(z) * 0.5 * np.sqrt(1 - np.exp(-(z / (n + 1 / 3 + 0.1 / (n + 1))) ** 2 * (n + 1 / 6)))
+
+
+def arvore_binomial(S: float, strikes, T: float, r: float, sigma, tipo='put', passos: int = 501,
+                    metodo='lr', carrego=0.0) -> ResultadoAmericano:
+    """Árvore binomial para todos os `strikes` de uma vez (`sigma` escalar ou um por strike).
+
+    metodo: 'crr' (Cox-Ross-Rubinstein) ou 'lr' (Leisen-Reimer, converge em
+    ordem 1/n e sem oscilação; usa `passos` ímpar).
+    """
+    inicio = time.perf_counter()
+    sinal = _sinal(tipo)
+    K = np.atleast_1d(np.asarray(strikes, dtype=float))
+    sigma = np.broadcast_to(np.asarray(sigma, dtype=float), K.shape)
+    dt = T / passos
+    crescimento = math.exp(carrego * dt)
+    if metodo == 'crr':
+        u = np.exp(sigma * math.sqrt(dt))
+        d = 1 / u
+        p = (crescimento - d) / (u - d)
+    elif metodo == 'lr':
+        passos += 1 - passos % 2
+        dt = T / passos
+        crescimento = math.exp(carrego * dt)
+        d1 = (np.log(S / K) + (carrego + 0.5 * sigma ** 2) * T) / (sigma * math.sqrt(T))
+        d2 = d1 - sigma * math.sqrt(T)
+        p = _peizer_pratt(d2, passos)
+        u = crescimento * _peizer_pratt(d1, passos) / p
+        d = (crescimento - p * u) / (1 - p)
+    else:
+        raise ValueError("Método inválido. Use 'crr' ou 'lr'.")
+
+    log_u, log_d = np.log(u)[:, None], np.log(d)[:, None]
+    j = np.arange(passos + 1)
+    desconto = math.exp(-r * dt)
+    sobe, desce = (desconto * p)[:, None], (desconto * (1 - p))[:, None]
+    valor = np.maximum(sinal * (S * np.exp(j * log_u + (passos - j) * log_d) - K[:, None]), 0)
+    fronteira = np.full((len(K), passos), np.nan)
+    extremo = -np.inf if sinal < 0 else np.inf
+    for i in range(passos - 1, -1, -1):
+        valor = sobe * valor[:, 1:i + 2] + desce * valor[:, :i + 1]
+        nos = S * np.exp(j[:i + 1] * log_u + (i - j[:i + 1]) * log_d)
+        exercicio = sinal * (nos - K[:, None])
+        exercer = (exercicio > valor) & (exercicio > 0)
+        np.maximum(valor, exercicio, out=valor)
+        # Put: maior preço em que se exerce; call: menor.
+        critico = np.where(exercer, nos, extremo)
+        critico = critico.max(axis=1) if sinal < 0 else critico.min(axis=1)
+        fronteira[:, i] = np.where(np.isfinite(critico), critico, np.nan)
+    return ResultadoAmericano(
+        precos=valor[:, 0], europeus=europeias(S, K, T, r, sigma, tipo, carrego),
+        tempos=np.arange(passos) * dt, fronteira=fronteira, segundos=time.perf_counter() - inicio,
+    )
+
+
+def trajetorias_neutras(S: float, T: float, sigma: float, datas: int, n_caminhos: int,
+                        semente: int | None = None, carrego=0.0) -> np.ndarray:
+    """Trajetórias (datas, n) neutras ao risco nas datas T·k/datas, k = 1..datas."""
+    dt = T / datas
+    passo = GBM(carrego * dt, sigma * math.sqrt(dt))
+    return simular(passo, S, datas, n_caminhos, semente, guardar_trajetorias=True, processos=1).trajetorias
+
+
+def longstaff_schwartz(trajetorias: np.ndarray, S: float, strikes, T: float, r: float, sigma,
+                       tipo='put', grau: int = 3, carrego=0.0) -> ResultadoAmericano:
+    """Longstaff-Schwartz com as mesmas `trajetorias` (datas, n) para todos os strikes.
+
+    A continuação é regredida nos caminhos dentro do dinheiro sobre 1, x, …, x^grau
+    (x = preço / S). Como a base é a mesma para todos os strikes, as equações
+    normais de cada data saem de dois produtos de matrizes (strikes × caminhos).
+    `sigma` só entra no preço europeu de referência.
+    """
+    inicio = time.perf_counter()
+    sinal = _sinal(tipo)
+    K = np.atleast_1d(np.asarray(strikes, dtype=float))
+    datas, n = trajetorias.shape
+    dt = T / datas
+    desconto = math.exp(-r * dt)
+    termos = grau + 1
+    fluxos = np.maximum(sinal * (trajetorias[-1].astype(np.float64)[None, :] - K[:, None]), 0)
+    fronteira = np.full((len(K), datas), np.nan)
+    fronteira[:, -1] = K
+    extremo = -np.inf if sinal < 0 else np.inf
+    for i in range(datas - 2, -1, -1):
+        fluxos *= desconto
+        precos = trajetorias[i].astype(np.float64)
+        base = (precos / S)[:, None] ** np.arange(termos)                      # (n, termos)
+        exercicio = sinal * (precos[None, :] - K[:, None])                     # (strikes, n)
+        dentro = exercicio > 0
+        mascara = dentro.astype(np.float64)
+        A = (mascara @ (base[:, :, None] * base[:, None, :]).reshape(n, -1)).reshape(-1, termos, termos)
+        b = (mascara * fluxos) @ base
+        suficiente = mascara.sum(axis=1) > 2 * termos
+        A[~suficiente] = np.eye(termos)
+        A += 1e-12 * np.trace(A, axis1=1, axis2=2)[:, None, None] * np.eye(termos)
+        coeficientes = np.linalg.solve(A, b[..., None])[..., 0]
+        continuacao = coeficientes @ base.T
+        exercer = dentro & (exercicio > continuacao) & suficiente[:, None]
+        np.copyto(fluxos, exercicio, where=exercer)
+        # Fronteira: onde o exercício supera a continuação ajustada, numa grade de preços da data.
+        grade = np.linspace(precos.min(), precos.max(), PONTOS_FRONTEIRA)
+        exercicio_grade = sinal * (grade[None, :] - K[:, None])
+        continuacao_grade = coeficientes @ ((grade / S)[:, None] ** np.arange(termos)).T
+        exercer_grade = (exercicio_grade > 0) & (exercicio_grade > continuacao_grade) & suficiente[:, None]
+        critico = np.where(exercer_grade, grade[None, :], extremo)
+        critico = critico.max(axis=1) if sinal < 0 else critico.min(axis=1)
+        fronteira[:, i] = np.where(np.isfinite(critico), critico, np.nan)
+    fluxos *= desconto
+    # Exercício imediato em t = 0, se valer mais que continuar.
+    precos = np.maximum(fluxos.mean(axis=1), np.maximum(sinal * (S - K), 0))
+    return ResultadoAmericano(
+        precos=precos, europeus=europeias(S, K, T, r, sigma, tipo, carrego),
+        tempos=np.arange(1, datas + 1) * dt, fronteira=fronteira, segundos=time.perf_counter() - inicio,
+        erro_padrao=fluxos.std(axis=1, ddof=1) / math.sqrt(n),
+    )
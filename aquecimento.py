@@ -0,0 +1,42 @@
+# Aquecimento do armazenamento de preços: baixa todos os tickers usados no
+# painel em uma única requisição multi-ticker, em uma thread de fundo que
+# repete a cada INTERVALO_AQUECIMENTO segundos. Depois de cada atualização os
+# alertas cadastrados são avaliados (alertas.py).
+#
+# Também pode ser executado antes do servidor (ver render.yaml):
+#     python aquecimento.py --uma-vez
+
+import sys
+import threading
+import time
+
+import streamlit as st
+
+from alertas import avaliar_assinaturas
+from config import INTERVALO_AQUECIMENTO, TICKERS_AQUECIMENTO
+from historico import aquecer
+
+
+def executar(intervalo: int = INTERVALO_AQUECIMENTO, parar: threading.Event | None = None):
+    parar = parar or threading.Event()
+    while not parar.is_set():
+        aquecer(TICKERS_AQUECIMENTO, ttl=intervalo)
+        avaliar_assinaturas()
+        parar.wait(intervalo)
+
+
+@st.cache_resource
+def iniciar_aquecimento() -> threading.Event:
+    """Inicia (uma vez por processo) a thread de aquecimento; retorna o evento de parada."""
+    parar = threading.Event()
+    threading.Thread(target=executar, kwargs={"parar": parar}, name="aquecimento", daemon=True).start()
+    return parar
+
+
+if __name__ == "__main__":
+    if "--uma-vez" in sys.argv:
+        inicio = time.perf_counter()
+        atualizados = aquecer(TICKERS_AQUECIMENTO, ttl=0)
+        print(f"{len(atualizados)} tickers atualizados em {time.perf_counter() - inicio:.1f}s: {', '.join(atualizados)}")
+    else:
+        executar()
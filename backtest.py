@@ -0,0 +1,188 @@
+# Backtest dos pontos de entrada da página Mercado sobre uma grade de
+# parâmetros (janela × limiar × dias de posição) e vários tickers.
+#
+# Os sinais da página marcam sobrecompra (bons momentos para fixar preço), então
+# cada entrada é uma venda no fechamento em que o sinal fica conhecido,
+# recomprada `dias` pregões depois; P&L em % do preço de entrada. Sinais que
+# olham o candle seguinte (pico confirmado, cruzamento) só entram no fechamento
+# desse candle, sem olhar o futuro.
+#
+# Para cada janela o indicador é calculado uma vez (indicadores.py); limiares
+# entram por broadcast e os dias de posição por um produto de matrizes
+# (entradas × retornos futuros), então a grade inteira sai em poucas operações.
+
+from dataclasses import dataclass
+from datetime import date
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from historico import INICIO_HISTORICO, carregar_historico
+from indicadores import cci, desvio_movel, estocastico_lento, media_movel, rsi
+
+TICKERS_BACKTEST = ("SB=F", "USDBRL=X", "CL=F", "SBK26.NYB")
+DIAS_POSICAO = (1, 5, 10, 20, 60)
+
+
+@dataclass(frozen=True)
+class Grade:
+    janelas: tuple
+    limiares: tuple
+    nome_janela: str
+    nome_limiar: str
+
+
+GRADES = {
+    "EWMA": Grade((10, 20, 30, 60), (1.0, 1.5, 2.0, 2.5), "Span", "Retorno / volatilidade"),
+    "CCI": Grade((10, 14, 20, 30, 40), (100, 150, 200, 250), "Janela", "Sobrecompra"),
+    "Estocástico": Grade((5, 9, 14, 21), (70, 75, 80, 85, 90), "Janela", "Sobrecompra"),
+    "Bandas de Bollinger": Grade((10, 20, 30, 50), (1.5, 2.0, 2.5, 3.0), "Janela", "Desvios"),
+    "MACD": Grade((6, 8, 12, 16), (20, 26, 34, 50), "EMA curta", "EMA longa"),
+    "RSI": Grade((7, 10, 14, 21), (65, 70, 75, 80), "Janela", "Sobrecompra"),
+}
+
+
+def _proximo(x: np.ndarray) -> np.ndarray:
+    saida = np.full(x.shape, np.nan)
+    saida[..., :-1] = x[..., 1:]
+    return saida
+
+
+def _anterior(x: np.ndarray) -> np.ndarray:
+    saida = np.full(x.shape, np.nan)
+    saida[..., 1:] = x[..., :-1]
+    return saida
+
+
+def _pico(x: np.ndarray, limiares: np.ndarray) -> np.ndarray:
+    """(limiares, n): indicador acima do limiar e maior que os vizinhos, como na página."""
+    return (x > limiares[:, None]) & (_proximo(x) < x) & (_anterior(x) < x)
+
+
+def _sinais(sinal: str, data: pd.DataFrame, grade: Grade) -> np.ndarray:
+    """Entradas (janelas, limiares, n), já no candle em que o sinal é conhecido."""
+    high, low, close = (data[c].to_numpy(dtype=float) for c in ("High", "Low", "Close"))
+    limiares = np.asarray(grade.limiares, dtype=float)
+    confirmado_depois = sinal != "EWMA"
+    linhas = []
+    for janela in grade.janelas:
+        if sinal == "EWMA":
+            retornos = data["Close"].pct_change()
+            vol = (retornos.ewm(span=janela).std() * 100).to_numpy()
+            linhas.append(retornos.to_numpy()[None, :] * 100 > limiares[:, None] * vol)
+        elif sinal == "CCI":
+            linhas.append(_pico(cci(high, low, close, janela), limiares))
+        elif sinal == "Estocástico":
+            linhas.append(_pico(estocastico_lento(high, low, close, janela), limiares))
+        elif sinal == "Bandas de Bollinger":
+            superior = media_movel(close, janela) + limiares[:, None] * desvio_movel(close, janela)
+            linhas.append((close > superior) & (_proximo(close) < close))
+        elif sinal == "MACD":
+            curta = data["Close"].ewm(span=janela, min_periods=1, adjust=False).mean()
+            por_limiar = []
+            for longa_span in grade.limiares:
+                macd = (curta - data["Close"].ewm(span=longa_span, min_periods=1, adjust=False).mean()).to_numpy()
+                linha_sinal = pd.Series(macd).ewm(span=9, min_periods=1, adjust=False).mean().to_numpy()
+                cruzou = (macd > linha_sinal) & (_proximo(macd) < _proximo(linha_sinal))
+                por_limiar.append(cruzou & (longa_span > janela))
+            linhas.append(np.stack(por_limiar))
+        elif sinal == "RSI":
+            x = rsi(close, janela)
+            linhas.append((x > limiares[:, None]) & (_proximo(x) < x))
+        else:
+            raise ValueError(f"Sinal desconhecido: {sinal}")
+    entradas = np.stack(linhas)
+    if confirmado_depois:
+        deslocadas = np.zeros_like(entradas)
+        deslocadas[..., 1:] = entradas[..., :-1]
+        entradas = deslocadas
+    return entradas
+
+
+@dataclass
+class ResultadoBacktest:
+    ticker: str
+    sinal: str
+    grade: Grade
+    dias: tuple
+    entradas: np.ndarray        # (janelas, limiares, dias)
+    acerto: np.ndarray          # % das entradas com P&L > 0
+    pnl_medio: np.ndarray       # % por entrada
+    pnl_total: np.ndarray       # soma dos % das entradas
+    base_acerto: np.ndarray     # (dias,): vender em todo pregão, para comparação
+    base_pnl: np.ndarray
+
+    def tabela(self) -> pd.DataFrame:
+        janelas, limiares, dias = np.meshgrid(self.grade.janelas, self.grade.limiares, self.dias, indexing="ij")
+        return pd.DataFrame({
+            "Ticker": self.ticker,
+            "Sinal": self.sinal,
+            self.grade.nome_janela: janelas.ravel(),
+            self.grade.nome_limiar: limiares.ravel(),
+            "Dias": dias.ravel(),
+            "Entradas": self.entradas.ravel(),
+            "Acerto (%)": self.acerto.ravel(),
+            "P&L médio (%)": self.pnl_medio.ravel(),
+            "P&L total (%)": self.pnl_total.ravel(),
+        })
+
+
+def avaliar(data: pd.DataFrame, sinal: str, inicio=None, fim=None, dias=DIAS_POSICAO, ticker: str = "") -> ResultadoBacktest:
+    """Backtest de `sinal` em toda a grade sobre `data` (OHLC), contando entradas entre `inicio` e `fim`.
+
+    Históricos vazios ou mais curtos que as janelas dão zero entradas (métricas NaN).
+    """
+    grade = GRADES[sinal]
+    entradas = _sinais(sinal, data, grade)
+    janela = np.ones(len(data), dtype=bool)
+    if inicio is not None:
+        janela &= data.index >= pd.Timestamp(inicio)
+    if fim is not None:
+        janela &= data.index <= pd.Timestamp(fim)
+    entradas &= janela
+
+    close = data["Close"].to_numpy(dtype=float)
+    futuros = np.full((len(dias), len(close)), np.nan)
+    for i, d in enumerate(dias):
+        futuros[i, :max(len(close) - d, 0)] = close[d:]
+    pnl = (close - futuros) / close * 100                          # (dias, n), venda
+    valido = ~np.isnan(pnl)
+    pnl_zerado = np.where(valido, pnl, 0.0)
+
+    matriz = entradas.reshape(entradas.shape[0] * entradas.shape[1], len(close)).astype(np.float64)  # (janelas·limiares, n)
+    forma = entradas.shape[:2] + (len(dias),)
+    contagem = (matriz @ valido.T).reshape(forma)
+    soma = (matriz @ pnl_zerado.T).reshape(forma)
+    acertos = (matriz @ (pnl_zerado > 0).T).reshape(forma)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        acerto = np.where(contagem > 0, acertos / contagem * 100, np.nan)
+        pnl_medio = np.where(contagem > 0, soma / contagem, np.nan)
+        base = valido & janela
+        base_n = base.sum(axis=1)
+        base_acerto = ((pnl_zerado > 0) & base).sum(axis=1) / base_n * 100
+        base_pnl = np.where(base, pnl_zerado, 0).sum(axis=1) / base_n
+    return ResultadoBacktest(
+        ticker=ticker, sinal=sinal, grade=grade, dias=tuple(dias), entradas=contagem.astype(int),
+        acerto=acerto, pnl_medio=pnl_medio, pnl_total=soma, base_acerto=base_acerto, base_pnl=base_pnl,
+    )
+
+
+@lru_cache(maxsize=64)
+def _backtest(ticker: str, sinal: str, inicio, fim, ate: pd.Timestamp, linhas: int) -> ResultadoBacktest:
+    return avaliar(carregar_historico(ticker, INICIO_HISTORICO), sinal, inicio, fim, ticker=ticker)
+
+
+def backtest(ticker: str, sinal: str, inicio: date | None = None, fim: date | None = None) -> ResultadoBacktest:
+    """Backtest de `sinal` para `ticker`, guardado até chegar um candle novo."""
+    historico = carregar_historico(ticker, INICIO_HISTORICO)
+    if historico.empty:
+        return avaliar(historico, sinal, inicio, fim, ticker=ticker)
+    inicio = pd.Timestamp(inicio) if inicio is not None else None
+    fim = pd.Timestamp(fim) if fim is not None else None
+    return _backtest(ticker, sinal, inicio, fim, historico.index[-1], len(historico))
+
+
+def varrer(sinal: str, inicio=None, fim=None, tickers=TICKERS_BACKTEST) -> pd.DataFrame:
+    """Tabela longa do backtest de `sinal` em todos os `tickers`."""
+    return pd.concat([backtest(t, sinal, inicio, fim).tabela() for t in tickers], ignore_index=True)
@@ -0,0 +1,243 @@
+# Benchmark de convergência e precisão dos simuladores de Monte Carlo.
+# Roda o precificador de calls (Opções), o gráfico de leque (Monte Carlo) e o
+# modelo de saltos (Jump Diffusion) sobre parâmetros estimados na série GBM
+# sintética de SB=F e compara com as fórmulas fechadas: Black-Scholes para o
+# GBM e a mistura Poisson de Merton para os saltos. Para cada caso registra
+# tempo, pico de memória e erro numa linha JSON do histórico.
+#
+#     python benchmarks.py                 # grade completa, grava no histórico
+#     python benchmarks.py --rapido        # grade reduzida
+#     python benchmarks.py --verificar     # sai com código 1 se algum caso piorou
+#
+# A verificação compara cada caso com a mediana das últimas execuções do mesmo
+# caso na mesma máquina (tempo e memória) e exige que o erro seja compatível
+# com o erro padrão informado pelo simulador.
+
+import argparse
+import json
+import math
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import date, datetime
+from pathlib import Path
+
+import numpy as np
+
+from black_scholes import black_scholes, probabilidade_acima
+from historico import DIRETORIO_DADOS
+from monte_carlo import GBM, TAMANHO_LOTE, Amostragem, Merton, leque, pico_memoria, precificar_strikes
+from provedores import ProvedorSintetico
+
+RAIZ = Path(__file__).parent
+HISTORICO = Path(os.environ.get("IMPACTO_HISTORICO_BENCHMARKS", DIRETORIO_DADOS / "benchmarks.jsonl"))
+FIM_SERIE = date(2024, 12, 31)   # série sintética fixa: parâmetros iguais em toda execução
+
+CAMINHOS = (10_000, 100_000, 1_000_000)
+HORIZONTES = (30, 90, 180)
+CAMINHOS_RAPIDO = (10_000, 100_000)
+CAMINHOS_AQUECIMENTO = 2_048
+HORIZONTES_RAPIDO = (30,)
+METODOS = {
+    "simples": Amostragem(),
+    "antitetica": Amostragem(antitetica=True),
+    "controle": Amostragem(controle=True),
+    "sobol": Amostragem(sobol=True),
+}
+PRECISOES = {"float64": np.float64, "float32": np.float32}
+QUANTIS = (0.05, 0.25, 0.50, 0.75, 0.95)
+
+# Limites da verificação
+FOLGA_TEMPO = 1.5      # tempo até 1,5× a mediana anterior...
+FOLGA_TEMPO_ABSOLUTA = 0.05   # ...ou até 50 ms a mais (casos curtos oscilam muito)
+FOLGA_MEMORIA = 1.2    # pico de memória até 1,2× a mediana anterior
+Z_MAXIMO = 5.0         # |erro| / erro padrão
+EXECUCOES_REFERENCIA = 5
+
+
+# ---------------------------------------------------------------------------
+# Parâmetros
+# ---------------------------------------------------------------------------
+
+def parametros_sinteticos(ticker: str = "SB=F") -> tuple[float, GBM]:
+    """Último preço e GBM diário estimado na série sintética, como as páginas fazem com dados reais."""
+    serie = ProvedorSintetico(fim=FIM_SERIE).gerar(ticker)["Close"]
+    return float(serie.iloc[-1]), GBM.de_retornos(serie.pct_change().dropna())
+
+
+def strikes_em_torno(s0: float) -> np.ndarray:
+    return np.round(s0 * np.arange(0.80, 1.2001, 0.05), 4)
+
+
+# ---------------------------------------------------------------------------
+# Casos
+# ---------------------------------------------------------------------------
+
+def _tamanho_lote(n: int, metodo: str) -> int:
+    # O erro padrão do Sobol vem da dispersão entre lotes: pelo menos 16 lotes.
+    return max(1024, n // 16) if metodo == "sobol" else TAMANHO_LOTE
+
+
+def _medir(funcao, *args, **kwargs):
+    inicio = time.perf_counter()
+    resultado, pico = pico_memoria(funcao, *args, **kwargs, processos=1)
+    return resultado, time.perf_counter() - inicio, pico
+
+
+def _erros(estimado, erro_padrao, exato, escala: float = 1.0) -> dict:
+    """Maior erro absoluto, maior erro padrão e maior |erro|/erro padrão. O erro
+    padrão tem piso de 1e-6·escala: com o GBM como controle dele mesmo a
+    estimativa é exata e o erro padrão, zero."""
+    erro = np.abs(np.asarray(estimado, dtype=float) - np.asarray(exato, dtype=float))
+    erro_padrao = np.asarray(erro_padrao, dtype=float)
+    z = erro / np.maximum(erro_padrao, 1e-6 * escala)
+    return {"erro_max": float(erro.max()), "erro_padrao_max": float(erro_padrao.max()), "z_max": float(z.max())}
+
+
+def caso_opcoes(s0, gbm, dias, n, metodo, precisao) -> dict:
+    strikes = strikes_em_torno(s0)
+    resultado, segundos, pico = _medir(precificar_strikes, gbm, s0, dias, strikes, n, semente=1,
+                                       tamanho_lote=_tamanho_lote(n, metodo), amostragem=METODOS[metodo],
+                                       precisao=PRECISOES[precisao])
+    exato = math.exp(gbm.mu * dias) * black_scholes(s0, strikes, dias, gbm.mu, gbm.sigma, 'call')
+    call = resultado.valores["call"]
+    return {"segundos": segundos, "pico_mb": pico / 1e6, "caminhos": resultado.n_caminhos,
+            **_erros(call.media, call.erro_padrao, exato, s0)}
+
+
+def caso_leque(s0, gbm, dias, n, metodo, precisao) -> dict:
+    minimo, maximo = s0 * 0.3, s0 * 2.5
+    resultado, segundos, pico = _medir(leque, gbm, s0, dias, n, minimo, maximo, [s0], semente=1,
+                                       tamanho_lote=_tamanho_lote(n, metodo), amostragem=METODOS[metodo],
+                                       precisao=PRECISOES[precisao])
+    t = np.arange(1, dias + 1)
+    z = np.array([statistics.NormalDist().inv_cdf(q) for q in QUANTIS])[:, None]
+    exatos = s0 * np.exp((gbm.mu - 0.5 * gbm.sigma ** 2) * t + gbm.sigma * np.sqrt(t) * z)
+    erro_quantis = np.abs(resultado.valores["histograma"].quantis(QUANTIS) - exatos).max()
+    acima = resultado.valores["acima"]
+    erros = _erros(acima.media, acima.erro_padrao, probabilidade_acima(s0, s0, dias, gbm.mu, gbm.sigma))
+    return {"segundos": segundos, "pico_mb": pico / 1e6, "caminhos": resultado.n_caminhos,
+            "erro_quantis": float(erro_quantis), **erros}
+
+
+def caso_saltos(s0, gbm, dias, n, metodo, precisao) -> dict:
+    merton = Merton(gbm.mu, gbm.sigma, lambda_saltos=0.02, mu_salto=-0.03, sigma_salto=0.06, dt=1)
+    strikes = strikes_em_torno(s0)
+    resultado, segundos, pico = _medir(precificar_strikes, merton, s0, dias, strikes, n, semente=1,
+                                       precisao=PRECISOES[precisao])
+    call = resultado.valores["call"]
+    return {"segundos": segundos, "pico_mb": pico / 1e6, "caminhos": resultado.n_caminhos,
+            **_erros(call.media, call.erro_padrao, merton.valor_call(s0, strikes, dias), s0)}
+
+
+def grade(rapido: bool = False):
+    """(nome, função, dias, caminhos, método, precisão) de cada caso."""
+    caminhos = CAMINHOS_RAPIDO if rapido else CAMINHOS
+    horizontes = HORIZONTES_RAPIDO if rapido else HORIZONTES
+    for dias in horizontes:
+        for n in caminhos:
+            for precisao in PRECISOES:
+                for metodo in METODOS:
+                    yield "opcoes", caso_opcoes, dias, n, metodo, precisao
+                for metodo in ("simples", "antitetica"):
+                    yield "leque", caso_leque, dias, n, metodo, precisao
+                # Saltos têm ruído Poisson: só amostragem simples.
+                yield "saltos", caso_saltos, dias, n, "simples", precisao
+
+
+# ---------------------------------------------------------------------------
+# Histórico e verificação
+# ---------------------------------------------------------------------------
+
+def _commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def ler_historico(caminho: Path = HISTORICO) -> list[dict]:
+    if not caminho.exists():
+        return []
+    with open(caminho, encoding="utf-8") as arquivo:
+        return [json.loads(linha) for linha in arquivo if linha.strip()]
+
+
+def gravar_historico(registros: list[dict], caminho: Path = HISTORICO) -> None:
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    with open(caminho, "a", encoding="utf-8") as arquivo:
+        for registro in registros:
+            arquivo.write(json.dumps(registro, ensure_ascii=False) + "\n")
+
+
+def _chave(registro: dict) -> tuple:
+    return (registro["maquina"], registro["caso"], registro["dias"], registro["caminhos_pedidos"],
+            registro["metodo"], registro["precisao"])
+
+
+def verificar(registros: list[dict], anteriores: list[dict]) -> list[str]:
+    """Problemas de cada registro novo em relação ao histórico anterior."""
+    por_chave: dict[tuple, list[dict]] = {}
+    for registro in anteriores:
+        por_chave.setdefault(_chave(registro), []).append(registro)
+    problemas = []
+    for registro in registros:
+        nome = f"{registro['caso']} dias={registro['dias']} n={registro['caminhos_pedidos']} " \
+               f"{registro['metodo']} {registro['precisao']}"
+        if registro["z_max"] > Z_MAXIMO:
+            problemas.append(f"{nome}: erro {registro['erro_max']:.2e} = {registro['z_max']:.1f} erros padrão")
+        referencia = por_chave.get(_chave(registro), [])[-EXECUCOES_REFERENCIA:]
+        if not referencia:
+            continue
+        tempo = statistics.median(r["segundos"] for r in referencia)
+        memoria = statistics.median(r["pico_mb"] for r in referencia)
+        if registro["segundos"] > max(FOLGA_TEMPO * tempo, tempo + FOLGA_TEMPO_ABSOLUTA):
+            problemas.append(f"{nome}: {registro['segundos']:.2f} s (antes {tempo:.2f} s)")
+        if registro["pico_mb"] > FOLGA_MEMORIA * memoria:
+            problemas.append(f"{nome}: {registro['pico_mb']:.1f} MB (antes {memoria:.1f} MB)")
+    return problemas
+
+
+def executar_benchmarks(rapido: bool = False, saida=sys.stdout) -> list[dict]:
+    s0, gbm = parametros_sinteticos()
+    base = {"data": datetime.now().isoformat(timespec="seconds"), "commit": _commit(),
+            "maquina": f"{platform.node()}/{os.cpu_count()}", "numpy": np.__version__}
+    # Uma rodada curta e fora da medição de cada combinação: importações
+    # preguiçosas (scipy.stats.qmc no Sobol) e caches não entram no primeiro caso.
+    casos = list(grade(rapido))
+    for funcao, metodo, precisao in dict.fromkeys((c[1], c[4], c[5]) for c in casos):
+        funcao(s0, gbm, min(c[2] for c in casos), CAMINHOS_AQUECIMENTO, metodo, precisao)
+    registros = []
+    for caso, funcao, dias, n, metodo, precisao in casos:
+        medidas = funcao(s0, gbm, dias, n, metodo, precisao)
+        registro = {**base, "caso": caso, "dias": dias, "caminhos_pedidos": n, "metodo": metodo,
+                    "precisao": precisao, **medidas}
+        registros.append(registro)
+        print(f"{caso:7s} dias={dias:<4d} n={n:<9,d} {metodo:10s} {precisao:8s} "
+              f"{medidas['segundos']:7.2f} s {medidas['pico_mb']:7.1f} MB  "
+              f"erro {medidas['erro_max']:.2e} (z {medidas['z_max']:.1f})", file=saida)
+    return registros
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de convergência dos simuladores de Monte Carlo.")
+    parser.add_argument("--rapido", action="store_true", help="grade reduzida (1 horizonte, até 100 mil caminhos)")
+    parser.add_argument("--verificar", action="store_true", help="sai com código 1 se algum caso piorou")
+    parser.add_argument("--sem-gravar", action="store_true", help="não acrescenta os resultados ao histórico")
+    parser.add_argument("--historico", type=Path, default=HISTORICO)
+    args = parser.parse_args()
+
+    anteriores = ler_historico(args.historico)
+    registros = executar_benchmarks(args.rapido)
+    if not args.sem_gravar:
+        gravar_historico(registros, args.historico)
+    problemas = verificar(registros, anteriores) if args.verificar else []
+    for problema in problemas:
+        print("PIOROU:", problema)
+    if args.verificar:
+        print(f"{len(registros)} casos; {len(problemas)} com problema.")
+    sys.exit(1 if problemas else 0)
@@ -0,0 +1,90 @@
+# Fórmulas fechadas de Black-Scholes, usadas pela página Black-Scholes e como
+# variável de controle nas simulações de Monte Carlo (monte_carlo.py).
+# Os argumentos podem ser escalares ou arrays NumPy (com broadcast): uma grade
+# strike × prazo, ou uma carteira inteira, sai de uma única chamada.
+
+from dataclasses import dataclass
+
+import numpy as np
+
+from importacoes import ndtr
+
+_RAIZ_2PI = np.sqrt(2 * np.pi)
+
+
+def _d1_d2(S, K, T, r, sigma):
+    raiz_t = sigma * np.sqrt(T)
+    d1 = (np.log(S / K) + (r + 0.5 * sigma ** 2) * T) / raiz_t
+    return d1, d1 - raiz_t
+
+
+def black_scholes(S, K, T, r, sigma, option_type):
+    d1, d2 = _d1_d2(S, K, T, r, sigma)
+    if option_type == 'call':
+        return S * ndtr(d1) - K * np.exp(-r * T) * ndtr(d2)
+    elif option_type == 'put':
+        return K * np.exp(-r * T) * ndtr(-d2) - S * ndtr(-d1)
+    else:
+        raise ValueError("Tipo de opção inválido. Use 'call' ou 'put'.")
+
+
+def probabilidade_acima(S, K, T, r, sigma):
+    """P(S_T > K) para um GBM com drift `r`: N(d2)."""
+    return ndtr(_d1_d2(S, K, T, r, sigma)[1])
+
+
+@dataclass
+class Gregas:
+    """Preços e gregas de call e put, com o formato do broadcast dos argumentos.
+
+    Unidades: vega e rho por 1,00 de volatilidade/juros (divida por 100 para
+    1 p.p.), theta por ano (divida por 365 para o decaimento diário).
+    """
+
+    call: np.ndarray
+    put: np.ndarray
+    delta_call: np.ndarray
+    delta_put: np.ndarray
+    gamma: np.ndarray
+    vega: np.ndarray
+    theta_call: np.ndarray
+    theta_put: np.ndarray
+    rho_call: np.ndarray
+    rho_put: np.ndarray
+
+    def da_opcao(self, option_type: str) -> dict[str, np.ndarray]:
+        """Preço e gregas de um tipo ('call' ou 'put')."""
+        if option_type not in ('call', 'put'):
+            raise ValueError("Tipo de opção inválido. Use 'call' ou 'put'.")
+        return {
+            'Preço': getattr(self, option_type),
+            'Delta': getattr(self, f'delta_{option_type}'),
+            'Gama': self.gamma,
+            'Vega': self.vega,
+            'Theta': getattr(self, f'theta_{option_type}'),
+            'Rho': getattr(self, f'rho_{option_type}'),
+        }
+
+
+def gregas(S, K, T, r, sigma) -> Gregas:
+    """Preços e gregas de call e put numa só passada (d1, d2 e N(·) calculados uma vez)."""
+    S, K, T, r, sigma = np.broadcast_arrays(*(np.asarray(x, dtype=float) for x in (S, K, T, r, sigma)))
+    d1, d2 = _d1_d2(S, K, T, r, sigma)
+    raiz_t = np.sqrt(T)
+    desconto = K * np.exp(-r * T)
+    n_d1, n_d2 = ndtr(d1), ndtr(d2)
+    n_md1, n_md2 = ndtr(-d1), ndtr(-d2)     # evita 1 - N(d) perdendo precisão nas caudas
+    densidade = np.exp(-0.5 * d1 ** 2) / _RAIZ_2PI
+    decaimento = -S * densidade * sigma / (2 * raiz_t)
+    return Gregas(
+        call=S * n_d1 - desconto * n_d2,
+        put=desconto * n_md2 - S * n_md1,
+        delta_call=n_d1,
+        delta_put=-n_md1,
+        gamma=densidade / (S * sigma * raiz_t),
+        vega=S * densidade * raiz_t,
+        theta_call=decaimento - r * desconto * n_d2,
+        theta_put=decaimento + r * desconto * n_md2,
+        rho_call=T * desconto * n_d2,
+        rho_put=-T * desconto * n_md2,
+    )
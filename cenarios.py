@@ -0,0 +1,122 @@
+# Cenários conjuntos dos drivers de mercado (páginas Risco e Cenários).
+# A correlação dos log-retornos diários de SB=F, USDBRL=X e CL=F é estimada no
+# histórico armazenado (historico.py) sobre uma janela dos últimos pregões comuns
+# e fatorada por Cholesky uma única vez por janela e data do último pregão. Os
+# sorteios aplicam o fator a blocos de normais padrão (cópula gaussiana com
+# marginais normais). CL=F entra como proxy do preço do etanol; drivers sem
+# ticker (moagem, ATR, CBIOS...) ficam independentes.
+#
+# As fórmulas de faturamento e custo da página Risco e o Ebtida ajustado da
+# página Cenários também ficam aqui, para que os lotes das simulações possam
+# rodar no pool de processos de monte_carlo.py.
+
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from historico import carregar_historico
+
+TICKERS_DRIVERS = {"NY": "SB=F", "Câmbio": "USDBRL=X", "Preço Etanol": "CL=F"}
+JANELAS = {"1 ano": 252, "3 anos": 756, "5 anos": 1260}
+MODOS = ["Independente", "Correlacionado"]
+
+
+def _positiva(correlacao: np.ndarray, minimo: float = 1e-8) -> np.ndarray:
+    """Menor ajuste (autovalores ≥ `minimo`, diagonal 1) para a matriz admitir Cholesky."""
+    autovalores, autovetores = np.linalg.eigh(correlacao)
+    if autovalores.min() >= minimo:
+        return correlacao
+    ajustada = autovetores @ np.diag(np.maximum(autovalores, minimo)) @ autovetores.T
+    escala = np.sqrt(np.diag(ajustada))
+    return ajustada / np.outer(escala, escala)
+
+
+@lru_cache(maxsize=16)
+def _correlacao_mercado(janela: int, ate: pd.Timestamp) -> pd.DataFrame:
+    fechamentos = pd.concat(
+        {nome: carregar_historico(ticker)["Close"] for nome, ticker in TICKERS_DRIVERS.items()},
+        axis=1, join="inner",
+    )
+    retornos = np.log(fechamentos.loc[:ate]).diff().dropna().iloc[-janela:]
+    return retornos.corr()
+
+
+def correlacao_mercado(janela: int) -> pd.DataFrame:
+    """Correlação dos log-retornos dos drivers de mercado nos últimos `janela` pregões comuns."""
+    ate = min(carregar_historico(ticker).index[-1] for ticker in TICKERS_DRIVERS.values())
+    return _correlacao_mercado(janela, ate)
+
+
+@lru_cache(maxsize=16)
+def _fatorar(drivers: tuple[str, ...], janela: int, ate: pd.Timestamp) -> tuple[np.ndarray, np.ndarray]:
+    mercado = _correlacao_mercado(janela, ate)
+    correlacao = np.eye(len(drivers))
+    indices = [i for i, nome in enumerate(drivers) if nome in mercado.index]
+    nomes = [drivers[i] for i in indices]
+    correlacao[np.ix_(indices, indices)] = mercado.loc[nomes, nomes].to_numpy()
+    correlacao = _positiva(correlacao)
+    return correlacao, np.linalg.cholesky(correlacao)
+
+
+def fator_drivers(drivers, janela: int) -> tuple[np.ndarray, np.ndarray]:
+    """Matriz de correlação de `drivers` (identidade fora dos drivers de mercado) e seu fator de Cholesky."""
+    ate = min(carregar_historico(ticker).index[-1] for ticker in TICKERS_DRIVERS.values())
+    return _fatorar(tuple(drivers), janela, ate)
+
+
+def sortear(rng: np.random.Generator, medias, desvios, n: int, fator: np.ndarray | None = None) -> np.ndarray:
+    """Cenários (drivers, n) normais com `medias` e `desvios`; com `fator`
+    (Cholesky da correlação) os drivers saem correlacionados."""
+    medias = np.asarray(medias, dtype=float)
+    desvios = np.asarray(desvios, dtype=float)
+    z = rng.standard_normal((len(medias), n))
+    if fator is not None:
+        z = fator @ z
+    z *= desvios[:, None]
+    z += medias[:, None]
+    return z
+
+
+# ---------------------------------------------------------------------------
+# Modelo da página Risco
+# ---------------------------------------------------------------------------
+
+VARIAVEIS_RISCO = ['Moagem Total', 'ATR', 'VHP Total', 'NY', 'Câmbio', 'Preço CBIOS', 'Preço Etanol']
+
+
+def calcular_faturamento(vhp_total, ny, cambio, preco_cbios, preco_etanol):
+    acucar = ((ny - 0.19) * 22.0462 * 1.04 * cambio) * vhp_total + 17283303
+    etanol = preco_etanol * 35524
+    cjm = 24479549
+    cbios = preco_cbios * 31616
+    return acucar + etanol + cjm + cbios
+
+
+def calcular_custo(faturamento, moagem_total, atr, preco_cbios):
+    atr_mtm = 0.6 * (faturamento - preco_cbios) / (moagem_total * atr)
+    cana_acucar_atr = atr_mtm * moagem_total * atr
+    gastos_variaveis = 32947347 + cana_acucar_atr
+    gastos_fixos = 109212811
+    return gastos_fixos + gastos_variaveis
+
+
+def lote_risco(medias, desvios, fator, rng, n):
+    """Lote de cenários de faturamento e custo (ordem dos drivers: VARIAVEIS_RISCO)."""
+    moagem, atr, vhp, ny, cambio, cbios, etanol = sortear(rng, medias, desvios, n, fator)
+    fat = calcular_faturamento(vhp, ny, cambio, cbios, etanol)
+    return {'faturamentos': fat, 'custos': calcular_custo(fat, moagem, atr, cbios)}
+
+
+def calcular_ebtida_ajustado(Moagem, Cambio, Preco_Etanol, NY):
+    VHP = (89.45 * 0.8346 * Moagem) / 1000
+    Etanol = (0.1654 * 80.18 * Moagem + 327.19 * 60075) / 1000
+    Faturamento = (VHP - 4047) * (NY - 0.19) * 22.0462 * 1.04 * Cambio + (Etanol - 1000) * (Preco_Etanol + 349.83) * 0.96 + 3227430 + 22061958 + 12000 * (NY + 1) * 22.0462 * 0.75 * Cambio
+    Custo = 0.6 * 0.93 * ((VHP - 4047) * (NY - 0.19) * 22.0462 * 1.04 * Cambio + (Etanol - 1000) * (Preco_Etanol + 349.83) * 0.96 + 12000 * (NY + 1) * 22.0462 * 0.75 * Cambio) + 88704735 + 43732035 + 20286465
+    return Faturamento - Custo
+
+
+def lote_ebtida(medias, desvios, fator, rng, n):
+    """Lote de cenários com prejuízo (Ebtida ajustado < 0); ordem dos drivers: Moagem, Câmbio, Preço Etanol, NY."""
+    moagem, cambio, etanol, ny = sortear(rng, medias, desvios, n, fator)
+    return {"prejuizo": (calcular_ebtida_ajustado(moagem, cambio, etanol, ny) < 0).astype(float)}
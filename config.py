@@ -1,12 +1,10 @@
 # Configuração centralizada dos ativos disponíveis na simulação.
 # Importado por MonteCarlo.py e pages/Opções.py para evitar duplicação.
-# Dados carregados online via yfinance (sem dependência de CSVs).
+# Dados lidos do armazenamento incremental em historico.py.
 
-from datetime import date
+import os
 
-import pandas as pd
-import streamlit as st
-import yfinance as yf
+from historico import precos_compartilhados
 
 ATIVOS = {
     "Açúcar": {
@@ -23,17 +21,15 @@ ATIVOS = {
     },
 }
 
+# Tickers baixados em lote pelo aquecimento (aquecimento.py): os de ATIVOS mais
+# os usados nas páginas Mercado, VaR e Black-Scholes.
+TICKERS_AQUECIMENTO = list(dict.fromkeys([c["ticker"] for c in ATIVOS.values()] + ["SBK26.NYB", "USDBRL=X", "SB=F", "CL=F"]))
+INTERVALO_AQUECIMENTO = int(os.environ.get("IMPACTO_INTERVALO_AQUECIMENTO", 900))  # segundos
+
 
-@st.cache_data(ttl=3600)
 def carregar_dados(tipo_ativo: str):
+    # Sem st.cache_data: o DataFrame é uma visão sem cópia sobre a matriz
+    # mapeada em disco, compartilhada por todas as sessões (somente leitura).
     config = ATIVOS[tipo_ativo]
-    data = yf.download(
-        config["ticker"],
-        start=date(2013, 1, 1),
-        multi_level_index=False,
-        auto_adjust=True,
-        progress=False,
-    )
-    data = data[["Close"]].dropna()
-    data["Daily Return"] = data["Close"].pct_change()
+    data = precos_compartilhados(config["ticker"])
     return data, config["valor_minimo_padrao"], config["limite_inferior"], config["limite_superior"]
@@ -0,0 +1,348 @@
+# Armazenamento persistente e incremental do histórico de preços (OHLC).
+# Cada ticker fica em um arquivo Parquet em DIRETORIO_DADOS; a cada leitura
+# vencida só são baixados os candles posteriores à última data armazenada.
+# Todas as páginas leem daqui em vez de chamar yf.download do zero.
+# A origem dos candles é o provedor de provedores.py (IMPACTO_PROVEDOR); cada
+# provedor tem seu próprio subdiretório para que dados offline não se misturem
+# aos reais.
+#
+# Junto de cada Parquet é gravada uma matriz .npy com as colunas limpas
+# (COLUNAS_COMPARTILHADAS). `precos_compartilhados` a abre com mmap somente
+# leitura, então todas as sessões usam a mesma cópia física dos preços.
+#
+# Downloads: pedidos iguais em andamento (mesmo ticker e início) viram uma
+# única chamada ao provedor, cujo resultado é entregue a todos que esperavam.
+# Com o arquivo vencido, a leitura devolve na hora o último histórico bom e a
+# atualização corre em segundo plano (stale-while-revalidate); só espera o
+# download quem ainda não tem os dados. `frescor` informa a idade dos dados.
+
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from provedores import obter_provedor
+
+PROVEDOR = obter_provedor()
+DIRETORIO_DADOS = Path(os.environ.get("IMPACTO_DADOS_DIR", Path(__file__).parent / ".dados"))
+INICIO_HISTORICO = date(2013, 1, 1)
+TTL_HISTORICO = int(os.environ.get("IMPACTO_TTL_HISTORICO", 3600))  # segundos
+COLUNAS = ["Open", "High", "Low", "Close", "Volume"]
+COLUNAS_COMPARTILHADAS = ["Open", "High", "Low", "Close", "Daily Return"]
+ESPERA_APOS_FALHA = int(os.environ.get("IMPACTO_ESPERA_FALHA", 120))  # segundos sem nova tentativa em segundo plano
+_NS_POR_DIA = 86_400 * 10**9
+
+_trava_global = threading.Lock()
+_travas: dict[str, threading.Lock] = {}
+_memoria: dict[str, tuple[int, pd.DataFrame]] = {}
+_mapas: dict[str, tuple[int, np.ndarray]] = {}
+_voos: dict[tuple[str, date], Future] = {}
+_falhas: dict[str, float] = {}
+_revalidacao = ThreadPoolExecutor(max_workers=2, thread_name_prefix="revalidar")
+
+
+def _nome_arquivo(ticker: str) -> str:
+    return re.sub(r"[^A-Za-z0-9]", "_", ticker)
+
+
+def _base(ticker: str) -> Path:
+    return DIRETORIO_DADOS / PROVEDOR.nome / _nome_arquivo(ticker)
+
+
+def _caminhos(ticker: str) -> tuple[Path, Path]:
+    base = _base(ticker)
+    return base.with_suffix(".parquet"), base.with_suffix(".json")
+
+
+def caminho_derivado(ticker: str, sufixo: str) -> Path:
+    """Arquivo de dados derivados do histórico de `ticker`, gravado ao lado do Parquet."""
+    return _base(ticker).with_name(_base(ticker).name + sufixo)
+
+
+def _trava(ticker: str) -> threading.Lock:
+    with _trava_global:
+        return _travas.setdefault(ticker, threading.Lock())
+
+
+def _ler_metadados(ticker: str) -> dict:
+    _, caminho_meta = _caminhos(ticker)
+    try:
+        return json.loads(caminho_meta.read_text())
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def gravar_atomico(caminho: Path, escrever) -> None:
+    """Chama `escrever(temporario)` e troca `caminho` pelo resultado com os.replace.
+
+    Leitores concorrentes nunca veem um arquivo pela metade; o temporário tem
+    pid e thread no nome, então escritas simultâneas não se atrapalham.
+    Usado também pelos dados derivados (indicadores, alertas).
+    """
+    temporario = caminho.with_name(caminho.name + f".{os.getpid()}.{threading.get_ident()}.tmp")
+    escrever(temporario)
+    os.replace(temporario, caminho)
+
+
+def _ler_armazenado(ticker: str) -> pd.DataFrame | None:
+    caminho, _ = _caminhos(ticker)
+    try:
+        mtime = caminho.stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+    em_memoria = _memoria.get(ticker)
+    if em_memoria is not None and em_memoria[0] == mtime:
+        return em_memoria[1]
+    df = pd.read_parquet(caminho)
+    _memoria[ticker] = (mtime, df)
+    return df
+
+
+def _normalizar(data: pd.DataFrame) -> pd.DataFrame:
+    data = data.reindex(columns=COLUNAS).dropna(subset=["Close"])
+    data.index = pd.DatetimeIndex(data.index).tz_localize(None).normalize()
+    data.index.name = "Date"
+    return data[~data.index.duplicated(keep="last")].sort_index().astype("float64")
+
+
+def mesclar(ticker: str, novos: pd.DataFrame, inicio: date | None = None) -> pd.DataFrame:
+    """Incorpora candles novos ao arquivo do ticker e retorna o histórico completo."""
+    caminho, caminho_meta = _caminhos(ticker)
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    armazenado = _ler_armazenado(ticker)
+    novos = _normalizar(novos)
+    if armazenado is None or armazenado.empty:
+        completo = novos
+    elif novos.empty:
+        completo = armazenado
+    else:
+        # O último candle armazenado é substituído pelo baixado, que pode ter
+        # sido fechado depois da gravação anterior.
+        antigos = armazenado[~armazenado.index.isin(novos.index)]
+        completo = pd.concat([antigos, novos]).sort_index()
+    meta = _ler_metadados(ticker)
+    if inicio is not None:
+        anterior = meta.get("inicio")
+        meta["inicio"] = min(inicio.isoformat(), anterior) if anterior else inicio.isoformat()
+    meta["atualizado_em"] = time.time()
+    gravar_atomico(caminho, lambda p: completo.to_parquet(p))
+    gravar_atomico(_base(ticker).with_suffix(".npy"), lambda p: _gravar_matriz(p, completo))
+    gravar_atomico(caminho_meta, lambda p: p.write_text(json.dumps(meta)))
+    return completo
+
+
+def _gravar_matriz(caminho: Path, completo: pd.DataFrame) -> None:
+    # Primeira coluna: dias desde 1970 (exato em float64); as demais seguem
+    # COLUNAS_COMPARTILHADAS. Um único arquivo mantém datas e preços sempre
+    # consistentes entre si durante a troca atômica.
+    limpo = completo.dropna(subset=["Close"])
+    matriz = np.empty((len(limpo), 1 + len(COLUNAS_COMPARTILHADAS)))
+    matriz[:, 0] = limpo.index.asi8 // _NS_POR_DIA
+    matriz[:, 1:5] = limpo[["Open", "High", "Low", "Close"]].to_numpy()
+    matriz[:, 5] = limpo["Close"].pct_change().to_numpy()
+    with open(caminho, "wb") as arquivo:
+        np.save(arquivo, matriz)
+
+
+def _inicio_download(armazenado: pd.DataFrame | None, meta: dict, inicio: date) -> date:
+    coberto = meta.get("inicio")
+    if armazenado is None or armazenado.empty or coberto is None or inicio < date.fromisoformat(coberto):
+        return inicio
+    return armazenado.index[-1].date()
+
+
+def _voo_unico(ticker: str, inicio: date, funcao):
+    """Executa `funcao` uma vez por (ticker, inicio) em andamento; os demais esperam o mesmo resultado."""
+    chave = (ticker, inicio)
+    with _trava_global:
+        voo = _voos.get(chave)
+        lider = voo is None
+        if lider:
+            voo = _voos[chave] = Future()
+    if not lider:
+        return voo.result()
+    try:
+        voo.set_result(funcao())
+    except BaseException as erro:
+        voo.set_exception(erro)
+    finally:
+        with _trava_global:
+            del _voos[chave]
+    return voo.result()
+
+
+def _em_andamento(ticker: str) -> bool:
+    with _trava_global:
+        return any(chave[0] == ticker for chave in _voos)
+
+
+def _vencido(meta: dict, ttl: int) -> bool:
+    return time.time() - meta.get("atualizado_em", 0) > ttl
+
+
+def _coberto(armazenado: pd.DataFrame | None, meta: dict, inicio: date) -> bool:
+    coberto = meta.get("inicio")
+    return armazenado is not None and bool(coberto) and date.fromisoformat(coberto) <= inicio
+
+
+def _baixar(ticker: str, inicio: date, ttl: int) -> pd.DataFrame:
+    with _trava(ticker):
+        armazenado = _ler_armazenado(ticker)
+        meta = _ler_metadados(ticker)
+        # Outro pedido pode ter atualizado o arquivo enquanto este esperava a trava.
+        if _coberto(armazenado, meta, inicio) and not _vencido(meta, ttl):
+            return armazenado
+        try:
+            novos = PROVEDOR.baixar([ticker], _inicio_download(armazenado, meta, inicio)).get(ticker)
+        except Exception:
+            novos = None
+        novos = _normalizar(novos if novos is not None else pd.DataFrame(columns=COLUNAS))
+        if novos.empty:
+            # Falha de rede ou ticker sem dados: serve o que houver e tenta de
+            # novo depois de ESPERA_APOS_FALHA.
+            _falhas[ticker] = time.time()
+            return armazenado if armazenado is not None else novos
+        _falhas.pop(ticker, None)
+        return mesclar(ticker, novos, inicio)
+
+
+def _revalidar(ticker: str, inicio: date, ttl: int) -> None:
+    if _em_andamento(ticker) or time.time() - _falhas.get(ticker, 0) < ESPERA_APOS_FALHA:
+        return
+    _revalidacao.submit(_voo_unico, ticker, inicio, lambda: _baixar(ticker, inicio, ttl))
+
+
+def atualizar(ticker: str, inicio: date = INICIO_HISTORICO, ttl: int = TTL_HISTORICO,
+              esperar: bool = False) -> pd.DataFrame:
+    """Histórico completo do ticker, baixando apenas o trecho que falta.
+
+    Arquivo vencido que já cobre `inicio` é devolvido na hora e atualizado em
+    segundo plano; com `esperar=True` (ou sem dados) a leitura espera o download.
+    """
+    armazenado = _ler_armazenado(ticker)
+    meta = _ler_metadados(ticker)
+    if _coberto(armazenado, meta, inicio):
+        if not _vencido(meta, ttl):
+            return armazenado
+        if not esperar:
+            _revalidar(ticker, inicio, ttl)
+            return armazenado
+    return _voo_unico(ticker, inicio, lambda: _baixar(ticker, inicio, ttl))
+
+
+@dataclass
+class Frescor:
+    ultimo_candle: pd.Timestamp | None
+    atualizado_em: float | None     # epoch da última gravação
+    vencido: bool
+    atualizando: bool
+    falhou_em: float | None         # última tentativa sem dados novos
+
+    @property
+    def idade(self) -> float | None:
+        """Segundos desde a última gravação."""
+        return time.time() - self.atualizado_em if self.atualizado_em else None
+
+    def descricao(self) -> str:
+        if self.ultimo_candle is None:
+            return "Sem dados armazenados"
+        texto = f"Último candle {self.ultimo_candle:%d/%m/%Y}"
+        if self.idade is not None:
+            minutos = int(self.idade // 60)
+            texto += f", atualizado há {minutos // 60} h {minutos % 60:02d} min" if minutos >= 60 else f", atualizado há {minutos} min"
+        if self.atualizando:
+            texto += " (atualizando em segundo plano)"
+        elif self.falhou_em is not None:
+            texto += " (falha na última atualização; usando dados salvos)"
+        return texto
+
+
+def frescor(ticker: str, ttl: int = TTL_HISTORICO) -> Frescor:
+    """Idade e estado de atualização do histórico armazenado de `ticker`."""
+    armazenado = _ler_armazenado(ticker)
+    meta = _ler_metadados(ticker)
+    return Frescor(
+        ultimo_candle=armazenado.index[-1] if armazenado is not None and not armazenado.empty else None,
+        atualizado_em=meta.get("atualizado_em"),
+        vencido=_vencido(meta, ttl),
+        atualizando=_em_andamento(ticker),
+        falhou_em=_falhas.get(ticker),
+    )
+
+
+def carregar_historico(ticker: str, inicio: date = INICIO_HISTORICO, fim: date | None = None) -> pd.DataFrame:
+    """Histórico OHLCV de `ticker` entre `inicio` (inclusivo) e `fim` (exclusivo)."""
+    inicio = pd.Timestamp(inicio).date()
+    completo = atualizar(ticker, inicio)
+    selecao = completo.loc[pd.Timestamp(inicio):]
+    if fim is not None:
+        selecao = selecao.loc[selecao.index < pd.Timestamp(fim)]
+    return selecao.copy()
+
+
+def aquecer(tickers: list[str], inicio: date = INICIO_HISTORICO, ttl: int = TTL_HISTORICO) -> list[str]:
+    """Atualiza todos os tickers vencidos com um único download multi-ticker.
+
+    Retorna os tickers que receberam candles novos.
+    """
+    pendentes = {}
+    for ticker in dict.fromkeys(tickers):
+        meta = _ler_metadados(ticker)
+        if _em_andamento(ticker):
+            continue
+        if _vencido(meta, ttl) or not meta.get("inicio"):
+            pendentes[ticker] = _inicio_download(_ler_armazenado(ticker), meta, inicio)
+    if not pendentes:
+        return []
+    try:
+        baixados = PROVEDOR.baixar(list(pendentes), min(pendentes.values()))
+    except Exception:
+        return []
+    atualizados = []
+    for ticker, novos in baixados.items():
+        novos = _normalizar(novos)
+        if novos.empty:
+            continue
+        with _trava(ticker):
+            mesclar(ticker, novos, inicio)
+        _falhas.pop(ticker, None)
+        atualizados.append(ticker)
+    return atualizados
+
+
+def matriz_compartilhada(ticker: str) -> np.ndarray:
+    """Matriz (n, 6) somente leitura mapeada do disco: dias desde 1970 e COLUNAS_COMPARTILHADAS."""
+    completo = atualizar(ticker)
+    caminho = _base(ticker).with_suffix(".npy")
+    if not caminho.exists():
+        if completo.empty:
+            return np.empty((0, 1 + len(COLUNAS_COMPARTILHADAS)))
+        # Armazenamento gravado antes da existência das matrizes.
+        with _trava(ticker):
+            gravar_atomico(caminho, lambda p: _gravar_matriz(p, completo))
+    mtime = caminho.stat().st_mtime_ns
+    mapa = _mapas.get(ticker)
+    if mapa is None or mapa[0] != mtime:
+        # Arquivos substituídos continuam válidos para quem já os mapeou.
+        mapa = (mtime, np.load(caminho, mmap_mode="r"))
+        _mapas[ticker] = mapa
+    return mapa[1]
+
+
+def precos_compartilhados(ticker: str) -> pd.DataFrame:
+    """DataFrame sem cópia sobre a matriz mapeada (só o índice de datas é alocado).
+
+    Os valores são somente leitura; quem precisar alterar colunas deve usar
+    `carregar_historico` ou fazer `.copy()`.
+    """
+    matriz = matriz_compartilhada(ticker)
+    datas = pd.DatetimeIndex(matriz[:, 0].astype("int64") * _NS_POR_DIA, name="Date")
+    return pd.DataFrame(matriz[:, 1:], index=datas, columns=COLUNAS_COMPARTILHADAS, copy=False)
@@ -0,0 +1,102 @@
+# Fachada de importações preguiçosas para as páginas.
+# matplotlib, seaborn, plotly, scipy e statsmodels só são importados no primeiro
+# uso de um atributo, então trocar de página não paga por bibliotecas que ela
+# não chega a desenhar. Uso nas páginas:
+#     from importacoes import go, plt, sns
+#
+# Relatório de tempo de importação por página (sai com código 1 se alguma
+# página passar do orçamento):
+#     python importacoes.py
+
+import ast
+import importlib
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ORCAMENTO_IMPORTACAO_MS = float(os.environ.get("IMPACTO_ORCAMENTO_IMPORTACAO_MS", 250))
+
+
+class Preguicoso:
+    """Representa `modulo` (ou `modulo.atributo`) e só o importa no primeiro acesso."""
+
+    def __init__(self, modulo: str, atributo: str | None = None):
+        self._modulo = modulo
+        self._atributo = atributo
+        self._alvo = None
+
+    def _resolver(self):
+        if self._alvo is None:
+            alvo = importlib.import_module(self._modulo)
+            self._alvo = getattr(alvo, self._atributo) if self._atributo else alvo
+        return self._alvo
+
+    def __getattr__(self, nome):
+        return getattr(self._resolver(), nome)
+
+    def __call__(self, *args, **kwargs):
+        return self._resolver()(*args, **kwargs)
+
+    def __repr__(self):
+        nome = f"{self._modulo}.{self._atributo}" if self._atributo else self._modulo
+        return f"<preguiçoso {nome}{' (carregado)' if self._alvo is not None else ''}>"
+
+
+go = Preguicoso("plotly.graph_objs")
+px = Preguicoso("plotly.express")
+make_subplots = Preguicoso("plotly.subplots", "make_subplots")
+plt = Preguicoso("matplotlib.pyplot")
+sns = Preguicoso("seaborn")
+stats = Preguicoso("scipy.stats")
+norm = Preguicoso("scipy.stats", "norm")
+ndtr = Preguicoso("scipy.special", "ndtr")
+seasonal_decompose = Preguicoso("statsmodels.tsa.seasonal", "seasonal_decompose")
+acf = Preguicoso("statsmodels.tsa.stattools", "acf")
+ARIMA = Preguicoso("statsmodels.tsa.arima.model", "ARIMA")
+
+
+# ---------------------------------------------------------------------------
+# Relatório de tempo de importação
+# ---------------------------------------------------------------------------
+
+RAIZ = Path(__file__).parent
+
+_MEDIDOR = """
+import sys, time
+sys.path.insert(0, {raiz!r})
+# Já carregados em qualquer servidor em execução; ficam fora da medição.
+import streamlit, numpy, pandas
+inicio = time.perf_counter()
+{importacoes}
+print((time.perf_counter() - inicio) * 1000)
+"""
+
+
+def importacoes_de_topo(caminho: Path) -> str:
+    """Comandos import/from-import no nível de módulo da página."""
+    arvore = ast.parse(caminho.read_text(encoding="utf-8"))
+    return "\n".join(ast.unparse(no) for no in arvore.body if isinstance(no, (ast.Import, ast.ImportFrom)))
+
+
+def medir_pagina(caminho: Path) -> float:
+    """Milissegundos gastos nas importações de topo de `caminho`, em processo novo."""
+    codigo = _MEDIDOR.format(raiz=str(RAIZ), importacoes=importacoes_de_topo(caminho))
+    saida = subprocess.run([sys.executable, "-c", codigo], cwd=RAIZ, capture_output=True, text=True, check=True)
+    return float(saida.stdout.strip().splitlines()[-1])
+
+
+def relatorio() -> list[tuple[str, float]]:
+    paginas = [RAIZ / "Painel.py"] + sorted((RAIZ / "pages").glob("*.py"))
+    return [(pagina.name, medir_pagina(pagina)) for pagina in paginas]
+
+
+if __name__ == "__main__":
+    resultados = relatorio()
+    estouros = 0
+    for nome, ms in sorted(resultados, key=lambda r: -r[1]):
+        marca = "  ACIMA DO ORÇAMENTO" if ms > ORCAMENTO_IMPORTACAO_MS else ""
+        estouros += bool(marca)
+        print(f"{ms:8.1f} ms  {nome}{marca}")
+    print(f"Orçamento: {ORCAMENTO_IMPORTACAO_MS:.0f} ms por página; {estouros} acima.")
+    sys.exit(1 if estouros else 0)
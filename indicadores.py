@@ -0,0 +1,140 @@
+# Indicadores técnicos da página Mercado (EWMA, CCI, estocástico lento,
+# Bandas de Bollinger, MACD e RSI), calculados todos de uma vez sobre o
+# histórico completo do ticker e guardados por ticker e último candle: trocar
+# de indicador ou de intervalo de datas só recorta o resultado.
+#
+# Médias e desvios móveis usam somas acumuladas (O(n), contando NaNs para ter
+# a mesma semântica de `rolling(janela)` do pandas); mínimos, máximos e o
+# desvio médio absoluto do CCI usam sliding_window_view; as médias exponenciais
+# ficam no `ewm` do pandas, que já é vetorizado.
+
+from datetime import date
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from historico import INICIO_HISTORICO, carregar_historico
+
+
+def _preencher(valores: np.ndarray, n: int) -> np.ndarray:
+    """Resultado de janelas completas alinhado ao fim da série (NaN no início)."""
+    saida = np.full(n, np.nan)
+    saida[n - len(valores):] = valores
+    return saida
+
+
+def _somas_moveis(valores: np.ndarray, janela: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Soma, soma dos quadrados e quantidade de NaNs em cada janela completa."""
+    nulos = np.isnan(valores)
+    limpos = np.where(nulos, 0.0, valores)
+    acumulados = [np.concatenate(([0.0], np.cumsum(x))) for x in (limpos, limpos ** 2, nulos)]
+    return tuple(a[janela:] - a[:-janela] for a in acumulados)
+
+
+def media_movel(valores, janela: int) -> np.ndarray:
+    valores = np.asarray(valores, dtype=float)
+    if len(valores) < janela:
+        return np.full(len(valores), np.nan)
+    soma, _, nulos = _somas_moveis(valores, janela)
+    return _preencher(np.where(nulos > 0, np.nan, soma / janela), len(valores))
+
+
+def desvio_movel(valores, janela: int) -> np.ndarray:
+    """Desvio padrão amostral (ddof=1) móvel."""
+    valores = np.asarray(valores, dtype=float)
+    if len(valores) < janela:
+        return np.full(len(valores), np.nan)
+    # Centrar na média global reduz o cancelamento em soma dos quadrados − soma²/n.
+    centrados = valores - np.nanmean(valores)
+    soma, quadrados, nulos = _somas_moveis(centrados, janela)
+    variancia = np.maximum((quadrados - soma ** 2 / janela) / (janela - 1), 0)
+    return _preencher(np.where(nulos > 0, np.nan, np.sqrt(variancia)), len(valores))
+
+
+def _janelas(valores, janela: int) -> np.ndarray | None:
+    valores = np.asarray(valores, dtype=float)
+    return sliding_window_view(valores, janela) if len(valores) >= janela else None
+
+
+def minimo_movel(valores, janela: int) -> np.ndarray:
+    janelas = _janelas(valores, janela)
+    return _preencher(janelas.min(axis=1), len(valores)) if janelas is not None else np.full(len(valores), np.nan)
+
+
+def maximo_movel(valores, janela: int) -> np.ndarray:
+    janelas = _janelas(valores, janela)
+    return _preencher(janelas.max(axis=1), len(valores)) if janelas is not None else np.full(len(valores), np.nan)
+
+
+def cci(high, low, close, janela: int = 20) -> np.ndarray:
+    tipico = (np.asarray(high, dtype=float) + np.asarray(low, dtype=float) + np.asarray(close, dtype=float)) / 3
+    janelas = _janelas(tipico, janela)
+    if janelas is None:
+        return np.full(len(tipico), np.nan)
+    medias = janelas.mean(axis=1)
+    desvio_medio = np.abs(janelas - medias[:, None]).mean(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return _preencher((tipico[janela - 1:] - medias) / (0.015 * desvio_medio), len(tipico))
+
+
+def estocastico_lento(high, low, close, janela: int = 14, suavizacao: int = 3) -> np.ndarray:
+    minimos, maximos = minimo_movel(low, janela), maximo_movel(high, janela)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rapido = (np.asarray(close, dtype=float) - minimos) / (maximos - minimos) * 100
+    return media_movel(rapido, suavizacao)
+
+
+def rsi(close, janela: int = 14) -> np.ndarray:
+    delta = np.diff(np.asarray(close, dtype=float), prepend=np.nan)
+    # Como em `delta.where(delta > 0, 0)`: o primeiro delta (NaN) conta como zero.
+    ganho = media_movel(np.where(delta > 0, delta, 0.0), janela)
+    perda = media_movel(np.where(delta < 0, -delta, 0.0), janela)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return 100 - 100 / (1 + ganho / perda)
+
+
+def calcular_indicadores(data: pd.DataFrame, janela_bollinger: int = 20, desvios_bollinger: float = 2,
+                         span_ewma: int = 20) -> pd.DataFrame:
+    """Todos os indicadores da página Mercado numa passada sobre o OHLC de `data`."""
+    saida = data[["Open", "High", "Low", "Close"]].copy()
+    high, low, close = (saida[c].to_numpy(dtype=float) for c in ("High", "Low", "Close"))
+
+    retornos = saida["Close"].pct_change()
+    saida["Daily Returns"] = retornos
+    saida["Abs Daily Returns"] = retornos.abs() * 100
+    saida["EWMA Volatility"] = retornos.ewm(span=span_ewma).std() * 100
+
+    saida["CCI"] = cci(high, low, close)
+    saida["Estocástico"] = estocastico_lento(high, low, close)
+
+    media = media_movel(close, janela_bollinger)
+    desvio = desvio_movel(close, janela_bollinger)
+    saida["Bollinger High"] = media + desvios_bollinger * desvio
+    saida["Bollinger Low"] = media - desvios_bollinger * desvio
+
+    curta = saida["Close"].ewm(span=12, min_periods=1, adjust=False).mean()
+    longa = saida["Close"].ewm(span=26, min_periods=1, adjust=False).mean()
+    saida["MACD"] = curta - longa
+    saida["Signal Line"] = saida["MACD"].ewm(span=9, min_periods=1, adjust=False).mean()
+    saida["Histograma"] = saida["MACD"] - saida["Signal Line"]
+
+    saida["RSI"] = rsi(close)
+    return saida
+
+
+@lru_cache(maxsize=16)
+def _indicadores(ticker: str, inicio: date, ate: pd.Timestamp, linhas: int) -> pd.DataFrame:
+    return calcular_indicadores(carregar_historico(ticker, inicio))
+
+
+def indicadores(ticker: str, inicio: date = INICIO_HISTORICO) -> pd.DataFrame:
+    """Indicadores de `ticker` desde `inicio`, recalculados só quando chegam candles novos.
+
+    O DataFrame é compartilhado entre sessões: recorte com .loc/.copy() antes de alterar.
+    """
+    historico = carregar_historico(ticker, inicio)
+    if historico.empty:
+        return calcular_indicadores(historico)
+    return _indicadores(ticker, inicio, historico.index[-1], len(historico))
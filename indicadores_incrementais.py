@@ -0,0 +1,396 @@
+# Indicadores da página Mercado em forma incremental: cada objeto guarda o seu
+# estado e incorpora um candle novo em tempo constante, sem recalcular o
+# histórico. Os resultados reproduzem os de indicadores.py (lote).
+#
+# - EWMA e MACD: recorrência das médias exponenciais do pandas (pesos ajustados
+#   e correção de viés do `ewm().std()`, sem ajuste no MACD);
+# - RSI: somas de ganhos e perdas numa janela circular;
+# - Bollinger: Welford com entrada e saída de elementos da janela;
+# - Estocástico: mínimo e máximo móveis com deques monotônicas;
+# - CCI: soma móvel para a média; o desvio médio absoluto é refeito sobre a
+#   janela (O(janela) por candle, constante em relação ao histórico), pois
+#   não admite atualização exata em O(1).
+#
+# O estado é gravado ao lado do histórico do ticker (<ticker>.indicadores.json)
+# e `sincronizar` só aplica os candles posteriores ao ponto gravado, sem
+# recalcular o lote. A equivalência com o lote é conferida fora do caminho da
+# página, no histórico inteiro:
+#
+#     python indicadores_incrementais.py [TICKER ...]   # verifica contra o lote
+
+import copy
+import json
+import math
+import sys
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from historico import gravar_atomico, caminho_derivado, carregar_historico
+from indicadores import calcular_indicadores
+
+TOLERANCIA = 1e-8
+VERSAO_ESTADO = 1
+NAN = float("nan")
+
+
+class _Janela:
+    """Últimos `tamanho` valores com soma corrente."""
+
+    def __init__(self, tamanho: int):
+        self.valores = deque(maxlen=tamanho)
+        self.soma = 0.0
+        self.nulos = 0
+
+    @property
+    def cheia(self) -> bool:
+        return len(self.valores) == self.valores.maxlen
+
+    def adicionar(self, x: float) -> float | None:
+        """Inclui `x` e devolve o valor que saiu da janela (None se não saiu nenhum)."""
+        saiu = self.valores[0] if self.cheia else None
+        if saiu is not None:
+            if math.isnan(saiu):
+                self.nulos -= 1
+            else:
+                self.soma -= saiu
+        self.valores.append(x)
+        if math.isnan(x):
+            self.nulos += 1
+        else:
+            self.soma += x
+        return saiu
+
+    def media(self) -> float:
+        return self.soma / len(self.valores) if self.cheia and not self.nulos else NAN
+
+
+class Incremental:
+    """Base: `atualizar` recebe um candle (high, low, close) e devolve as colunas do indicador."""
+
+    colunas: tuple[str, ...] = ()
+
+    def atualizar(self, high: float, low: float, close: float) -> dict[str, float]:
+        raise NotImplementedError
+
+    def estado(self) -> dict:
+        estado = {}
+        for nome, valor in vars(self).items():
+            if isinstance(valor, _Janela):
+                valor = {"valores": list(valor.valores), "tamanho": valor.valores.maxlen, "soma": valor.soma}
+            elif isinstance(valor, deque):
+                valor = {"deque": [list(x) for x in valor]}
+            estado[nome] = valor
+        return estado
+
+    @classmethod
+    def de_estado(cls, estado: dict) -> "Incremental":
+        objeto = cls.__new__(cls)
+        for nome, valor in estado.items():
+            if isinstance(valor, dict) and "tamanho" in valor:
+                janela = _Janela(valor["tamanho"])
+                janela.valores.extend(valor["valores"])
+                janela.soma = valor["soma"]
+                janela.nulos = sum(math.isnan(x) for x in janela.valores)
+                valor = janela
+            elif isinstance(valor, dict) and "deque" in valor:
+                valor = deque(tuple(x) for x in valor["deque"])
+            setattr(objeto, nome, valor)
+        return objeto
+
+
+class VolatilidadeEWMA(Incremental):
+    """`pct_change().ewm(span).std() * 100` (pesos ajustados, sem viés)."""
+
+    colunas = ("Daily Returns", "EWMA Volatility")
+
+    def __init__(self, span: int = 20):
+        self.fator = 1 - 2 / (span + 1)
+        self.ultimo_close = NAN
+        self.media = NAN
+        self.cov = 0.0
+        self.soma_pesos = 1.0
+        self.soma_pesos2 = 1.0
+        self.peso_antigo = 1.0
+        self.observacoes = 0
+
+    def atualizar(self, high, low, close):
+        retorno = close / self.ultimo_close - 1 if not math.isnan(self.ultimo_close) else NAN
+        self.ultimo_close = close
+        observado = not math.isnan(retorno)
+        self.observacoes += observado
+        if not math.isnan(self.media):
+            self.soma_pesos *= self.fator
+            self.soma_pesos2 *= self.fator * self.fator
+            self.peso_antigo *= self.fator
+            if observado:
+                media_antiga = self.media
+                if self.media != retorno:
+                    self.media = (self.peso_antigo * media_antiga + retorno) / (self.peso_antigo + 1)
+                self.cov = (self.peso_antigo * (self.cov + (media_antiga - self.media) ** 2)
+                            + (retorno - self.media) ** 2) / (self.peso_antigo + 1)
+                self.soma_pesos += 1
+                self.soma_pesos2 += 1
+                self.peso_antigo += 1
+        elif observado:
+            self.media = retorno
+        numerador = self.soma_pesos * self.soma_pesos
+        denominador = numerador - self.soma_pesos2
+        vol = math.sqrt(numerador / denominador * self.cov) * 100 if self.observacoes and denominador > 0 else NAN
+        return {"Daily Returns": retorno, "EWMA Volatility": vol}
+
+
+def _ema(anterior: float, x: float, alfa: float) -> float:
+    # Mesma aritmética do ewm(adjust=False) do pandas.
+    if math.isnan(anterior):
+        return x
+    return ((1 - alfa) * anterior + alfa * x) / ((1 - alfa) + alfa) if anterior != x else anterior
+
+
+class MACD(Incremental):
+    colunas = ("MACD", "Signal Line", "Histograma")
+
+    def __init__(self, curta: int = 12, longa: int = 26, sinal: int = 9):
+        self.alfas = (2 / (curta + 1), 2 / (longa + 1), 2 / (sinal + 1))
+        self.curta = self.longa = self.sinal = NAN
+
+    def atualizar(self, high, low, close):
+        alfa_curta, alfa_longa, alfa_sinal = self.alfas
+        self.curta = _ema(self.curta, close, alfa_curta)
+        self.longa = _ema(self.longa, close, alfa_longa)
+        macd = self.curta - self.longa
+        self.sinal = _ema(self.sinal, macd, alfa_sinal)
+        return {"MACD": macd, "Signal Line": self.sinal, "Histograma": macd - self.sinal}
+
+
+class RSI(Incremental):
+    colunas = ("RSI",)
+
+    def __init__(self, janela: int = 14):
+        self.ultimo_close = NAN
+        self.ganhos = _Janela(janela)
+        self.perdas = _Janela(janela)
+
+    def atualizar(self, high, low, close):
+        delta = close - self.ultimo_close
+        self.ultimo_close = close
+        # Como no lote, o primeiro delta (NaN) conta como zero.
+        self.ganhos.adicionar(delta if delta > 0 else 0.0)
+        self.perdas.adicionar(-delta if delta < 0 else 0.0)
+        ganho, perda = self.ganhos.media(), self.perdas.media()
+        if math.isnan(ganho):
+            return {"RSI": NAN}
+        if perda == 0:
+            return {"RSI": 100.0 if ganho > 0 else NAN}
+        return {"RSI": 100 - 100 / (1 + ganho / perda)}
+
+
+class Bollinger(Incremental):
+    colunas = ("Bollinger High", "Bollinger Low")
+
+    def __init__(self, janela: int = 20, desvios: float = 2):
+        self.desvios = desvios
+        self.janela = _Janela(janela)
+        self.media = 0.0
+        self.m2 = 0.0
+
+    def atualizar(self, high, low, close):
+        # Welford: entra `close`, sai o valor mais antigo da janela.
+        saiu = self.janela.adicionar(close)
+        n = len(self.janela.valores)
+        if saiu is not None:
+            delta = saiu - self.media
+            self.media -= delta / (n - 1)
+            self.m2 -= delta * (saiu - self.media)
+        delta = close - self.media
+        self.media += delta / n
+        self.m2 += delta * (close - self.media)
+        if not self.janela.cheia:
+            return {"Bollinger High": NAN, "Bollinger Low": NAN}
+        desvio = math.sqrt(max(self.m2, 0.0) / (n - 1))
+        return {"Bollinger High": self.media + self.desvios * desvio, "Bollinger Low": self.media - self.desvios * desvio}
+
+
+class Estocastico(Incremental):
+    """Estocástico lento: %K sobre mínimo/máximo móveis (deques monotônicas), suavizado."""
+
+    colunas = ("Estocástico",)
+
+    def __init__(self, janela: int = 14, suavizacao: int = 3):
+        self.tamanho = janela
+        self.indice = -1
+        self.minimos = deque()     # (índice, low) com lows crescentes
+        self.maximos = deque()     # (índice, high) com highs decrescentes
+        self.k = _Janela(suavizacao)
+
+    def atualizar(self, high, low, close):
+        self.indice += 1
+        while self.minimos and self.minimos[-1][1] >= low:
+            self.minimos.pop()
+        self.minimos.append((self.indice, low))
+        while self.maximos and self.maximos[-1][1] <= high:
+            self.maximos.pop()
+        self.maximos.append((self.indice, high))
+        inicio = self.indice - self.tamanho + 1
+        while self.minimos[0][0] < inicio:
+            self.minimos.popleft()
+        while self.maximos[0][0] < inicio:
+            self.maximos.popleft()
+        k = NAN
+        if inicio >= 0:
+            minimo, maximo = self.minimos[0][1], self.maximos[0][1]
+            k = (close - minimo) / (maximo - minimo) * 100 if maximo != minimo else NAN
+        self.k.adicionar(k)
+        return {"Estocástico": self.k.media()}
+
+
+class CCI(Incremental):
+    colunas = ("CCI",)
+
+    def __init__(self, janela: int = 20):
+        self.tipicos = _Janela(janela)
+
+    def atualizar(self, high, low, close):
+        tipico = (high + low + close) / 3
+        self.tipicos.adicionar(tipico)
+        if not self.tipicos.cheia:
+            return {"CCI": NAN}
+        valores = np.fromiter(self.tipicos.valores, float, len(self.tipicos.valores))
+        media = valores.mean()
+        desvio_medio = np.abs(valores - media).mean()
+        return {"CCI": (tipico - media) / (0.015 * desvio_medio) if desvio_medio else NAN}
+
+
+INDICADORES = {
+    "EWMA": VolatilidadeEWMA,
+    "MACD": MACD,
+    "RSI": RSI,
+    "Bandas de Bollinger": Bollinger,
+    "Estocástico": Estocastico,
+    "CCI": CCI,
+}
+
+
+class IndicadoresIncrementais:
+    """Os seis indicadores da página Mercado, com os parâmetros de `calcular_indicadores`."""
+
+    def __init__(self):
+        self.indicadores = {nome: classe() for nome, classe in INDICADORES.items()}
+        self.ultima_data: pd.Timestamp | None = None
+        self.ultimo_candle: tuple[float, float, float] | None = None
+        self.valores: dict[str, float] = {}
+
+    def atualizar(self, data, high: float, low: float, close: float) -> dict[str, float]:
+        valores = {}
+        for indicador in self.indicadores.values():
+            valores.update(indicador.atualizar(float(high), float(low), float(close)))
+        self.ultima_data = pd.Timestamp(data)
+        self.ultimo_candle = (float(high), float(low), float(close))
+        self.valores = valores
+        return valores
+
+    def previa(self, high: float, low: float, close: float) -> dict[str, float]:
+        """Valores com um candle provisório (intradiário), sem alterar o estado."""
+        return copy.deepcopy(self).atualizar(self.ultima_data, high, low, close)
+
+    def aplicar(self, historico: pd.DataFrame) -> pd.DataFrame:
+        """Aplica os candles de `historico` posteriores ao último processado; devolve os valores de cada um."""
+        if self.ultima_data is not None:
+            historico = historico.loc[historico.index > self.ultima_data]
+        linhas = [self.atualizar(data, h, l, c) for data, h, l, c in
+                  zip(historico.index, historico["High"], historico["Low"], historico["Close"])]
+        return pd.DataFrame(linhas, index=historico.index)
+
+    def estado(self) -> dict:
+        return {
+            "versao": VERSAO_ESTADO,
+            "ultima_data": self.ultima_data.isoformat() if self.ultima_data is not None else None,
+            "ultimo_candle": self.ultimo_candle,
+            "valores": self.valores,
+            "indicadores": {nome: indicador.estado() for nome, indicador in self.indicadores.items()},
+        }
+
+    @classmethod
+    def de_estado(cls, estado: dict) -> "IndicadoresIncrementais":
+        if estado.get("versao") != VERSAO_ESTADO:
+            raise ValueError("Versão de estado incompatível")
+        objeto = cls.__new__(cls)
+        objeto.indicadores = {nome: INDICADORES[nome].de_estado(e) for nome, e in estado["indicadores"].items()}
+        objeto.ultima_data = pd.Timestamp(estado["ultima_data"]) if estado["ultima_data"] else None
+        objeto.ultimo_candle = tuple(estado["ultimo_candle"]) if estado["ultimo_candle"] else None
+        objeto.valores = estado["valores"]
+        return objeto
+
+
+# ---------------------------------------------------------------------------
+# Checkpoint ao lado do histórico e verificação contra o lote
+# ---------------------------------------------------------------------------
+
+def _caminho(ticker: str):
+    return caminho_derivado(ticker, ".indicadores.json")
+
+
+def carregar_estado(ticker: str) -> IndicadoresIncrementais | None:
+    try:
+        return IndicadoresIncrementais.de_estado(json.loads(_caminho(ticker).read_text()))
+    except (FileNotFoundError, ValueError, KeyError, TypeError):
+        return None
+
+
+def gravar_estado(ticker: str, incrementais: IndicadoresIncrementais) -> None:
+    caminho = _caminho(ticker)
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    # NaN (janelas ainda incompletas) é gravado como o literal NaN, que json.loads aceita.
+    texto = json.dumps(incrementais.estado())
+    gravar_atomico(caminho, lambda p: p.write_text(texto))
+
+
+def _diferencas(incrementais: pd.DataFrame, lote: pd.DataFrame) -> dict[str, float]:
+    diferencas = {}
+    for coluna in incrementais.columns:
+        a, b = incrementais[coluna].to_numpy(dtype=float), lote[coluna].to_numpy(dtype=float)
+        nulos = np.isnan(a) != np.isnan(b)
+        comuns = ~np.isnan(a) & ~np.isnan(b)
+        escala = np.maximum(np.abs(b[comuns]), 1.0)
+        diferencas[coluna] = math.inf if nulos.any() else float((np.abs(a[comuns] - b[comuns]) / escala).max(initial=0))
+    return diferencas
+
+
+def sincronizar(ticker: str) -> IndicadoresIncrementais:
+    """Estado dos indicadores de `ticker` atualizado até o último candle armazenado.
+
+    Só os candles novos são aplicados, em tempo constante por candle. O estado
+    é refeito do zero quando o candle já processado mudou no histórico
+    (revisão do último pregão) ou quando o checkpoint não existe ou é inválido.
+    """
+    historico = carregar_historico(ticker)
+    incrementais = carregar_estado(ticker)
+    if incrementais is not None and incrementais.ultima_data is not None:
+        processado = historico.loc[historico.index == incrementais.ultima_data, ["High", "Low", "Close"]]
+        if processado.empty or tuple(processado.iloc[0]) != incrementais.ultimo_candle:
+            incrementais = None
+    if incrementais is None:
+        incrementais = IndicadoresIncrementais()
+    novos = incrementais.aplicar(historico)
+    if len(novos):
+        gravar_estado(ticker, incrementais)
+    return incrementais
+
+
+def verificar(ticker: str) -> dict[str, float]:
+    """Maior diferença relativa, por coluna, entre a passada incremental e o lote no histórico inteiro."""
+    historico = carregar_historico(ticker)
+    incrementais = IndicadoresIncrementais().aplicar(historico)
+    return _diferencas(incrementais, calcular_indicadores(historico))
+
+
+if __name__ == "__main__":
+    tickers = sys.argv[1:] or ["SB=F", "USDBRL=X", "CL=F", "SBK26.NYB"]
+    falhou = False
+    for ticker in tickers:
+        diferencas = verificar(ticker)
+        pior = max(diferencas.values(), default=0.0)
+        falhou |= pior > TOLERANCIA
+        print(f"{ticker:10s} {'ok' if pior <= TOLERANCIA else 'DIVERGE'}  maior diferença relativa {pior:.1e}")
+    sys.exit(1 if falhou else 0)
@@ -0,0 +1,107 @@
+# Armazenamento particionado das leituras de medidores (página Less Loss).
+# A planilha de origem é importada uma vez para um diretório Parquet com uma
+# partição por dia (data=AAAA-MM-DD/), ordenada por serial_medidor para que o
+# filtro por serial use as estatísticas dos row groups. Um catálogo pequeno
+# (data, serial_medidor, leituras) alimenta os seletores da página sem ler as
+# leituras. Consultas abrem só a partição do dia pedido.
+#
+# Origens aceitas: .xlsx/.xls (lida inteira, limite do Excel) e .csv/.parquet
+# (lidas em blocos, para bases com milhões de leituras).
+
+import os
+import re
+import shutil
+import threading
+from functools import lru_cache
+from pathlib import Path
+
+import pandas as pd
+
+from historico import DIRETORIO_DADOS
+from planilhas import hash_arquivo
+
+DIRETORIO_LEITURAS = DIRETORIO_DADOS / "leituras"
+COLUNAS = ["serial_medidor", "data_hora_leitura", "Cluster"]
+TAMANHO_BLOCO = 500_000      # linhas lidas por vez de origens .csv/.parquet
+TAMANHO_ROW_GROUP = 20_000
+
+_trava = threading.Lock()
+
+
+def _versao(origem: Path) -> Path:
+    # O nome inclui a extensão: leituras.csv e leituras.xlsx são origens diferentes.
+    return DIRETORIO_LEITURAS / f"{origem.name}-{hash_arquivo(origem)[:16]}"
+
+
+def _versoes_antigas(origem: Path, atual: Path) -> list[Path]:
+    padrao = re.compile(rf"^{re.escape(origem.name)}-[0-9a-f]{{16}}$")
+    return [p for p in DIRETORIO_LEITURAS.iterdir() if padrao.match(p.name) and p != atual]
+
+
+def _blocos(origem: Path):
+    if origem.suffix in (".xlsx", ".xls"):
+        yield pd.read_excel(origem, usecols=COLUNAS)
+    elif origem.suffix == ".csv":
+        yield from pd.read_csv(origem, usecols=COLUNAS, chunksize=TAMANHO_BLOCO)
+    elif origem.suffix == ".parquet":
+        import pyarrow.parquet as pq
+        for lote in pq.ParquetFile(origem).iter_batches(batch_size=TAMANHO_BLOCO, columns=COLUNAS):
+            yield lote.to_pandas()
+    else:
+        raise ValueError(f"Formato de leituras não suportado: {origem.suffix}")
+
+
+def importar(origem) -> Path:
+    """Particiona `origem` por dia (se ainda não foi feito para este conteúdo) e retorna o diretório."""
+    origem = Path(origem)
+    destino = _versao(origem)
+    if (destino / "catalogo.parquet").exists():
+        return destino
+    with _trava:
+        if (destino / "catalogo.parquet").exists():
+            return destino
+        # Nome exclusivo por processo e thread: servidores diferentes podem importar o mesmo arquivo.
+        temporario = destino.with_name(destino.name + f".{os.getpid()}.{threading.get_ident()}.tmp")
+        shutil.rmtree(temporario, ignore_errors=True)
+        contagens = []
+        for i, bloco in enumerate(_blocos(origem)):
+            bloco["data_hora_leitura"] = pd.to_datetime(bloco["data_hora_leitura"])
+            bloco["data"] = bloco["data_hora_leitura"].dt.normalize()
+            bloco = bloco.sort_values(["data", "serial_medidor", "data_hora_leitura"])
+            for dia, parte in bloco.groupby("data", sort=False):
+                pasta = temporario / f"data={dia:%Y-%m-%d}"
+                pasta.mkdir(parents=True, exist_ok=True)
+                parte[COLUNAS].to_parquet(pasta / f"parte-{i:05d}.parquet", index=False, row_group_size=TAMANHO_ROW_GROUP)
+            contagens.append(bloco.groupby(["data", "serial_medidor"], sort=False).size().rename("leituras").reset_index())
+        catalogo = pd.concat(contagens).groupby(["data", "serial_medidor"], as_index=False)["leituras"].sum()
+        # O catálogo é gravado por último: sua presença marca a importação como completa.
+        catalogo.to_parquet(temporario / "catalogo.parquet", index=False)
+        try:
+            os.replace(temporario, destino)
+        except OSError:
+            # Outro processo terminou a mesma importação primeiro.
+            shutil.rmtree(temporario, ignore_errors=True)
+            if not (destino / "catalogo.parquet").exists():
+                raise
+        for antigo in _versoes_antigas(origem, destino):
+            shutil.rmtree(antigo, ignore_errors=True)
+    return destino
+
+
+@lru_cache(maxsize=4)
+def _ler_catalogo(diretorio: Path) -> pd.DataFrame:
+    return pd.read_parquet(diretorio / "catalogo.parquet")
+
+
+def catalogo(origem) -> pd.DataFrame:
+    """Pares (data, serial_medidor) com a quantidade de leituras de cada um."""
+    return _ler_catalogo(importar(origem))
+
+
+def consultar(origem, dia, serial) -> pd.DataFrame:
+    """Leituras de `serial` no dia `dia`, lendo apenas a partição desse dia."""
+    pasta = importar(origem) / f"data={pd.Timestamp(dia):%Y-%m-%d}"
+    if not pasta.exists():
+        return pd.DataFrame(columns=COLUNAS)
+    df = pd.read_parquet(pasta, filters=[("serial_medidor", "==", serial)])
+    return df.sort_values("data_hora_leitura", ignore_index=True)
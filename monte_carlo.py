@@ -0,0 +1,705 @@
+# Motor Monte Carlo compartilhado pelas páginas de simulação (Monte Carlo,
+# Opções, Risco e Jump Diffusion).
+#
+# As trajetórias são geradas em lotes de `tamanho_lote` caminhos; cada lote tem
+# seu próprio numpy.random.Generator derivado da semente com
+# SeedSequence.spawn, então o resultado depende só da semente e do tamanho do
+# lote. O número de caminhos fica limitado pelo tempo, não pela memória.
+# Os lotes podem rodar num pool de processos (IMPACTO_PROCESSOS_MC, padrão 1:
+# sem pool); o resultado é o mesmo para qualquer número de processos.
+# Nenhuma dependência de Streamlit: o módulo pode ser usado em scripts e
+# processos auxiliares.
+
+import itertools
+import math
+import multiprocessing
+import os
+import pickle
+import sys
+import threading
+import time
+import tracemalloc
+import types
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from functools import partial
+
+import numpy as np
+
+from black_scholes import black_scholes, probabilidade_acima
+
+TAMANHO_LOTE = 10_000
+LOTES_MINIMOS = 4   # antes de testar a precisão alvo; com Sobol cada lote é uma única amostra
+LOTES_SOBOL = 16    # lotes mínimos do Sobol com número fixo de caminhos (erro padrão entre lotes)
+
+
+# ---------------------------------------------------------------------------
+# Dinâmicas de preço
+# ---------------------------------------------------------------------------
+
+BLOCO_LINHAS = 16   # linhas de normais float64 geradas por vez no modo float32
+
+
+def normais_padrao(rng: np.random.Generator, dias: int, n: int, precisao=np.float64) -> np.ndarray:
+    """Choques N(0, 1) com formato (dias, n) no dtype `precisao`.
+
+    Em float32 os valores são os mesmos do float64 para a mesma semente (o
+    gerador preenche a matriz em sequência), gerados em blocos de BLOCO_LINHAS
+    linhas para não alocar a matriz inteira em float64.
+    """
+    if np.dtype(precisao) == np.float64:
+        return rng.standard_normal((dias, n))
+    z = np.empty((dias, n), dtype=precisao)
+    for i in range(0, dias, BLOCO_LINHAS):
+        z[i:i + BLOCO_LINHAS] = rng.standard_normal((min(BLOCO_LINHAS, dias - i), n))
+    return z
+
+
+class Dinamica:
+    """Gera um lote de trajetórias de preço com formato (dias, n)."""
+
+    def simular_lote(self, rng: np.random.Generator, s0: float, dias: int, n: int, precisao=np.float64) -> np.ndarray:
+        return self.de_normais(normais_padrao(rng, dias, n, precisao), s0)
+
+    def de_normais(self, z: np.ndarray, s0: float) -> np.ndarray:
+        """Trajetórias a partir de choques normais padrão (dias, n), reaproveitando `z`.
+        Permite antitéticas e Sobol; dinâmicas com outras fontes de ruído não implementam."""
+        raise NotImplementedError(f"{type(self).__name__} não é gerada só por choques normais")
+
+    def controle(self) -> "GBM | None":
+        """GBM guiado pelos mesmos choques, com preço fechado (variável de controle)."""
+        return None
+
+
+@dataclass
+class GBM(Dinamica):
+    """Movimento browniano geométrico com drift e volatilidade por passo."""
+
+    mu: float
+    sigma: float
+
+    @classmethod
+    def de_retornos(cls, retornos) -> "GBM":
+        """Parâmetros a partir de uma série de retornos simples diários (`Daily Return`)."""
+        return cls(float(np.nanmean(retornos)), float(np.nanstd(retornos, ddof=1)))
+
+    def de_normais(self, z, s0):
+        incrementos = z
+        incrementos *= self.sigma
+        incrementos += self.mu - 0.5 * self.sigma ** 2
+        np.cumsum(incrementos, axis=0, out=incrementos)
+        np.exp(incrementos, out=incrementos)
+        incrementos *= s0
+        return incrementos
+
+    def controle(self):
+        return self
+
+
+@dataclass
+class AritmeticoTruncado(Dinamica):
+    """Modelo histórico das páginas: retornos normais acumulados por produto,
+    com o preço limitado a [limite_inf, limite_sup]."""
+
+    media: float
+    std: float
+    limite_inf: float
+    limite_sup: float
+
+    def de_normais(self, z, s0):
+        precos = z
+        precos *= self.std
+        precos += 1 + self.media
+        np.cumprod(precos, axis=0, out=precos)
+        precos *= s0
+        return np.clip(precos, self.limite_inf, self.limite_sup, out=precos)
+
+    def controle(self):
+        # Com os mesmos choques, o GBM de mesmo drift e volatilidade acompanha de
+        # perto o produto de (1 + retorno) enquanto o preço não bate nos limites.
+        return GBM(self.media, self.std)
+
+
+@dataclass
+class Merton(Dinamica):
+    """Difusão com saltos de Merton: saltos Poisson com tamanho log-normal."""
+
+    mu: float
+    sigma: float
+    lambda_saltos: float
+    mu_salto: float
+    sigma_salto: float
+    dt: float = 1 / 252
+
+    def simular_lote(self, rng, s0, dias, n, precisao=np.float64):
+        difusao = normais_padrao(rng, dias, n, precisao)
+        difusao *= self.sigma * math.sqrt(self.dt)
+        difusao += (self.mu - 0.5 * self.sigma ** 2) * self.dt
+        saltos = rng.poisson(self.lambda_saltos * self.dt, (dias, n)).astype(precisao)
+        # Soma de k saltos N(mu, sigma²) ~ N(k·mu, k·sigma²): sem laço por salto.
+        tamanhos = normais_padrao(rng, dias, n, precisao)
+        tamanhos *= np.sqrt(saltos)
+        tamanhos *= self.sigma_salto
+        saltos *= self.mu_salto
+        difusao += saltos
+        difusao += tamanhos
+        np.cumsum(difusao, axis=0, out=difusao)
+        np.exp(difusao, out=difusao)
+        difusao *= s0
+        return difusao
+
+    def esperanca(self, s0: float, dias: int) -> float:
+        """E[S] fechado após `dias` passos: s0·exp(mu·t + lambda·t·(E[e^J] - 1))."""
+        t = dias * self.dt
+        return s0 * math.exp(self.mu * t + self.lambda_saltos * t * (math.exp(self.mu_salto + 0.5 * self.sigma_salto ** 2) - 1))
+
+    def valor_call(self, s0: float, strikes, dias: int, termos: int = 80) -> np.ndarray:
+        """E[(S - K)+] fechado (sem desconto) após `dias` passos: mistura Poisson de
+        lognormais, somando os `termos` primeiros números de saltos."""
+        t = dias * self.dt
+        strikes = np.asarray(strikes, dtype=float)
+        valor = np.zeros_like(strikes)
+        peso = math.exp(-self.lambda_saltos * t)
+        for k in range(termos):
+            variancia = self.sigma ** 2 * t + k * self.sigma_salto ** 2
+            media_log = math.log(s0) + (self.mu - 0.5 * self.sigma ** 2) * t + k * self.mu_salto
+            # Com r = 0 e T = 1, black_scholes dá F·N(d1) - K·N(d2) para a lognormal de variância `variancia`.
+            valor += peso * black_scholes(math.exp(media_log + 0.5 * variancia), strikes, 1.0, 0.0, math.sqrt(variancia), 'call')
+            peso *= self.lambda_saltos * t / (k + 1)
+        return valor
+
+    def intervalo_log(self, s0: float, dias: int, desvios: float = 6.0) -> tuple[float, float]:
+        """Faixa de preços de ± `desvios` desvios-padrão do log-preço, para histogramas."""
+        t = dias * self.dt
+        centro = math.log(s0) + (self.mu - 0.5 * self.sigma ** 2 + self.lambda_saltos * self.mu_salto) * t
+        dp = math.sqrt(self.sigma ** 2 * t + self.lambda_saltos * t * (self.mu_salto ** 2 + self.sigma_salto ** 2))
+        return math.exp(centro - desvios * dp), math.exp(centro + desvios * dp)
+
+
+@dataclass
+class HistogramaDiario:
+    """Contagens por dia em `bins` faixas iguais de [minimo, maximo], mais uma
+    faixa abaixo e outra acima do intervalo. O tamanho é fixo (dias × bins),
+    independente do número de caminhos, e histogramas de lotes se somam."""
+
+    minimo: float
+    maximo: float
+    dias: int
+    bins: int = 2000
+    contagens: np.ndarray | None = None
+
+    def __post_init__(self):
+        if self.contagens is None:
+            self.contagens = np.zeros((self.dias, self.bins + 2), dtype=np.int64)
+
+    @property
+    def largura(self) -> float:
+        return (self.maximo - self.minimo) / self.bins
+
+    @property
+    def n(self) -> int:
+        return int(self.contagens[0].sum())
+
+    def adicionar(self, trajetorias: np.ndarray) -> "HistogramaDiario":
+        """Conta um lote de trajetórias (dias, n), em blocos de BLOCO_LINHAS dias
+        para que os índices temporários não ocupem uma matriz inteira."""
+        faixas = self.bins + 2
+        for i in range(0, self.dias, BLOCO_LINHAS):
+            bloco = trajetorias[i:i + BLOCO_LINHAS]
+            indices = bloco - self.minimo
+            indices /= self.largura
+            np.floor(indices, out=indices)
+            np.clip(indices, -1, self.bins, out=indices)
+            # Índice plano dia × faixa, para contar o bloco com um único bincount.
+            indices += 1 + (np.arange(len(bloco)) * faixas)[:, None]
+            contagem = np.bincount(indices.astype(np.intp).ravel(), minlength=len(bloco) * faixas)
+            self.contagens[i:i + len(bloco)] += contagem.reshape(len(bloco), faixas)
+        return self
+
+    def combinar(self, outro: "HistogramaDiario") -> "HistogramaDiario":
+        """Soma as contagens de `outro` neste histograma (sem alocar um terceiro)."""
+        if self.contagens.dtype != np.int64:
+            self.contagens = self.contagens.astype(np.int64)
+        self.contagens += outro.contagens
+        return self
+
+    def quantis(self, qs) -> np.ndarray:
+        """Quantis `qs` (entre 0 e 1) de cada dia, formato (len(qs), dias), com
+        interpolação linear dentro da faixa; erro máximo de uma largura de faixa."""
+        acumulado = np.cumsum(self.contagens, axis=1)
+        alvo = np.asarray(qs, dtype=float)[:, None] * acumulado[:, -1]
+        faixa = (acumulado[None, :, :] < alvo[:, :, None]).sum(axis=-1)
+        dias = np.arange(self.dias)
+        anterior = np.where(faixa > 0, acumulado[dias, np.maximum(faixa - 1, 0)], 0)
+        na_faixa = self.contagens[dias, faixa]
+        fracao = np.divide(alvo - anterior, na_faixa, out=np.zeros_like(alvo), where=na_faixa > 0)
+        return np.clip(self.minimo + (faixa - 1 + fracao) * self.largura, self.minimo, self.maximo)
+
+    def distribuicao(self, dia: int = -1, agrupar: int = 1) -> tuple[np.ndarray, np.ndarray]:
+        """Centros das faixas e probabilidades do dia `dia`, somando `agrupar`
+        faixas vizinhas; as faixas de fora do intervalo vão para as extremidades."""
+        contagens = self.contagens[dia, 1:-1].copy()
+        contagens[0] += self.contagens[dia, 0]
+        contagens[-1] += self.contagens[dia, -1]
+        contagens = contagens.reshape(-1, agrupar).sum(axis=1)
+        largura = self.largura * agrupar
+        centros = self.minimo + largura * (np.arange(len(contagens)) + 0.5)
+        return centros, contagens / max(contagens.sum(), 1)
+
+
+# ---------------------------------------------------------------------------
+# Amostragem e redução de variância
+# ---------------------------------------------------------------------------
+
+@dataclass
+class Amostragem:
+    """Opções de redução de variância.
+
+    antitetica: cada choque z é usado também como -z; a amostra é a média do par.
+    sobol: choques de uma sequência de Sobol embaralhada (uma por lote, lotes em
+        potência de 2); a amostra é a média do lote e o erro padrão vem da
+        dispersão entre lotes (QMC randomizado).
+    controle: a mesma estatística sob o GBM de controle da dinâmica, cujo valor
+        esperado é fechado (Black-Scholes), com coeficiente estimado em cada lote.
+    """
+
+    antitetica: bool = False
+    sobol: bool = False
+    controle: bool = False
+
+    @property
+    def ativa(self) -> bool:
+        return self.antitetica or self.sobol or self.controle
+
+    def ajustar(self, n_caminhos: int, tamanho_lote: int, tolerancia: float | None = None) -> tuple[int, int]:
+        """`n_caminhos` e `tamanho_lote` compatíveis com as opções: lotes inteiros,
+        de tamanho par (antitéticas) ou potência de 2 (Sobol). O lote do Sobol é
+        reduzido para caber pelo menos LOTES_SOBOL lotes (LOTES_MINIMOS com
+        `tolerancia`), já que o erro padrão vem da dispersão entre eles."""
+        if not (self.antitetica or self.sobol):
+            return n_caminhos, tamanho_lote
+        if self.sobol:
+            lotes = LOTES_MINIMOS if tolerancia is not None else LOTES_SOBOL
+            tamanho_lote = min(tamanho_lote, max(2, n_caminhos // lotes))
+            tamanho_lote = 1 << max(1, tamanho_lote.bit_length() - 1)
+        else:
+            tamanho_lote += tamanho_lote % 2
+        return max(1, math.ceil(n_caminhos / tamanho_lote)) * tamanho_lote, tamanho_lote
+
+    def normais(self, rng: np.random.Generator, dias: int, n: int, precisao=np.float64) -> np.ndarray:
+        if self.sobol:
+            from scipy.special import ndtri
+            from scipy.stats import qmc
+            pontos = qmc.Sobol(d=dias, scramble=True, seed=rng).random(n)
+            z = ndtri(pontos.T).astype(precisao, copy=False)
+        else:
+            z = normais_padrao(rng, dias, n // 2 if self.antitetica else n, precisao)
+        if self.antitetica:
+            metade = n // 2
+            z = np.concatenate([z[:, :metade], -z[:, :metade]], axis=1)
+        return z
+
+    def reduzir(self, amostras: np.ndarray) -> np.ndarray:
+        """Amostras independentes a partir das amostras por caminho do lote."""
+        if self.antitetica:
+            metade = amostras.shape[-1] // 2
+            amostras = 0.5 * (amostras[..., :metade] + amostras[..., metade:])
+        if self.sobol:
+            amostras = amostras.mean(axis=-1, keepdims=True)
+        return amostras
+
+
+def _controle(dinamica: Dinamica) -> "GBM":
+    controle = dinamica.controle()
+    if controle is None:
+        raise ValueError(f"{type(dinamica).__name__} não tem variável de controle")
+    return controle
+
+
+def _lote_precos(dinamica: Dinamica, amostragem: Amostragem, rng, s0: float, dias: int, n: int, precisao=np.float64):
+    """Trajetórias do lote e, com variável de controle, os preços finais do GBM de controle."""
+    if not amostragem.ativa:
+        return dinamica.simular_lote(rng, s0, dias, n, precisao), None
+    z = amostragem.normais(rng, dias, n, precisao)
+    if not amostragem.controle:
+        return dinamica.de_normais(z, s0), None
+    precos = dinamica.de_normais(z.copy(), s0)
+    return precos, _controle(dinamica).de_normais(z, s0)[-1]
+
+
+def controlar(amostras: np.ndarray, controles: np.ndarray, esperado) -> np.ndarray:
+    """amostras - beta·(controles - esperado), com beta = cov/var por linha no lote."""
+    desvio_c = controles - controles.mean(axis=-1, keepdims=True)
+    desvio_a = amostras - amostras.mean(axis=-1, keepdims=True)
+    variancia = np.einsum("...i,...i->...", desvio_c, desvio_c, dtype=np.float64)
+    beta = np.divide(np.einsum("...i,...i->...", desvio_a, desvio_c, dtype=np.float64), variancia,
+                     out=np.zeros_like(variancia), where=variancia > 0)
+    esperado = np.asarray(esperado, dtype=amostras.dtype)
+    return amostras - beta[..., None].astype(amostras.dtype) * (controles - esperado[..., None])
+
+
+# ---------------------------------------------------------------------------
+# Execução em lotes
+# ---------------------------------------------------------------------------
+
+@dataclass
+class Estatisticas:
+    """Média e soma dos quadrados dos desvios (m2) por posição, na última
+    dimensão das amostras. Lotes são combinados pela fórmula de Chan, sem
+    guardar as amostras."""
+
+    n: int
+    media: np.ndarray
+    m2: np.ndarray
+
+    @classmethod
+    def de_amostras(cls, amostras: np.ndarray) -> "Estatisticas":
+        # Somas sempre em float64, mesmo com amostras em float32.
+        media = amostras.mean(axis=-1, dtype=np.float64)
+        desvios = amostras - media[..., None].astype(amostras.dtype)
+        return cls(amostras.shape[-1], media, np.einsum("...i,...i->...", desvios, desvios, dtype=np.float64))
+
+    def combinar(self, outro: "Estatisticas") -> "Estatisticas":
+        n = self.n + outro.n
+        delta = outro.media - self.media
+        media = self.media + delta * (outro.n / n)
+        m2 = self.m2 + outro.m2 + delta ** 2 * (self.n * outro.n / n)
+        return Estatisticas(n, media, m2)
+
+    @property
+    def variancia(self) -> np.ndarray:
+        # Com uma só amostra (um lote de Sobol) não há dispersão para estimar.
+        if self.n < 2:
+            return np.full_like(self.m2, np.nan, dtype=np.float64)
+        return self.m2 / (self.n - 1)
+
+    @property
+    def erro_padrao(self) -> np.ndarray:
+        return np.sqrt(self.variancia / self.n)
+
+
+@dataclass
+class ResultadoSimulacao:
+    """Arrays por cenário (`valores`), concatenados na última dimensão."""
+
+    valores: dict[str, np.ndarray | Estatisticas]
+    n_caminhos: int
+    semente: int
+    segundos: float
+    extras: dict = field(default_factory=dict)
+
+    @property
+    def finais(self) -> np.ndarray:
+        return self.valores["finais"]
+
+    @property
+    def trajetorias(self) -> np.ndarray:
+        return self.valores["trajetorias"]
+
+
+def sementes_dos_lotes(n_caminhos: int, tamanho_lote: int, semente: int | None):
+    """Semente raiz (para reproduzir a execução) e (tamanho, SeedSequence) de cada lote."""
+    raiz = np.random.SeedSequence(semente)
+    n_lotes = max(1, math.ceil(n_caminhos / tamanho_lote))
+    tamanhos = [min(tamanho_lote, n_caminhos - i * tamanho_lote) for i in range(n_lotes)]
+    return raiz.entropy, list(zip(tamanhos, raiz.spawn(n_lotes)))
+
+
+def _precisao_atingida(acumulado: dict, tolerancia: float, chaves) -> bool:
+    chaves = chaves or [c for c, v in acumulado.items() if isinstance(v, Estatisticas)]
+    return all(np.max(acumulado[c].erro_padrao) <= tolerancia for c in chaves)
+
+
+def _rodar_lote(funcao_lote, acumular: bool, tamanho: int, semente_lote: np.random.SeedSequence) -> dict:
+    """Um lote, já reduzido a `Estatisticas` quando `acumular`: é o que volta dos processos."""
+    saida = funcao_lote(np.random.default_rng(semente_lote), tamanho)
+    if acumular:
+        saida = {chave: valor if hasattr(valor, "combinar") else Estatisticas.de_amostras(valor)
+                 for chave, valor in saida.items()}
+    return saida
+
+
+# ---------------------------------------------------------------------------
+# Pool de processos
+# ---------------------------------------------------------------------------
+
+PROCESSOS = int(os.environ.get("IMPACTO_PROCESSOS_MC", 1))
+
+_pool: ProcessPoolExecutor | None = None
+_pool_processos = 0
+_trava_pool = threading.Lock()
+
+
+def _nada() -> None:
+    pass
+
+
+def _esperar_todos(barreira) -> None:
+    # Nenhum worker fica ocioso antes de todos existirem, então cada submit da
+    # criação do pool inicia um processo novo.
+    barreira.wait(60)
+
+
+def _obter_pool(processos: int) -> ProcessPoolExecutor:
+    """Pool compartilhado entre execuções (forkserver: seguro com as threads do Streamlit).
+
+    Processos forkserver/spawn reimportam `sys.modules['__main__']`, que no
+    Streamlit é a página em execução: cada worker rodaria a página inteira
+    (login, aquecimento, alertas, simulações). Por isso os workers são criados
+    todos de uma vez, com um `__main__` vazio no lugar; com o pool cheio o
+    executor não cria outros.
+    """
+    global _pool, _pool_processos
+    with _trava_pool:
+        if _pool is None or _pool_processos != processos:
+            if _pool is not None:
+                _pool.shutdown(wait=False, cancel_futures=True)
+            metodos = multiprocessing.get_all_start_methods()
+            contexto = multiprocessing.get_context("forkserver" if "forkserver" in metodos else "spawn")
+            if contexto.get_start_method() == "forkserver":
+                contexto.set_forkserver_preload([__name__])
+            principal = sys.modules["__main__"]
+            sys.modules["__main__"] = types.ModuleType("__main__")
+            try:
+                _pool = ProcessPoolExecutor(processos, mp_context=contexto, initializer=_esperar_todos,
+                                            initargs=(contexto.Barrier(processos),))
+                for futuro in [_pool.submit(_nada) for _ in range(processos)]:
+                    futuro.result()
+            finally:
+                sys.modules["__main__"] = principal
+            _pool_processos = processos
+        return _pool
+
+
+def _lotes_em_ordem(funcao_lote, acumular: bool, lotes: list, processos: int):
+    """Resultados dos lotes na ordem dos lotes. Com mais de um processo, mantém
+    até 2 lotes por processo em andamento; funções que não podem ser enviadas a
+    outro processo (closures de páginas) rodam no processo atual."""
+    if processos > 1 and len(lotes) > 1:
+        try:
+            pickle.dumps(funcao_lote)
+        except (pickle.PicklingError, AttributeError, TypeError):
+            processos = 1
+    if processos <= 1 or len(lotes) <= 1:
+        for tamanho, semente_lote in lotes:
+            yield _rodar_lote(funcao_lote, acumular, tamanho, semente_lote)
+        return
+    pool = _obter_pool(processos)
+    pendentes = deque()
+    proximos = iter(lotes)
+    try:
+        for tamanho, semente_lote in itertools.islice(proximos, 2 * processos):
+            pendentes.append(pool.submit(_rodar_lote, funcao_lote, acumular, tamanho, semente_lote))
+        while pendentes:
+            resultado = pendentes.popleft().result()
+            for tamanho, semente_lote in itertools.islice(proximos, 1):
+                pendentes.append(pool.submit(_rodar_lote, funcao_lote, acumular, tamanho, semente_lote))
+            yield resultado
+    finally:
+        for futuro in pendentes:
+            futuro.cancel()
+
+
+def executar(funcao_lote, n_caminhos: int, semente: int | None = None, tamanho_lote: int = TAMANHO_LOTE,
+             tempo_max: float | None = None, acumular: bool = False, tolerancia: float | None = None,
+             chaves_tolerancia=None, processos: int | None = None) -> ResultadoSimulacao:
+    """Chama `funcao_lote(rng, n)` para cada lote e junta os dicts de arrays retornados.
+
+    Com `acumular=True` as amostras de cada lote viram `Estatisticas` (média e
+    erro padrão) e são descartadas, então a memória não cresce com `n_caminhos`;
+    valores que já sabem se combinar (como `HistogramaDiario`) são combinados direto.
+    Com `tempo_max` (segundos), para depois do lote que estourar o tempo; com
+    `tolerancia` (exige `acumular`), para quando o maior erro padrão das chaves em
+    `chaves_tolerancia` (todas as `Estatisticas`, se None) ficar abaixo dela, após
+    pelo menos LOTES_MINIMOS lotes. Nos dois casos `n_caminhos` vira um teto e o
+    `n_caminhos` do resultado informa quantos cenários foram de fato gerados.
+
+    Os lotes são distribuídos entre `processos` (padrão PROCESSOS) e só as
+    estatísticas parciais voltam. Como os lotes e suas sementes não dependem do
+    número de processos e são combinados sempre na ordem dos lotes, o resultado
+    é idêntico bit a bit para qualquer número de processos.
+    """
+    inicio = time.perf_counter()
+    raiz, lotes = sementes_dos_lotes(n_caminhos, tamanho_lote, semente)
+    partes: dict[str, list] = {}
+    acumulado: dict[str, Estatisticas] = {}
+    gerados = 0
+    resultados = _lotes_em_ordem(funcao_lote, acumular, lotes, PROCESSOS if processos is None else processos)
+    for i, (tamanho, _) in enumerate(lotes, 1):
+        saida = next(resultados)
+        for chave, valor in saida.items():
+            if acumular:
+                acumulado[chave] = acumulado[chave].combinar(valor) if chave in acumulado else valor
+            else:
+                partes.setdefault(chave, []).append(valor)
+        # Solta o lote já combinado antes de gerar o próximo.
+        saida = valor = None
+        gerados += tamanho
+        if tempo_max is not None and time.perf_counter() - inicio > tempo_max:
+            break
+        if tolerancia is not None and i >= LOTES_MINIMOS and _precisao_atingida(acumulado, tolerancia, chaves_tolerancia):
+            break
+    resultados.close()
+    valores = acumulado if acumular else {chave: np.concatenate(lista, axis=-1) for chave, lista in partes.items()}
+    return ResultadoSimulacao(valores, gerados, raiz, time.perf_counter() - inicio)
+
+
+# ---------------------------------------------------------------------------
+# Simulações prontas (funções de lote no nível do módulo, para irem aos processos)
+# ---------------------------------------------------------------------------
+
+def _lote_simular(dinamica, s0, dias, guardar_trajetorias, precisao, rng, n):
+    precos = dinamica.simular_lote(rng, s0, dias, n, precisao)
+    saida = {"finais": precos[-1].copy()}
+    if guardar_trajetorias:
+        saida["trajetorias"] = precos
+    return saida
+
+
+def simular(dinamica: Dinamica, s0: float, dias: int, n_caminhos: int, semente: int | None = None,
+            tamanho_lote: int = TAMANHO_LOTE, guardar_trajetorias: bool = False,
+            tempo_max: float | None = None, processos: int | None = None,
+            precisao=np.float64) -> ResultadoSimulacao:
+    """Simula `n_caminhos` trajetórias de `dias` passos a partir de `s0`.
+
+    Sempre devolve os preços finais; as trajetórias completas (dias, n) só com
+    `guardar_trajetorias=True`, pois ocupam dias × n posições.
+    """
+    lote = partial(_lote_simular, dinamica, float(s0), dias, guardar_trajetorias, precisao)
+    return executar(lote, n_caminhos, semente, tamanho_lote, tempo_max, processos=processos)
+
+
+def payoffs_europeus(finais: np.ndarray, strikes) -> tuple[np.ndarray, np.ndarray]:
+    """Payoffs de call e put para todos os strikes, formato (strikes, caminhos), no dtype de `finais`."""
+    diferenca = finais[None, :] - np.asarray(strikes, dtype=finais.dtype)[:, None]
+    call = np.maximum(diferenca, 0)
+    np.negative(diferenca, out=diferenca)
+    return call, np.maximum(diferenca, 0, out=diferenca)
+
+
+def _lote_strikes(dinamica, amostragem, s0, dias, strikes, esperados, precisao, rng, n):
+    precos, finais_controle = _lote_precos(dinamica, amostragem, rng, s0, dias, n, precisao)
+    finais = precos[-1].copy()
+    del precos
+    call, put = payoffs_europeus(finais, strikes)
+    if finais_controle is not None:
+        call_controle, put_controle = payoffs_europeus(finais_controle, strikes)
+        call = controlar(call, call_controle, esperados[0])
+        put = controlar(put, put_controle, esperados[1])
+    return {"call": amostragem.reduzir(call), "put": amostragem.reduzir(put)}
+
+
+def precificar_strikes(dinamica: Dinamica, s0: float, dias: int, strikes, n_caminhos: int,
+                       semente: int | None = None, tamanho_lote: int = TAMANHO_LOTE,
+                       tempo_max: float | None = None, amostragem: Amostragem | None = None,
+                       tolerancia: float | None = None, processos: int | None = None,
+                       precisao=np.float64) -> ResultadoSimulacao:
+    """Calls e puts europeias para um vetor de strikes sobre o mesmo conjunto de
+    caminhos. `valores["call"]` e `valores["put"]` são `Estatisticas` por strike.
+    Com `precisao=np.float32` as trajetórias e payoffs ocupam metade da memória;
+    as médias continuam acumuladas em float64."""
+    amostragem = amostragem or Amostragem()
+    n_caminhos, tamanho_lote = amostragem.ajustar(n_caminhos, tamanho_lote, tolerancia)
+    strikes = np.asarray(strikes, dtype=float)
+    esperados = None
+    if amostragem.controle:
+        # Valor esperado (sem desconto) do payoff sob o GBM de controle.
+        gbm = _controle(dinamica)
+        crescimento = math.exp(gbm.mu * dias)
+        esperados = (crescimento * black_scholes(float(s0), strikes, dias, gbm.mu, gbm.sigma, 'call'),
+                     crescimento * black_scholes(float(s0), strikes, dias, gbm.mu, gbm.sigma, 'put'))
+    lote = partial(_lote_strikes, dinamica, amostragem, float(s0), dias, strikes, esperados, precisao)
+    return executar(lote, n_caminhos, semente, tamanho_lote, tempo_max, acumular=True, tolerancia=tolerancia,
+                    processos=processos)
+
+
+def _lote_leque(dinamica, amostragem, s0, dias, minimo, maximo, bins, limiares, esperados, precisao, rng, n):
+    precos, finais_controle = _lote_precos(dinamica, amostragem, rng, s0, dias, n, precisao)
+    finais = precos[-1]
+    final = finais
+    acima = (finais[None, :] > limiares[:, None]).astype(precos.dtype)
+    abaixo = (finais[None, :] < limiares[:, None]).astype(precos.dtype)
+    if finais_controle is not None:
+        esperado_final, esperado_acima = esperados
+        final = controlar(finais, finais_controle, esperado_final)
+        acima_controle = (finais_controle[None, :] > limiares[:, None]).astype(precos.dtype)
+        acima = controlar(acima, acima_controle, esperado_acima)
+        abaixo = controlar(abaixo, 1 - acima_controle, 1 - esperado_acima)
+    return {
+        # Contagens de um lote cabem em int32; o acumulado passa a int64 em `combinar`.
+        "histograma": HistogramaDiario(minimo, maximo, dias, bins, np.zeros((dias, bins + 2), np.int32)).adicionar(precos),
+        "final": amostragem.reduzir(final),
+        "media_trajetoria": amostragem.reduzir(precos.mean(axis=0)),
+        "acima": amostragem.reduzir(acima),
+        "abaixo": amostragem.reduzir(abaixo),
+    }
+
+
+def leque(dinamica: Dinamica, s0: float, dias: int, n_caminhos: int, minimo: float, maximo: float,
+          limiares=(), semente: int | None = None, bins: int = 2000, tamanho_lote: int = TAMANHO_LOTE,
+          tempo_max: float | None = None, amostragem: Amostragem | None = None,
+          tolerancia: float | None = None, processos: int | None = None,
+          precisao=np.float64) -> ResultadoSimulacao:
+    """Gráfico de leque sem guardar trajetórias: `valores["histograma"]` é um
+    `HistogramaDiario` em [minimo, maximo]; `valores["final"]`, `["media_trajetoria"]`,
+    `["acima"]` e `["abaixo"]` são `Estatisticas` do preço final, do preço médio de
+    cada trajetória e da probabilidade de o preço final ficar acima/abaixo de cada limiar.
+    A `tolerancia` vale para o erro padrão das probabilidades."""
+    amostragem = amostragem or Amostragem()
+    n_caminhos, tamanho_lote = amostragem.ajustar(n_caminhos, tamanho_lote, tolerancia)
+    limiares = np.asarray(limiares, dtype=float)
+    esperados = None
+    if amostragem.controle:
+        gbm = _controle(dinamica)
+        esperados = (float(s0) * math.exp(gbm.mu * dias), probabilidade_acima(float(s0), limiares, dias, gbm.mu, gbm.sigma))
+    lote = partial(_lote_leque, dinamica, amostragem, float(s0), dias, minimo, maximo, bins, limiares, esperados, precisao)
+    return executar(lote, n_caminhos, semente, tamanho_lote, tempo_max, acumular=True,
+                    tolerancia=tolerancia, chaves_tolerancia=("acima", "abaixo"), processos=processos)
+
+
+# ---------------------------------------------------------------------------
+# Comparação de precisão
+# ---------------------------------------------------------------------------
+
+def pico_memoria(funcao, *args, **kwargs):
+    """Resultado de `funcao(*args, **kwargs)` e o pico de memória alocada durante
+    a chamada, em bytes (tracemalloc; rode com processos=1 para medir tudo)."""
+    ja_ativo = tracemalloc.is_tracing()
+    if not ja_ativo:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    base = tracemalloc.get_traced_memory()[0]
+    try:
+        resultado = funcao(*args, **kwargs)
+        return resultado, tracemalloc.get_traced_memory()[1] - base
+    finally:
+        if not ja_ativo:
+            tracemalloc.stop()
+
+
+def comparar_precisao(funcao, *args, **kwargs) -> dict:
+    """Roda `funcao` (precificar_strikes, leque, simular...) em float64 e em
+    float32 com a mesma semente, num único processo, e devolve os dois resultados
+    e o pico de memória de cada um."""
+    kwargs = {**kwargs, "processos": 1}
+    r64, pico64 = pico_memoria(funcao, *args, **{**kwargs, "precisao": np.float64})
+    kwargs["semente"] = r64.semente
+    r32, pico32 = pico_memoria(funcao, *args, **{**kwargs, "precisao": np.float32})
+    return {"float64": r64, "float32": r32, "pico_float64": pico64, "pico_float32": pico32}
+
+
+def diferencas_precisao(comparacao: dict, quantis=(0.05, 0.25, 0.50, 0.75, 0.95)) -> dict[str, float]:
+    """Maior diferença absoluta float32 × float64 de cada valor de `comparar_precisao`:
+    médias das `Estatisticas` e, nos histogramas, os `quantis` de todos os dias."""
+    r64, r32 = comparacao["float64"], comparacao["float32"]
+    diferencas = {}
+    for chave, valor in r64.valores.items():
+        outro = r32.valores[chave]
+        if isinstance(valor, Estatisticas):
+            diferencas[chave] = float(np.max(np.abs(valor.media - outro.media)))
+        elif isinstance(valor, HistogramaDiario):
+            diferencas[chave] = float(np.max(np.abs(valor.quantis(quantis) - outro.quantis(quantis))))
+        else:
+            diferencas[chave] = float(np.max(np.abs(valor - outro.astype(valor.dtype))))
+    return diferencas
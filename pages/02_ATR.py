@@ -1,11 +1,9 @@
 import streamlit as st
 import numpy as np
 import pandas as pd
-import plotly.graph_objs as go
-from plotly.subplots import make_subplots
-import matplotlib.pyplot as plt
-import seaborn as sns
 
+from importacoes import go, make_subplots, plt, sns
+from planilhas import carregar_planilha
 from utils import require_login, show_logo
 
 st.set_page_config(page_title="ATR", page_icon="📈", layout="wide")
@@ -13,14 +11,17 @@ require_login()
 show_logo()
 
 
-@st.cache_data
-def load_dados():
-    df = pd.read_excel('Historico Impurezas.xlsx')
+def preparar_impurezas(df):
     df = df.dropna()
     df['Impureza Total'] = df['Impureza Vegetal'] + df['Impureza Mineral']
     return df
 
 
+@st.cache_data
+def load_dados():
+    return carregar_planilha('Historico Impurezas.xlsx', preparar_impurezas)
+
+
 def treinar_modelos(df):
     from sklearn.linear_model import LinearRegression, Ridge
     from sklearn.ensemble import RandomForestRegressor
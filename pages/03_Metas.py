@@ -1,12 +1,10 @@
 import streamlit as st
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-import plotly.graph_objs as go
-import yfinance as yf
 from datetime import date
 
-import streamlit as st
+from historico import carregar_historico
+from importacoes import go, plt
 from utils import require_login, show_logo
 
 st.set_page_config(page_title="Metas", page_icon="📈", layout="wide")
@@ -18,9 +16,8 @@ show_logo()
 def calcular_mtm(meta):
     start_date = date(2013, 1, 1)
     today = date.today()
-    end_date = today.strftime('%Y-%m-%d')
-    sugar_data = yf.download('SB=F', start=start_date, end=end_date, multi_level_index=False, auto_adjust=True, progress=False)
-    forex_data = yf.download('USDBRL=X', start=start_date, end=end_date, multi_level_index=False, auto_adjust=True, progress=False)
+    sugar_data = carregar_historico('SB=F', start_date, today)
+    forex_data = carregar_historico('USDBRL=X', start_date, today)
     sugar_prices = sugar_data['Close']
     forex_prices = forex_data['Close']
     mtm = 22.0462 * 1.04 * sugar_prices * forex_prices
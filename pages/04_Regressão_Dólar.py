@@ -1,11 +1,9 @@
 import streamlit as st
 import numpy as np
 import pandas as pd
-import plotly.graph_objs as go
-import plotly.subplots as sp
-import matplotlib.pyplot as plt
-import seaborn as sns
 
+from importacoes import go, plt, sns
+from planilhas import carregar_planilha
 from utils import require_login, show_logo
 
 st.set_page_config(page_title="Regressão Dólar", page_icon="📈", layout="wide")
@@ -13,9 +11,7 @@ require_login()
 show_logo()
 
 
-def load_and_transform_data(file_path):
-    from sklearn.preprocessing import MinMaxScaler
-    df = pd.read_excel(file_path)
+def transformar_dados_cambio(df):
     df['Oferta Moeda Brasileira - M2'] = df['Oferta Moeda Brasileira - M2'] / 1000
     df['Juros Brasileiros(%)'] = df['Juros Brasileiros(%)'] / 100
     df['Juros Americanos(%)'] = df['Juros Americanos(%)'] / 100
@@ -29,6 +25,10 @@ def load_and_transform_data(file_path):
     return df_transformed
 
 
+def load_and_transform_data(file_path):
+    return carregar_planilha(file_path, transformar_dados_cambio)
+
+
 def prever_taxa_cambio(model, juros_br, juros_eua, prod_ind_br, prod_ind_eua, oferta_moeda_br, oferta_moeda_eua):
     razao_juros = juros_eua / juros_br
     log_razao_juros = np.log(razao_juros)
@@ -1,9 +1,9 @@
 import streamlit as st
 import numpy as np
 import pandas as pd
-import plotly.graph_objs as go
-import plotly.subplots as sp
 
+from importacoes import go
+from planilhas import carregar_planilha
 from utils import require_login, show_logo
 
 st.set_page_config(page_title="Regressão Açúcar", page_icon="📈", layout="wide")
@@ -15,9 +15,7 @@ def revert_log_diff(base_value, log_diff_value):
     return base_value * np.exp(log_diff_value)
 
 
-@st.cache_data
-def load_and_transform_data_sugar(file_path):
-    df = pd.read_excel(file_path)
+def transformar_dados_acucar(df):
     if 'Ano safra' in df.columns:
         df['Ano safra'] = df['Ano safra'].astype(str).str[-4:]
         df['Ano safra'] = pd.to_datetime(df['Ano safra'], format='%Y', errors='coerce')
@@ -33,6 +31,11 @@ def load_and_transform_data_sugar(file_path):
     return df
 
 
+@st.cache_data
+def load_and_transform_data_sugar(file_path):
+    return carregar_planilha(file_path, transformar_dados_acucar)
+
+
 st.title("Previsão do Preço do Açúcar")
 st.write("Modelo de regressão para prever o preço futuro do açúcar (SB=F).")
 
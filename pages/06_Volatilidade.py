@@ -1,9 +1,9 @@
 import streamlit as st
 import numpy as np
 import pandas as pd
-import plotly.express as px
-import yfinance as yf
 
+from historico import carregar_historico
+from importacoes import px
 from utils import require_login, show_logo
 
 st.set_page_config(page_title="Volatilidade", page_icon="📈", layout="wide")
@@ -14,7 +14,7 @@ show_logo()
 @st.cache_data(ttl=3600)
 def get_historical_data(symbol, start_date, end_date):
     from arch import arch_model
-    data = yf.download(symbol, start=start_date, end=end_date, multi_level_index=False, auto_adjust=True, progress=False)
+    data = carregar_historico(symbol, start_date, end_date)
     if 'Close' in data.columns:
         data['Price'] = data['Close']
     else:
@@ -1,9 +1,10 @@
 import streamlit as st
 import numpy as np
 import pandas as pd
-import plotly.express as px
-import yfinance as yf
 
+from historico import carregar_historico
+from importacoes import go
+from monte_carlo import Merton, leque
 from utils import require_login, show_logo
 
 st.set_page_config(page_title="Jump Diffusion", page_icon="📈", layout="wide")
@@ -11,16 +12,12 @@ require_login()
 show_logo()
 
 
-def simulate_jump_diffusion(s0, mu, sigma, lambda_jumps, mu_jump, sigma_jump, T, steps):
-    dt = T / steps
-    prices = [s0]
-    for _ in range(steps):
-        jump = np.random.poisson(lambda_jumps * dt)
-        jump_magnitude = np.sum(np.random.normal(mu_jump, sigma_jump, jump))
-        diffusion = (mu - 0.5 * sigma**2) * dt + sigma * np.random.normal() * np.sqrt(dt)
-        price = prices[-1] * np.exp(diffusion + jump_magnitude)
-        prices.append(price)
-    return prices
+def simulate_jump_diffusion(s0, mu, sigma, lambda_jumps, mu_jump, sigma_jump, T, steps, n_paths, semente=None):
+    # Todos os caminhos de um lote saem de uma vez: saltos e difusão são
+    # sorteados para a grade (steps, n) inteira, sem laço por passo.
+    dinamica = Merton(mu, sigma, lambda_jumps, mu_jump, sigma_jump, dt=T / steps)
+    minimo, maximo = dinamica.intervalo_log(s0, steps)
+    return dinamica, leque(dinamica, s0, steps, n_paths, minimo, maximo, [s0], semente)
 
 
 st.title("Simulação de Preços - Modelo Jump-Diffusion")
@@ -29,9 +26,11 @@ start_date = st.date_input("Selecione a data de início:", value=pd.to_datetime(
 symbol = "SB=F" if variable == "Açúcar" else "USDBRL=X"
 sigma_input = st.text_input("Digite o valor de sigma (volatilidade):", value="")
 sigma = float(sigma_input) if sigma_input else None
+n_paths = st.selectbox("Número de caminhos", [10_000, 50_000, 100_000], format_func=lambda n: f"{n:,}".replace(",", "."))
+semente = st.number_input("Semente (0 = nova a cada simulação)", min_value=0, value=0, step=1)
 
 if st.button("Simular"):
-    data = yf.download(symbol, start=start_date, end="2099-01-01", multi_level_index=False, auto_adjust=True, progress=False)
+    data = carregar_historico(symbol, start_date)
     if 'Close' in data.columns:
         data['Price'] = data['Close']
     else:
@@ -43,8 +42,31 @@ if st.button("Simular"):
         sigma = data['Log Returns'].std()
     mu = data['Log Returns'].mean()
     s0 = data['Price'].iloc[-1]
-    simulated_prices = simulate_jump_diffusion(s0=s0, mu=mu, sigma=sigma, lambda_jumps=0.1, mu_jump=-0.02, sigma_jump=0.05, T=1, steps=252)
-    jump_diffusion_df = pd.DataFrame({'Step': range(len(simulated_prices)), 'Price': simulated_prices})
-    fig = px.line(jump_diffusion_df, x='Step', y='Price', title=f"Simulação de Preços - {variable} com Jump-Diffusion")
+    steps = 252
+    dinamica, resultado = simulate_jump_diffusion(s0=s0, mu=mu, sigma=sigma, lambda_jumps=0.1, mu_jump=-0.02, sigma_jump=0.05, T=1, steps=steps, n_paths=n_paths, semente=semente or None)
+    histograma = resultado.valores['histograma']
+    quantis = np.column_stack([np.full(5, s0), histograma.quantis([0.05, 0.25, 0.50, 0.75, 0.95])])
+    p5, p25, p50, p75, p95 = quantis
+    passos = np.arange(steps + 1)
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(x=passos, y=p95, line=dict(width=0), showlegend=False))
+    fig.add_trace(go.Scatter(x=passos, y=p5, fill='tonexty', fillcolor='rgba(70,130,180,0.15)', line=dict(width=0), name='P5–P95'))
+    fig.add_trace(go.Scatter(x=passos, y=p75, line=dict(width=0), showlegend=False))
+    fig.add_trace(go.Scatter(x=passos, y=p25, fill='tonexty', fillcolor='rgba(70,130,180,0.30)', line=dict(width=0), name='P25–P75'))
+    fig.add_trace(go.Scatter(x=passos, y=p50, line=dict(color='steelblue', width=2), name='Mediana (P50)'))
+    fig.update_layout(title=f"Simulação de Preços - {variable} com Jump-Diffusion", xaxis_title='Step', yaxis_title='Price')
     st.plotly_chart(fig)
-    st.write(f"O valor médio da simulação para o ano foi: {np.mean(simulated_prices):.2f}")
+
+    final = resultado.valores['final']
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Preço final médio", f"{float(final.media):.2f}", help=f"Erro padrão {float(final.erro_padrao):.4f}; esperado pelo modelo {dinamica.esperanca(s0, steps):.2f}")
+    col2.metric("P5 final", f"{p5[-1]:.2f}")
+    col3.metric("P95 final", f"{p95[-1]:.2f}")
+    col4.metric("Prob. abaixo do preço atual", f"{resultado.valores['abaixo'].media[0]:.1%}")
+    st.write(f"O valor médio da simulação para o ano foi: {float(resultado.valores['media_trajetoria'].media):.2f}")
+
+    centros, probabilidades = histograma.distribuicao(agrupar=histograma.bins // 100)
+    fig_hist = go.Figure(go.Bar(x=centros, y=probabilidades, marker_color='rgba(0,128,128,0.6)'))
+    fig_hist.update_layout(title="Distribuição do preço final", xaxis_title="Preço Simulado", yaxis_title="Frequência", bargap=0)
+    st.plotly_chart(fig_hist)
+    st.caption(f"{resultado.n_caminhos:,} caminhos em {resultado.segundos:.2f} s".replace(",", "."))
@@ -1,11 +1,11 @@
 import streamlit as st
 import numpy as np
 import pandas as pd
-import plotly.graph_objs as go
-import yfinance as yf
-from datetime import date
 from pandas.tseries.offsets import BDay
 
+from historico import precos_compartilhados
+from importacoes import go
+from monte_carlo import Amostragem, AritmeticoTruncado, comparar_precisao, diferencas_precisao, leque
 from utils import require_login, show_logo
 
 st.set_page_config(page_title="Monte Carlo", page_icon="📈", layout="wide")
@@ -13,21 +13,25 @@ require_login()
 show_logo()
 
 
-@st.cache_data(ttl=3600)
 def baixar_dados_mc(ativo: str) -> pd.DataFrame:
-    start_date = date(2013, 1, 1)
-    end_date = date.today().strftime("%Y-%m-%d")
-    data = yf.download(ativo, start=start_date, end=end_date, multi_level_index=False, auto_adjust=True, progress=False)
-    data["Daily Return"] = data["Close"].pct_change()
-    return data
+    # Visão somente leitura compartilhada entre sessões (ver historico.py).
+    return precos_compartilhados(ativo)
 
 
-def simulacao_monte_carlo(data, media, std, dias_simulados, num_simulacoes, limite_inferior, limite_superior):
-    retornos = np.random.normal(media, std, (dias_simulados, num_simulacoes))
+REDUCOES = {"Variáveis antitéticas": "antitetica", "Variável de controle": "controle", "Sobol embaralhado": "sobol"}
+
+
+def simulacao_monte_carlo(data, media, std, dias_simulados, num_simulacoes, limite_inferior, limite_superior, valor_simulado, semente=None, amostragem=None, tolerancia=None, precisao=np.float64, comparar=False):
+    # Só o histograma diário e as contagens do limiar ficam em memória, não as trajetórias.
+    # Com `comparar`, roda em float64 e float32 com a mesma semente e devolve também a comparação.
+    dinamica = AritmeticoTruncado(media, std, limite_inferior, limite_superior)
     preco_inicial = float(data['Close'].iloc[-1])
-    fator = np.cumprod(1 + retornos, axis=0)
-    precos_simulados = np.clip(preco_inicial * fator, limite_inferior, limite_superior)
-    return precos_simulados
+    argumentos = (dinamica, preco_inicial, dias_simulados, num_simulacoes, limite_inferior, limite_superior, [valor_simulado])
+    opcoes = dict(semente=semente, amostragem=amostragem, tolerancia=tolerancia)
+    if comparar:
+        comparacao = comparar_precisao(leque, *argumentos, **opcoes)
+        return comparacao["float32"], comparacao
+    return leque(*argumentos, **opcoes, precisao=precisao), None
 
 
 def calcular_dias_uteis(data_inicial, data_final):
@@ -52,23 +56,27 @@ if "valor_simulado_mc" not in st.session_state:
 valor_simulado = st.number_input("Qual valor deseja simular?", value=st.session_state["valor_simulado_mc"], step=0.01)
 limite_inferior = float(data['Close'].iloc[-1]) - 10
 limite_superior = float(data['Close'].iloc[-1]) + 10
+semente = st.number_input("Semente (0 = nova a cada simulação)", min_value=0, value=0, step=1)
+reducoes = st.multiselect("Redução de variância", list(REDUCOES), help="A variável de controle usa a probabilidade fechada de um GBM com os mesmos choques.")
+tolerancia_pp = st.number_input("Erro padrão alvo das probabilidades, em p.p. (0 = número fixo de caminhos)", min_value=0.0, value=0.0, step=0.05)
+num_simulacoes = st.selectbox("Máximo de caminhos" if tolerancia_pp else "Número de caminhos", [10_000, 100_000, 1_000_000], format_func=lambda n: f"{n:,}".replace(",", "."))
+float32 = st.checkbox("Precisão reduzida (float32)", help="Trajetórias em float32: menos memória por simulação.")
+comparar = st.checkbox("Comparar com float64 (mesma semente)", disabled=not float32)
 
 if dias_simulados <= 0:
     st.warning("A data de simulação deve ser posterior a hoje.")
     st.stop()
 
 if st.button("Simular"):
-    simulacoes = simulacao_monte_carlo(data, media_retornos_diarios, desvio_padrao_retornos_diarios, dias_simulados, 10000, limite_inferior, limite_superior)
-    percentil_20 = np.percentile(simulacoes[-1], 20)
-    percentil_80 = np.percentile(simulacoes[-1], 80)
-    prob_acima_valor = np.mean(simulacoes[-1] > valor_simulado) * 100
-    prob_abaixo_valor = np.mean(simulacoes[-1] < valor_simulado) * 100
+    with st.spinner("Simulando..."):
+        amostragem = Amostragem(**{REDUCOES[r]: True for r in reducoes})
+        resultado, comparacao = simulacao_monte_carlo(data, media_retornos_diarios, desvio_padrao_retornos_diarios, dias_simulados, num_simulacoes, limite_inferior, limite_superior, valor_simulado, semente or None, amostragem, tolerancia_pp / 100 or None, np.float32 if float32 else np.float64, float32 and comparar)
+    histograma = resultado.valores['histograma']
+    percentil_20, percentil_80 = histograma.quantis([0.20, 0.80])[:, -1]
+    prob_acima_valor = resultado.valores['acima'].media[0] * 100
+    prob_abaixo_valor = resultado.valores['abaixo'].media[0] * 100
     days = np.arange(1, dias_simulados + 1)
-    p5  = np.percentile(simulacoes, 5,  axis=1)
-    p25 = np.percentile(simulacoes, 25, axis=1)
-    p50 = np.percentile(simulacoes, 50, axis=1)
-    p75 = np.percentile(simulacoes, 75, axis=1)
-    p95 = np.percentile(simulacoes, 95, axis=1)
+    p5, p25, p50, p75, p95 = histograma.quantis([0.05, 0.25, 0.50, 0.75, 0.95])
     fig = go.Figure()
     fig.add_trace(go.Scatter(x=days, y=p95, line=dict(width=0), showlegend=False))
     fig.add_trace(go.Scatter(x=days, y=p5,  fill='tonexty', fillcolor='rgba(70,130,180,0.15)', line=dict(width=0), name='P5–P95'))
@@ -80,10 +88,20 @@ if st.button("Simular"):
     col1, col2, col3, col4 = st.columns(4)
     col1.metric("P20", f"{percentil_20:.2f}")
     col2.metric("P80", f"{percentil_80:.2f}")
-    col3.metric(f"Prob. acima de {valor_simulado:.2f}", f"{prob_acima_valor:.1f}%")
-    col4.metric(f"Prob. abaixo de {valor_simulado:.2f}", f"{prob_abaixo_valor:.1f}%")
-    hist_data = simulacoes[-1]
+    col3.metric(f"Prob. acima de {valor_simulado:.2f}", f"{prob_acima_valor:.1f}%", help=f"Erro padrão {resultado.valores['acima'].erro_padrao[0] * 100:.2f} p.p.")
+    col4.metric(f"Prob. abaixo de {valor_simulado:.2f}", f"{prob_abaixo_valor:.1f}%", help=f"Erro padrão {resultado.valores['abaixo'].erro_padrao[0] * 100:.2f} p.p.")
+    st.caption(f"{resultado.n_caminhos:,} caminhos em {resultado.segundos:.2f} s".replace(",", "."))
+    if comparacao:
+        diferencas = diferencas_precisao(comparacao)
+        st.subheader("Precisão: float32 × float64")
+        st.table(pd.DataFrame({
+            "Pico de memória (MB)": [comparacao["pico_float64"] / 1e6, comparacao["pico_float32"] / 1e6],
+            "Tempo (s)": [comparacao["float64"].segundos, comparacao["float32"].segundos],
+        }, index=["float64", "float32"]).round(3))
+        st.write(f"Maior diferença nos percentis P5–P95 (todos os dias): {diferencas['histograma']:.4f}; "
+                 f"nas probabilidades: {max(diferencas['acima'], diferencas['abaixo']) * 100:.4f} p.p.")
+    centros, probabilidades = histograma.distribuicao(agrupar=histograma.bins // 100)
     fig_hist = go.Figure()
-    fig_hist.add_trace(go.Histogram(x=hist_data, nbinsx=100, histnorm='probability', marker_color='rgba(0,128,128,0.6)', opacity=0.75))
-    fig_hist.update_layout(xaxis_title="Preço Simulado", yaxis_title="Frequência")
+    fig_hist.add_trace(go.Bar(x=centros, y=probabilidades, marker_color='rgba(0,128,128,0.6)', opacity=0.75))
+    fig_hist.update_layout(xaxis_title="Preço Simulado", yaxis_title="Frequência", bargap=0)
     st.plotly_chart(fig_hist)
@@ -1,13 +1,15 @@
 import streamlit as st
 import numpy as np
 import pandas as pd
-import plotly.graph_objs as go
 import io
-import yfinance as yf
-import smtplib
 from datetime import date
-from email.mime.text import MIMEText
 
+from alertas import CONDICOES, assinar, assinaturas, avaliar, status_condicoes
+from backtest import DIAS_POSICAO, GRADES, TICKERS_BACKTEST, backtest
+from importacoes import go, make_subplots
+from indicadores import indicadores
+from historico import frescor
+from indicadores_incrementais import sincronizar
 from utils import require_login, show_logo
 
 st.set_page_config(page_title="Mercado", page_icon="📈", layout="wide")
@@ -15,71 +17,12 @@ require_login()
 show_logo()
 
 
-def calcular_MACD(data, short_window=12, long_window=26, signal_window=9):
-    short_ema = data['Close'].ewm(span=short_window, min_periods=1, adjust=False).mean()
-    long_ema = data['Close'].ewm(span=long_window, min_periods=1, adjust=False).mean()
-    macd = short_ema - long_ema
-    signal_line = macd.ewm(span=signal_window, min_periods=1, adjust=False).mean()
-    data['MACD'] = macd
-    data['Signal Line'] = signal_line
-    data['Histograma'] = macd - signal_line
-    return data
-
-def calcular_CCI(data, window=20):
-    typical_price = (data['High'] + data['Low'] + data['Close']) / 3
-    mean_deviation = typical_price.rolling(window=window).apply(lambda x: np.mean(np.abs(x - np.mean(x))))
-    return (typical_price - typical_price.rolling(window=window).mean()) / (0.015 * mean_deviation)
-
-def calcular_estocastico(data, window=14):
-    low_min = data['Low'].rolling(window=window).min()
-    high_max = data['High'].rolling(window=window).max()
-    return ((data['Close'] - low_min) / (high_max - low_min)) * 100
-
-def calcular_estocastico_lento(data, window=14, smooth_k=3):
-    return calcular_estocastico(data, window).rolling(window=smooth_k).mean()
-
-def calcular_volatilidade_ewma_percentual(retornos_diarios_absolutos, span=20):
-    return retornos_diarios_absolutos.ewm(span=span).std() * 100
-
-def calcular_bollinger_bands(data, window=20, num_std_dev=2):
-    rolling_mean = data['Close'].rolling(window=window).mean()
-    rolling_std = data['Close'].rolling(window=window).std()
-    data['Bollinger High'] = rolling_mean + (rolling_std * num_std_dev)
-    data['Bollinger Low'] = rolling_mean - (rolling_std * num_std_dev)
-    return data
-
-def calcular_RSI(data, window=14):
-    delta = data['Close'].diff()
-    ganho = (delta.where(delta > 0, 0)).rolling(window=window).mean()
-    perda = (-delta.where(delta < 0, 0)).rolling(window=window).mean()
-    rs = ganho / perda
-    return 100 - (100 / (1 + rs))
-
-def enviar_alerta(email, ativo, cci_status, rsi_status, estocastico_status, bb_status):
-    smtp_server = "smtp.gmail.com"
-    smtp_port = 587
-    sender_email = st.secrets.get("smtp_email", "")
-    sender_password = st.secrets.get("smtp_password", "")
-    message = f"Alerta para o ativo {ativo}:\nCCI: {cci_status}\nRSI: {rsi_status}\nEstocástico: {estocastico_status}\nBandas de Bollinger: {bb_status}"
-    msg = MIMEText(message)
-    msg['Subject'] = f"Alerta de Mercado - {ativo}"
-    msg['From'] = sender_email
-    msg['To'] = email
-    try:
-        with smtplib.SMTP(smtp_server, smtp_port) as server:
-            server.starttls()
-            server.login(sender_email, sender_password)
-            server.sendmail(sender_email, email, msg.as_string())
-        st.success(f"Alerta enviado para {email}")
-    except Exception as e:
-        st.error(f"Erro ao enviar o e-mail: {e}")
-
-
 st.title("Mercado")
 ativo = st.selectbox("Selecione o ativo", ["SBK26.NYB", "USDBRL=X", "SB=F", "CL=F"])
 start_date = date(2014, 1, 1)
-today = date.today()
-data = yf.download(ativo, start=start_date, end=today.strftime('%Y-%m-%d'), auto_adjust=True, multi_level_index=False, progress=False)
+# Todos os indicadores calculados uma vez por ticker; trocar de indicador ou de datas só recorta.
+data = indicadores(ativo, start_date)
+st.caption(frescor(ativo).descricao())
 filtro_datas = st.date_input("Selecione um intervalo de datas:", value=[pd.to_datetime('2023-01-01'), pd.to_datetime('2025-01-01')])
 filtro_datas = [pd.Timestamp(d) for d in filtro_datas]
 indicador_selecionado = st.selectbox("Selecione o indicador", ["EWMA", "CCI", "Estocástico", "Bandas de Bollinger", "MACD", "RSI"])
@@ -87,16 +30,23 @@ sobrecompra = 100
 if indicador_selecionado == "CCI":
     sobrecompra = st.slider("Nível de sobrecompra do CCI", 100, 250, step=50, value=100)
 
+atuais = sincronizar(ativo)
+if atuais.ultima_data is not None:
+    with st.expander(f"Valores atuais — {atuais.ultima_data:%d/%m/%Y}"):
+        colunas = st.columns(5)
+        for coluna, (nome, chave, formato) in zip(colunas, [
+            ("Volatilidade EWMA", "EWMA Volatility", "{:.2f}%"), ("CCI", "CCI", "{:.1f}"),
+            ("Estocástico", "Estocástico", "{:.1f}"), ("RSI", "RSI", "{:.1f}"), ("MACD", "Histograma", "{:+.4f}"),
+        ]):
+            coluna.metric(nome, formato.format(atuais.valores[chave]))
+
 if st.button("Calcular"):
     data_filtrado = data[(data.index >= filtro_datas[0]) & (data.index <= filtro_datas[1])].copy()
     quantidade_entradas = 0
     soma_fechamentos_entradas = 0
 
     if indicador_selecionado == "EWMA":
-        data_filtrado['Daily Returns'] = data_filtrado['Close'].pct_change()
-        data_filtrado['EWMA Volatility'] = calcular_volatilidade_ewma_percentual(data_filtrado['Daily Returns'])
         data_filtrado.dropna(subset=['Daily Returns', 'EWMA Volatility'], inplace=True)
-        data_filtrado['Abs Daily Returns'] = data_filtrado['Daily Returns'].abs() * 100
         data_filtrado['Entry Points'] = data_filtrado['Daily Returns'] * 100 > data_filtrado['EWMA Volatility']
         quantidade_entradas = data_filtrado['Entry Points'].sum()
         if quantidade_entradas > 0:
@@ -112,7 +62,6 @@ if st.button("Calcular"):
         st.download_button(label="Baixar Arquivo Excel", data=excel_buffer, file_name="dados_ewma.xlsx", mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
 
     elif indicador_selecionado == "CCI":
-        data_filtrado['CCI'] = calcular_CCI(data_filtrado)
         data_filtrado['Entry Points'] = (data_filtrado['CCI'] > sobrecompra) & (data_filtrado['CCI'].shift(-1) < data_filtrado['CCI']) & (data_filtrado['CCI'].shift(1) < data_filtrado['CCI'])
         quantidade_entradas = data_filtrado['Entry Points'].sum()
         fig = go.Figure()
@@ -120,7 +69,6 @@ if st.button("Calcular"):
         st.plotly_chart(fig)
 
     elif indicador_selecionado == "Estocástico":
-        data_filtrado['Estocástico'] = calcular_estocastico_lento(data_filtrado)
         data_filtrado['Entry Points'] = (data_filtrado['Estocástico'] > 80) & (data_filtrado['Estocástico'].shift(-1) < data_filtrado['Estocástico']) & (data_filtrado['Estocástico'].shift(1) < data_filtrado['Estocástico'])
         quantidade_entradas = data_filtrado['Entry Points'].sum()
         fig = go.Figure()
@@ -128,7 +76,6 @@ if st.button("Calcular"):
         st.plotly_chart(fig)
 
     elif indicador_selecionado == "Bandas de Bollinger":
-        data_filtrado = calcular_bollinger_bands(data_filtrado)
         data_filtrado['Entry Points'] = (data_filtrado['Close'] > data_filtrado['Bollinger High']) & (data_filtrado['Close'].shift(-1) < data_filtrado['Close'])
         quantidade_entradas = data_filtrado['Entry Points'].sum()
         fig = go.Figure(data=[go.Candlestick(x=data_filtrado.index, open=data_filtrado['Open'], high=data_filtrado['High'], low=data_filtrado['Low'], close=data_filtrado['Close'])])
@@ -137,7 +84,6 @@ if st.button("Calcular"):
         st.plotly_chart(fig)
 
     elif indicador_selecionado == "MACD":
-        data_filtrado = calcular_MACD(data_filtrado)
         data_filtrado['Entry Points'] = (data_filtrado['MACD'] > data_filtrado['Signal Line']) & (data_filtrado['MACD'].shift(-1) < data_filtrado['Signal Line'].shift(-1))
         quantidade_entradas = data_filtrado['Entry Points'].sum()
         fig = go.Figure()
@@ -146,7 +92,6 @@ if st.button("Calcular"):
         st.plotly_chart(fig)
 
     elif indicador_selecionado == "RSI":
-        data_filtrado['RSI'] = calcular_RSI(data_filtrado)
         data_filtrado['Entry Points'] = (data_filtrado['RSI'] > 70) & (data_filtrado['RSI'].shift(-1) < data_filtrado['RSI'])
         quantidade_entradas = data_filtrado['Entry Points'].sum()
         fig = go.Figure()
@@ -159,8 +104,67 @@ if st.button("Calcular"):
     col2.metric("Média dos Fechamentos das Entradas", f"{soma_fechamentos_entradas:.2f}")
     col3.metric("Média de Todos os Candles", f"{float(media_fechamentos):.2f}")
 
-    gerar_alerta = st.checkbox("Gerar Alerta")
-    if gerar_alerta:
-        email = st.text_input("Digite seu e-mail para receber o alerta")
-        if email:
-            enviar_alerta(email, ativo, "Normal", "Normal", "Normal", "Normal")
+st.divider()
+st.subheader("Alertas por e-mail")
+status = status_condicoes(atuais)
+if status:
+    st.dataframe(pd.DataFrame({"Status": {nome: texto for nome, (_, texto) in status.items()}}).rename_axis("Indicador"))
+with st.form("alertas"):
+    email = st.text_input("Digite seu e-mail para receber o alerta")
+    cadastradas = next((a["condicoes"] for a in assinaturas(ativo) if a["email"] == email), list(CONDICOES))
+    condicoes = st.multiselect("Avisar quando", list(CONDICOES), default=cadastradas,
+                               format_func=lambda c: CONDICOES[c][0])
+    col_salvar, col_cancelar = st.columns(2)
+    salvar = col_salvar.form_submit_button("Gerar Alerta")
+    cancelar = col_cancelar.form_submit_button("Cancelar alerta")
+if email and (salvar or cancelar):
+    # Só grava a assinatura e enfileira; o envio é feito em segundo plano.
+    assinar(email, ativo, [] if cancelar else condicoes)
+    if cancelar:
+        st.success(f"Alertas de {ativo} cancelados para {email}")
+    else:
+        enfileirados = avaliar(ativo, atuais)
+        st.success(f"Alerta cadastrado para {email}: avaliado a cada atualização de {ativo}"
+                   + (", com um aviso já a caminho." if enfileirados else "."))
+
+
+st.divider()
+st.subheader("Backtest dos Sinais")
+st.caption("Cada ponto de entrada é uma venda no fechamento em que o sinal se confirma, recomprada após os dias de posição. "
+           f"Grade completa de parâmetros em {', '.join(TICKERS_BACKTEST)}, no intervalo de datas selecionado.")
+col_sinal, col_dias, col_metrica = st.columns(3)
+sinal_backtest = col_sinal.selectbox("Sinal", list(GRADES), index=list(GRADES).index(indicador_selecionado))
+dias_backtest = col_dias.select_slider("Dias de posição (mapa)", DIAS_POSICAO, value=20)
+metrica_backtest = col_metrica.radio("Métrica do mapa", ["Acerto (%)", "P&L médio (%)"], horizontal=True)
+minimo_entradas = st.number_input("Mínimo de entradas para o ranking", min_value=1, value=5, step=1)
+
+if st.button("Rodar backtest"):
+    resultados = [backtest(ticker, sinal_backtest, filtro_datas[0], filtro_datas[1]) for ticker in TICKERS_BACKTEST]
+    grade = GRADES[sinal_backtest]
+    d = DIAS_POSICAO.index(dias_backtest)
+
+    fig = make_subplots(rows=1, cols=len(resultados), subplot_titles=[r.ticker for r in resultados], shared_yaxes=True)
+    for i, resultado in enumerate(resultados, 1):
+        valores = resultado.acerto if metrica_backtest == "Acerto (%)" else resultado.pnl_medio
+        fig.add_trace(go.Heatmap(
+            x=[str(l) for l in grade.limiares], y=[str(j) for j in grade.janelas], z=valores[:, :, d],
+            customdata=resultado.entradas[:, :, d], coloraxis="coloraxis",
+            hovertemplate=f"{grade.nome_janela}: %{{y}}<br>{grade.nome_limiar}: %{{x}}<br>{metrica_backtest}: %{{z:.2f}}<br>Entradas: %{{customdata}}<extra></extra>",
+        ), row=1, col=i)
+        fig.update_xaxes(title_text=grade.nome_limiar, row=1, col=i)
+    fig.update_yaxes(title_text=grade.nome_janela, row=1, col=1)
+    fig.update_layout(title=f"{sinal_backtest}: {metrica_backtest} com {dias_backtest} dias de posição",
+                      coloraxis=dict(colorscale="RdYlGn"))
+    st.plotly_chart(fig, use_container_width=True)
+
+    st.write("Vender em todo pregão (referência):")
+    st.dataframe(pd.DataFrame({
+        r.ticker: [f"{a:.1f}% / {p:.2f}%" for a, p in zip(r.base_acerto, r.base_pnl)] for r in resultados
+    }, index=[f"{dias} dias" for dias in DIAS_POSICAO]).rename_axis("Acerto / P&L médio"))
+
+    tabela = pd.concat([r.tabela() for r in resultados], ignore_index=True)
+    ranking = tabela[tabela["Entradas"] >= minimo_entradas].sort_values("P&L médio (%)", ascending=False)
+    st.write(f"Melhores combinações (mínimo de {minimo_entradas} entradas)")
+    st.dataframe(ranking.head(20).round(2), use_container_width=True)
+    st.download_button("Baixar backtest completo (CSV)", tabela.to_csv(index=False).encode("utf-8"),
+                       file_name=f"backtest_{sinal_backtest}.csv", mime="text/csv")
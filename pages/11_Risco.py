@@ -1,9 +1,11 @@
 import streamlit as st
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
+from functools import partial
 
+from cenarios import JANELAS, MODOS, VARIAVEIS_RISCO, fator_drivers, lote_risco
+from importacoes import plt, stats
+from monte_carlo import executar
 from utils import require_login, show_logo
 
 st.set_page_config(page_title="Risco", page_icon="📈", layout="wide")
@@ -11,42 +13,28 @@ require_login()
 show_logo()
 
 
-def calcular_faturamento(vhp_total, ny, cambio, preco_cbios, preco_etanol):
-    acucar = ((ny - 0.19) * 22.0462 * 1.04 * cambio) * vhp_total + 17283303
-    etanol = preco_etanol * 35524
-    cjm = 24479549
-    cbios = preco_cbios * 31616
-    return acucar + etanol + cjm + cbios
+def simulacao_monte_carlo_risco(valores_medios, perc_15, perc_85, num_simulacoes, semente=None, fator=None):
+    # `fator`: Cholesky da correlação entre os drivers (cenarios.fator_drivers); None = independentes.
+    medias = np.array([valores_medios[v]['Valor Médio'] for v in VARIAVEIS_RISCO], dtype=float)
+    desvios = np.array([(perc_85[v]['Percentil 85'] - perc_15[v]['Percentil 15']) / 2 for v in VARIAVEIS_RISCO], dtype=float)
 
+    resultado = executar(partial(lote_risco, medias, desvios, fator), num_simulacoes, semente)
+    return resultado.valores['faturamentos'], resultado.valores['custos'], resultado.segundos
 
-def calcular_custo(faturamento, moagem_total, atr, preco_cbios):
-    atr_mtm = 0.6 * (faturamento - preco_cbios) / (moagem_total * atr)
-    cana_acucar_atr = atr_mtm * moagem_total * atr
-    gastos_variaveis = 32947347 + cana_acucar_atr
-    gastos_fixos = 109212811
-    return gastos_fixos + gastos_variaveis
 
-
-def simulacao_monte_carlo_risco(valores_medios, perc_15, perc_85, num_simulacoes):
-    faturamentos = []
-    custos = []
-    for _ in range(num_simulacoes):
-        moagem_total_simulado = np.random.normal(valores_medios['Moagem Total']['Valor Médio'], (perc_85['Moagem Total']['Percentil 85'] - perc_15['Moagem Total']['Percentil 15']) / 2)
-        atr_simulado = np.random.normal(valores_medios['ATR']['Valor Médio'], (perc_85['ATR']['Percentil 85'] - perc_15['ATR']['Percentil 15']) / 2)
-        vhp_total_simulado = np.random.normal(valores_medios['VHP Total']['Valor Médio'], (perc_85['VHP Total']['Percentil 85'] - perc_15['VHP Total']['Percentil 15']) / 2)
-        ny_simulado = np.random.normal(valores_medios['NY']['Valor Médio'], (perc_85['NY']['Percentil 85'] - perc_15['NY']['Percentil 15']) / 2)
-        cambio_simulado = np.random.normal(valores_medios['Câmbio']['Valor Médio'], (perc_85['Câmbio']['Percentil 85'] - perc_15['Câmbio']['Percentil 15']) / 2)
-        preco_cbios_simulado = np.random.normal(valores_medios['Preço CBIOS']['Valor Médio'], (perc_85['Preço CBIOS']['Percentil 85'] - perc_15['Preço CBIOS']['Percentil 15']) / 2)
-        preco_etanol_simulado = np.random.normal(valores_medios['Preço Etanol']['Valor Médio'], (perc_85['Preço Etanol']['Percentil 85'] - perc_15['Preço Etanol']['Percentil 15']) / 2)
-        fat = calcular_faturamento(vhp_total_simulado, ny_simulado, cambio_simulado, preco_cbios_simulado, preco_etanol_simulado)
-        faturamentos.append(fat)
-        custos.append(calcular_custo(fat, moagem_total_simulado, atr_simulado, preco_cbios_simulado))
-    return faturamentos, custos
+AMOSTRA_KDE = 20_000
 
 
 def plot_histograma(resultados, titulo, cor):
+    # Histograma pré-agregado e KDE sobre uma amostra fixa: o custo do gráfico
+    # não cresce com o número de cenários.
+    contagens, bordas = np.histogram(resultados, bins=50)
+    amostra = resultados[:: max(1, len(resultados) // AMOSTRA_KDE)]
+    grade = np.linspace(bordas[0], bordas[-1], 200)
+    densidade = stats.gaussian_kde(amostra)(grade) * len(resultados) * (bordas[1] - bordas[0])
     fig, ax = plt.subplots(figsize=(10, 6))
-    sns.histplot(resultados, bins=50, kde=True, color=cor, ax=ax)
+    ax.stairs(contagens, bordas, fill=True, color=cor, alpha=0.6)
+    ax.plot(grade, densidade, color=cor)
     ax.set_xlabel('Valor (R$)')
     ax.set_ylabel('Frequência')
     ax.set_title(titulo)
@@ -69,18 +57,34 @@ inputs = {
     'Preço Etanol': {'Valor Médio': col1.number_input('Preço Etanol - Valor Médio', value=3000), 'Percentil 15': col2.number_input('Preço Etanol - Percentil 15', value=2500), 'Percentil 85': col3.number_input('Preço Etanol - Percentil 85', value=3500)},
 }
 
+num_simulacoes = st.selectbox("Número de cenários", [10_000, 100_000, 1_000_000], format_func=lambda n: f"{n:,}".replace(",", "."))
+semente = st.number_input("Semente (0 = nova a cada simulação)", min_value=0, value=0, step=1)
+modo = st.radio("Drivers de mercado (NY, Câmbio, Etanol)", MODOS, horizontal=True)
+fator = None
+if modo == "Correlacionado":
+    janela = st.selectbox("Janela da correlação", list(JANELAS))
+    correlacao, fator = fator_drivers(VARIAVEIS_RISCO, JANELAS[janela])
+    st.caption("Correlação dos log-retornos diários de SB=F, USDBRL=X e CL=F (proxy do etanol).")
+    st.dataframe(pd.DataFrame(correlacao, index=VARIAVEIS_RISCO, columns=VARIAVEIS_RISCO).style.format("{:.2f}"))
+
 if st.button("Simular"):
-    faturamentos, custos = simulacao_monte_carlo_risco(inputs, inputs, inputs, 10000)
+    faturamentos, custos, segundos = simulacao_monte_carlo_risco(inputs, inputs, inputs, num_simulacoes, semente or None, fator)
+    ebtida_ajustado = faturamentos - custos + 7219092
+    st.caption(f"{len(faturamentos):,} cenários em {segundos:.2f} s".replace(",", "."))
+    percentis_desejados = [1, 5, 10, 15, 20, 30, 40, 50, 60, 70, 80, 85, 90, 95, 99]
     st.subheader("Faturamento")
     plot_histograma(faturamentos, "Distribuição de Frequência do Faturamento Total", "skyblue")
-    percentis_desejados = [1, 5, 10, 15, 20, 30, 40, 50, 60, 70, 80, 85, 90, 95, 99]
     st.write(f"**Faturamento Médio:** R$ {np.mean(faturamentos):,.2f}")
-    df_fat = pd.DataFrame({'Percentil': percentis_desejados, 'Faturamento': [np.percentile(faturamentos, p) for p in percentis_desejados]})
-    st.dataframe(df_fat)
     st.subheader("Custo")
     plot_histograma(custos, "Distribuição de Frequência do Custo Total", "orange")
     st.write(f"**Custo Médio:** R$ {np.mean(custos):,.2f}")
-    ebtida_ajustado = [f - c + 7219092 for f, c in zip(faturamentos, custos)]
     st.subheader("Ebtida Ajustado")
     plot_histograma(ebtida_ajustado, "Distribuição de Frequência do Ebtida Ajustado", "lightgreen")
     st.write(f"**Ebtida Ajustado Médio:** R$ {np.mean(ebtida_ajustado):,.2f}")
+    st.subheader("Percentis")
+    st.dataframe(pd.DataFrame({
+        'Percentil': percentis_desejados,
+        'Faturamento': np.percentile(faturamentos, percentis_desejados),
+        'Custo': np.percentile(custos, percentis_desejados),
+        'Ebtida Ajustado': np.percentile(ebtida_ajustado, percentis_desejados),
+    }).style.format({c: 'R$ {:,.0f}' for c in ['Faturamento', 'Custo', 'Ebtida Ajustado']}))
@@ -1,7 +1,7 @@
 import streamlit as st
 import numpy as np
-import plotly.graph_objs as go
 
+from importacoes import go
 from utils import require_login, show_logo
 
 st.set_page_config(page_title="Breakeven", page_icon="📈", layout="wide")
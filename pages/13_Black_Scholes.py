@@ -1,37 +1,42 @@
 import streamlit as st
 import numpy as np
 import pandas as pd
-import plotly.graph_objs as go
-import scipy.stats as si
-import yfinance as yf
 from datetime import datetime
 
+from americanas import arvore_binomial, longstaff_schwartz, trajetorias_neutras
+from black_scholes import gregas
+from historico import carregar_historico
+from importacoes import go, make_subplots
 from utils import require_login, show_logo
+from vol_implicita import snapshot_local, superficie
 
 st.set_page_config(page_title="Black-Scholes", page_icon="📈", layout="wide")
 require_login()
 show_logo()
 
 
-def black_scholes(S, K, T, r, sigma, option_type):
-    d1 = (np.log(S / K) + (r + 0.5 * sigma ** 2) * T) / (sigma * np.sqrt(T))
-    d2 = d1 - sigma * np.sqrt(T)
-    if option_type == 'call':
-        return S * si.norm.cdf(d1, 0.0, 1.0) - K * np.exp(-r * T) * si.norm.cdf(d2, 0.0, 1.0)
-    elif option_type == 'put':
-        return K * np.exp(-r * T) * si.norm.cdf(-d2, 0.0, 1.0) - S * si.norm.cdf(-d1, 0.0, 1.0)
-    else:
-        raise ValueError("Tipo de opção inválido. Use 'call' ou 'put'.")
-
-
 assets = {'SBK26.NYB': datetime(2026, 4, 30)}
 volatilities = {'SBK26.NYB': 0.2573}
 risk_free_rate = 0.053
+METODOS_ARVORE = {"Leisen-Reimer": "lr", "Cox-Ross-Rubinstein": "crr"}
+DATAS_LSM = 50
 
 st.title("Simulador de Preços de Opções - Modelo Black-Scholes")
 asset = st.selectbox("Selecione o ativo subjacente", list(assets.keys()))
 option_type = st.selectbox("Selecione o tipo de opção", ["call", "put"])
 strike_price = st.number_input("Digite o preço de exercício (strike): ", min_value=1.0, value=20.0, step=0.5)
+fonte_vol = st.radio("Volatilidade", ["Superfície implícita", "Constante"], horizontal=True,
+                     help="Superfície construída a partir da cadeia de opções enviada ou salva para o ativo.")
+arquivo_cotacoes = st.file_uploader("Cadeia de opções (CSV: vencimento, strike, tipo, preco[, subjacente])", type="csv")
+americana = st.checkbox("Exercício americano", help="As opções de açúcar nº 11 da ICE são americanas sobre o futuro: "
+                        "compara a europeia com a árvore binomial e com Longstaff-Schwartz.")
+if americana:
+    col_metodo, col_passos, col_caminhos = st.columns(3)
+    metodo_arvore = col_metodo.selectbox("Árvore", list(METODOS_ARVORE))
+    passos_arvore = col_passos.selectbox("Passos da árvore", [101, 501, 1001], index=1)
+    caminhos_lsm = col_caminhos.selectbox("Caminhos (Longstaff-Schwartz)", [10_000, 50_000],
+                                          format_func=lambda n: f"{n:,}".replace(",", "."))
+metrica_mapa = st.selectbox("Mapa de calor (strike × prazo)", ['Preço', 'Delta', 'Gama', 'Vega', 'Theta', 'Rho'])
 
 if st.button("Simular"):
     expiration_date = assets[asset]
@@ -42,19 +47,47 @@ if st.button("Simular"):
     if T <= 0:
         st.error("O contrato selecionado já expirou.")
         st.stop()
-    hist = yf.Ticker(asset).history(period="5d")
+    hist = carregar_historico(asset)
     if hist.empty:
         st.error(f"Não foi possível obter dados para {asset}.")
         st.stop()
     S = hist['Close'].iloc[-1]
-    option_price = black_scholes(S, strike_price, T, risk_free_rate, sigma, option_type)
-    st.write(f"O preço da {option_type} é: {option_price:.2f}")
     strikes = np.arange(16, 22.25, 0.25)
-    call_prices = [black_scholes(S, k, T, risk_free_rate, sigma, 'call') for k in strikes]
-    put_prices = [black_scholes(S, k, T, risk_free_rate, sigma, 'put') for k in strikes]
-    df_options = pd.DataFrame({'Strike': strikes, 'Call Prices': call_prices, 'Put Prices': put_prices})
+    times_to_expiration = np.linspace(0.01, T, 100)
+
+    # Volatilidade por strike e prazo: superfície implícita do snapshot ou constante.
+    sup = None
+    if fonte_vol == "Superfície implícita":
+        origem = arquivo_cotacoes.getvalue() if arquivo_cotacoes is not None else snapshot_local(asset)
+        if origem is None:
+            st.warning(f"Nenhuma cadeia de opções para {asset}; usando volatilidade constante de {sigma:.2%}.")
+        else:
+            try:
+                sup = superficie(origem, S, risk_free_rate, current_date.date())
+            except ValueError as erro:
+                st.warning(f"{erro} Usando volatilidade constante de {sigma:.2%}.")
+    vol = sup.vol if sup is not None else (lambda K, t: np.full(np.broadcast(K, t).shape, sigma))
+
+    # Strike escolhido, tabela de strikes e grade strike × prazo, cada um numa chamada vetorizada.
+    atual = gregas(S, strike_price, T, risk_free_rate, vol(strike_price, T)).da_opcao(option_type)
+    curva = gregas(S, strikes, T, risk_free_rate, vol(strikes, T))
+    vol_grade = vol(strikes[:, None], times_to_expiration)
+    grade = gregas(S, strikes[:, None], times_to_expiration, risk_free_rate, vol_grade).da_opcao(option_type)
+
+    option_price = atual['Preço']
+    st.write(f"O preço da {option_type} é: {option_price:.2f} (volatilidade {float(vol(strike_price, T)):.2%})")
+    escalas = {'Vega': 0.01, 'Theta': 1 / 365, 'Rho': 0.01}
+    colunas = st.columns(5)
+    for coluna, (nome, valor) in zip(colunas, list(atual.items())[1:]):
+        coluna.metric(nome, f"{valor * escalas.get(nome, 1):.4f}")
+    st.caption("Vega e Rho por 1 p.p.; Theta por dia corrido.")
+
+    df_options = pd.DataFrame({'Strike': strikes, 'Call Prices': curva.call, 'Put Prices': curva.put})
+    for nome, valores in curva.da_opcao(option_type).items():
+        if nome != 'Preço':
+            df_options[nome] = valores * escalas.get(nome, 1)
     st.write("Tabela de Preços das Opções")
-    st.write(round(df_options, 2))
+    st.write(round(df_options, 4))
     fig = go.Figure()
     if option_type == 'call':
         fig.add_trace(go.Scatter(x=df_options['Strike'], y=df_options['Call Prices'], mode='lines', name='Call Prices'))
@@ -62,9 +95,73 @@ if st.button("Simular"):
         fig.add_trace(go.Scatter(x=df_options['Strike'], y=df_options['Put Prices'], mode='lines', name='Put Prices'))
     fig.update_layout(title=f"Preços das Opções {option_type.upper()}", xaxis_title="Strike Price", yaxis_title="Option Price", template="plotly_dark")
     st.plotly_chart(fig)
-    times_to_expiration = np.linspace(0.01, T, 100)
-    option_prices_vs_time = [black_scholes(S, strike_price, t, risk_free_rate, sigma, option_type) for t in times_to_expiration]
+
+    fig_mapa = go.Figure(go.Heatmap(
+        x=strikes, y=times_to_expiration, z=(grade[metrica_mapa] * escalas.get(metrica_mapa, 1)).T,
+        colorscale='Viridis', colorbar=dict(title=metrica_mapa),
+    ))
+    fig_mapa.update_layout(title=f"{metrica_mapa} da {option_type.upper()} por Strike e Prazo", xaxis_title="Strike Price", yaxis_title="Time to Expiration (Years)", template="plotly_dark")
+    st.plotly_chart(fig_mapa)
+
+    # Perfis das gregas por strike em alguns prazos da grade.
+    fig_gregas = make_subplots(rows=2, cols=3, subplot_titles=list(grade))
+    prazos = np.unique(np.linspace(0, len(times_to_expiration) - 1, 4).astype(int))
+    for i, (nome, valores) in enumerate(grade.items()):
+        for j in prazos:
+            fig_gregas.add_trace(go.Scatter(
+                x=strikes, y=valores[:, j] * escalas.get(nome, 1), mode='lines',
+                name=f"T = {times_to_expiration[j]:.2f}", legendgroup=str(j), showlegend=i == 0,
+            ), row=i // 3 + 1, col=i % 3 + 1)
+    fig_gregas.update_layout(title=f"Gregas da {option_type.upper()} por Strike", template="plotly_dark", height=600)
+    st.plotly_chart(fig_gregas)
+
+    option_prices_vs_time = gregas(S, strike_price, times_to_expiration, risk_free_rate, vol(strike_price, times_to_expiration)).da_opcao(option_type)['Preço']
     fig_time = go.Figure()
     fig_time.add_trace(go.Scatter(x=times_to_expiration, y=option_prices_vs_time, mode='lines', name='Option Price'))
     fig_time.update_layout(title=f"Preço da {option_type.upper()} em Função do Tempo", xaxis_title="Time to Expiration (Years)", yaxis_title="Option Price", template="plotly_dark")
     st.plotly_chart(fig_time)
+
+    if sup is not None:
+        st.subheader("Volatilidade Implícita")
+        fig_smile = go.Figure()
+        for vencimento, pontos in sup.pontos.groupby("vencimento"):
+            nome = f"{vencimento:%d/%m/%Y}"
+            fig_smile.add_trace(go.Scatter(x=pontos["strike"], y=pontos["vol"], mode='markers', name=nome))
+            k = np.linspace(pontos["strike"].min(), pontos["strike"].max(), 100)
+            fig_smile.add_trace(go.Scatter(x=k, y=sup.vol(k, pontos["prazo"].iloc[0]), mode='lines', name=nome,
+                                           showlegend=False, line=dict(dash='dot')))
+        fig_smile.update_layout(title="Smile por Vencimento", xaxis_title="Strike Price", yaxis_title="Implied Volatility", yaxis_tickformat='.0%', template="plotly_dark")
+        st.plotly_chart(fig_smile)
+        fig_sup = go.Figure(go.Heatmap(x=strikes, y=times_to_expiration, z=vol_grade.T, colorscale='Viridis', colorbar=dict(title='Vol', tickformat='.0%')))
+        fig_sup.update_layout(title="Superfície de Volatilidade Usada no Apreçamento", xaxis_title="Strike Price", yaxis_title="Time to Expiration (Years)", template="plotly_dark")
+        st.plotly_chart(fig_sup)
+        st.caption(f"{len(sup.pontos)} cotações com volatilidade implícita em {len(sup.prazos)} vencimentos.")
+
+    if americana:
+        st.subheader("Exercício Americano")
+        # Mesma volatilidade nos dois métodos: as trajetórias do Longstaff-Schwartz são compartilhadas pelos strikes.
+        sigma_americana = float(vol(strike_price, T))
+        arvore = arvore_binomial(S, strikes, T, risk_free_rate, sigma_americana, option_type,
+                                 passos_arvore, METODOS_ARVORE[metodo_arvore])
+        inicio_trajetorias = datetime.now()
+        trajetorias = trajetorias_neutras(S, T, sigma_americana, DATAS_LSM, caminhos_lsm)
+        segundos_trajetorias = (datetime.now() - inicio_trajetorias).total_seconds()
+        lsm = longstaff_schwartz(trajetorias, S, strikes, T, risk_free_rate, sigma_americana, option_type)
+        st.write(pd.DataFrame({
+            'Strike': strikes,
+            'Europeia': arvore.europeus,
+            'Árvore': arvore.precos,
+            'Longstaff-Schwartz': lsm.precos,
+            'Erro Padrão LSM': lsm.erro_padrao,
+            'Prêmio de Exercício': arvore.premio,
+        }).round(4))
+        st.caption(f"Volatilidade {sigma_americana:.2%}. Árvore {metodo_arvore}: {len(strikes)} strikes × {len(arvore.tempos)} passos "
+                   f"em {arvore.segundos * 1000:.0f} ms. Longstaff-Schwartz: {caminhos_lsm:,} caminhos × {DATAS_LSM} datas "
+                   f"em {segundos_trajetorias + lsm.segundos:.2f} s (simulação {segundos_trajetorias:.2f} s).".replace(",", "."))
+        i = int(np.argmin(np.abs(strikes - strike_price)))
+        fig_fronteira = go.Figure()
+        fig_fronteira.add_trace(go.Scatter(x=arvore.tempos, y=arvore.fronteira[i], mode='lines', name=f'Árvore ({metodo_arvore})'))
+        fig_fronteira.add_trace(go.Scatter(x=lsm.tempos, y=lsm.fronteira[i], mode='markers', name='Longstaff-Schwartz'))
+        fig_fronteira.add_hline(y=S, line_dash='dot', annotation_text='Preço atual')
+        fig_fronteira.update_layout(title=f"Fronteira de Exercício Antecipado da {option_type.upper()} — Strike {strikes[i]:.2f}", xaxis_title="Tempo Decorrido (Anos)", yaxis_title="Preço Crítico do Futuro", template="plotly_dark")
+        st.plotly_chart(fig_fronteira)
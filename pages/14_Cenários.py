@@ -1,10 +1,12 @@
 import streamlit as st
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-import scipy.stats as stats
 
+from functools import partial
+
+from cenarios import JANELAS, MODOS, calcular_ebtida_ajustado, fator_drivers, lote_ebtida
+from importacoes import plt, stats
+from monte_carlo import executar
 from utils import require_login, show_logo
 
 st.set_page_config(page_title="Cenários", page_icon="📈", layout="wide")
@@ -12,14 +14,6 @@ require_login()
 show_logo()
 
 
-def calcular_ebtida_ajustado(Moagem, Cambio, Preco_Etanol, NY):
-    VHP = (89.45 * 0.8346 * Moagem) / 1000
-    Etanol = (0.1654 * 80.18 * Moagem + 327.19 * 60075) / 1000
-    Faturamento = (VHP - 4047) * (NY - 0.19) * 22.0462 * 1.04 * Cambio + (Etanol - 1000) * (Preco_Etanol + 349.83) * 0.96 + 3227430 + 22061958 + 12000 * (NY + 1) * 22.0462 * 0.75 * Cambio
-    Custo = 0.6 * 0.93 * ((VHP - 4047) * (NY - 0.19) * 22.0462 * 1.04 * Cambio + (Etanol - 1000) * (Preco_Etanol + 349.83) * 0.96 + 12000 * (NY + 1) * 22.0462 * 0.75 * Cambio) + 88704735 + 43732035 + 20286465
-    return Faturamento - Custo
-
-
 def encontrar_break_even(opcao, NY, Moagem, Cambio, Preco_Etanol):
     if opcao == "Moagem":
         while calcular_ebtida_ajustado(Moagem, Cambio, Preco_Etanol, NY) <= 0:
@@ -39,6 +33,34 @@ def encontrar_break_even(opcao, NY, Moagem, Cambio, Preco_Etanol):
         return NY
 
 
+DRIVERS_CENARIOS = ["Moagem", "Câmbio", "Preço Etanol", "NY"]
+
+
+def marginais():
+    # Média e desvio de referência de cada driver, os mesmos dos gráficos abaixo.
+    return {
+        "Moagem": (1300000, (1400000 - 1300000) / stats.norm.ppf(0.8)),
+        "Preço Etanol": (2768.90, (3000.28 - 2768.90) / stats.norm.ppf(0.7)),
+        "Câmbio": (5.2504, (5.4293 - 5.1904) / stats.norm.ppf(0.8)),
+        "NY": (20.5572, (22.3796 - 20.5572) / stats.norm.ppf(0.8)),
+    }
+
+
+def risco_conjunto(opcao, valores, fator=None, num_simulacoes=200_000):
+    # P(Ebtida ajustado < 0) com todos os drivers sorteados juntos: `opcao` em
+    # torno da sua referência e os demais em torno dos valores informados.
+    referencia = marginais()
+    medias = [referencia[d][0] if d == opcao else valores[d] for d in DRIVERS_CENARIOS]
+    desvios = [referencia[d][1] for d in DRIVERS_CENARIOS]
+    lote = partial(lote_ebtida, medias, desvios, fator)
+    return executar(lote, num_simulacoes, acumular=True).valores["prejuizo"]
+
+
+def mostrar_risco_conjunto(opcao, valores, fator, modo):
+    risco = risco_conjunto(opcao, valores, fator)
+    st.write(f"Risco conjunto ({modo.lower()}): {float(risco.media)*100:.2f}% ± {1.96*float(risco.erro_padrao)*100:.2f} p.p.")
+
+
 def probabilidade_abaixo_break_even(valor, media, percentil):
     desvio_padrao = (percentil - media) / stats.norm.ppf(0.8)
     return stats.norm.cdf(valor, loc=media, scale=desvio_padrao)
@@ -65,6 +87,12 @@ def plotar_grafico_distribuicao(break_even, media, desvio_padrao):
 
 st.title("Cenários")
 opcao = st.selectbox("Opção desejada", ("Moagem", "Preço Etanol", "Câmbio", "NY"))
+modo = st.radio("Drivers no risco conjunto", MODOS, horizontal=True,
+                help="Correlacionado usa a correlação histórica de SB=F, USDBRL=X e CL=F (proxy do etanol).")
+fator = None
+if modo == "Correlacionado":
+    janela = st.selectbox("Janela da correlação", list(JANELAS))
+    _, fator = fator_drivers(DRIVERS_CENARIOS, JANELAS[janela])
 
 if opcao == "Moagem":
     NY = st.number_input("Valor de NY", value=20.0)
@@ -79,6 +107,7 @@ if opcao == "Moagem":
         df = pd.DataFrame(percentis, columns=["Percentil", "Valor"])
         df["Cor"] = np.where(df["Valor"] >= be, "green", "red")
         st.dataframe(df.set_index("Percentil"))
+        mostrar_risco_conjunto(opcao, {"NY": NY, "Preço Etanol": Preco_Etanol, "Câmbio": Cambio}, fator, modo)
 
 elif opcao == "Preço Etanol":
     NY = st.number_input("Valor de NY", value=20.0)
@@ -93,6 +122,7 @@ elif opcao == "Preço Etanol":
         df = pd.DataFrame(percentis, columns=["Percentil", "Valor"])
         df["Cor"] = np.where(df["Valor"] >= be, "green", "red")
         st.dataframe(df.set_index("Percentil"))
+        mostrar_risco_conjunto(opcao, {"NY": NY, "Moagem": Moagem, "Câmbio": Cambio}, fator, modo)
 
 elif opcao == "Câmbio":
     NY = st.number_input("Valor de NY", value=20.0)
@@ -103,6 +133,7 @@ elif opcao == "Câmbio":
         prob = probabilidade_abaixo_break_even(be, 5.2504, 5.4293)
         st.write(f"Breakeven: {be:.2f} | Risco: {prob*100:.2f}%")
         plotar_grafico_distribuicao(be, 5.2504, (5.4293 - 5.1904) / stats.norm.ppf(0.8))
+        mostrar_risco_conjunto(opcao, {"NY": NY, "Moagem": Moagem, "Preço Etanol": Preco_Etanol}, fator, modo)
 
 elif opcao == "NY":
     Moagem = st.number_input("Valor da Moagem")
@@ -113,3 +144,4 @@ elif opcao == "NY":
         prob = probabilidade_abaixo_break_even(be, 20.5572, 22.3796)
         st.write(f"Breakeven: {be:.2f} | Risco: {prob*100:.2f}%")
         plotar_grafico_distribuicao(be, 20.5572, (22.3796 - 20.5572) / stats.norm.ppf(0.8))
+        mostrar_risco_conjunto(opcao, {"Moagem": Moagem, "Câmbio": Cambio, "Preço Etanol": Preco_Etanol}, fator, modo)
@@ -1,11 +1,10 @@
 import streamlit as st
 import numpy as np
 import pandas as pd
-import plotly.graph_objs as go
-import yfinance as yf
-from scipy.stats import norm
 from datetime import date, datetime
 
+from historico import carregar_historico, frescor
+from importacoes import go, norm
 from utils import require_login, show_logo
 
 st.set_page_config(page_title="VaR", page_icon="📈", layout="wide")
@@ -34,11 +33,12 @@ def calcular_dias_uteis(data_inicio, data_fim):
 st.title("Análise de Risco - VaR")
 escolha = st.selectbox('Selecione o ativo:', ['USDBRL=X', 'SB=F'])
 start_date = date(2013, 1, 1)
-data = yf.download(escolha, start=start_date, end=date.today().strftime('%Y-%m-%d'), auto_adjust=True, multi_level_index=False, progress=False)
+data = carregar_historico(escolha, start_date, date.today())
 
 if data.empty:
     st.error("Não foi possível baixar os dados.")
     st.stop()
+st.caption(frescor(escolha).descricao())
 
 current_price = float(data["Close"].iloc[-1])
 data_fim = st.date_input('Selecione a data final:', datetime.now())
@@ -1,8 +1,8 @@
 import streamlit as st
 import pandas as pd
-import plotly.graph_objs as go
 import io
 
+from importacoes import go
 from utils import require_login, show_logo
 
 st.set_page_config(page_title="Relatório Focus", page_icon="📈", layout="wide")
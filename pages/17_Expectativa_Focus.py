@@ -1,9 +1,8 @@
 import streamlit as st
 import numpy as np
 import pandas as pd
-import plotly.graph_objs as go
-from scipy.stats import norm
 
+from importacoes import go, norm
 from utils import require_login, show_logo
 
 st.set_page_config(page_title="Expectativa Focus", page_icon="📈", layout="wide")
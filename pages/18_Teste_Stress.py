@@ -1,8 +1,8 @@
 import streamlit as st
 import numpy as np
 import pandas as pd
-import plotly.graph_objs as go
 
+from importacoes import go
 from utils import require_login, show_logo
 
 st.set_page_config(page_title="Teste de Stress", page_icon="📈", layout="wide")
@@ -1,12 +1,9 @@
 import streamlit as st
 import pandas as pd
-import plotly.graph_objs as go
-import yfinance as yf
 from datetime import date
-from statsmodels.tsa.seasonal import seasonal_decompose
-from statsmodels.tsa.stattools import acf
-from statsmodels.tsa.arima.model import ARIMA
 
+from historico import carregar_historico
+from importacoes import ARIMA, acf, go, seasonal_decompose
 from utils import require_login, show_logo
 
 st.set_page_config(page_title="ARIMA Dólar", page_icon="📈", layout="wide")
@@ -17,7 +14,7 @@ show_logo()
 @st.cache_data(ttl=3600)
 def baixar_dados_dolar():
     start_date = date(2014, 1, 1)
-    df = yf.download('USDBRL=X', start=start_date, end=date.today().strftime('%Y-%m-%d'), auto_adjust=True, multi_level_index=False, progress=False)
+    df = carregar_historico('USDBRL=X', start_date, date.today())
     return df
 
 
@@ -1,9 +1,10 @@
-import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
 import streamlit as st
 
 from config import ATIVOS, carregar_dados
+from importacoes import plt
+from monte_carlo import Amostragem, AritmeticoTruncado, comparar_precisao, diferencas_precisao, precificar_strikes
 from utils import require_login
 
 st.set_page_config(page_title="Simulação de Preços de Calls", page_icon="📈", layout="wide")
@@ -19,40 +20,41 @@ st.write("")
 
 
 # ---------------------------------------------------------------------------
-# Simulation — European call, final day only
+# Simulation — European calls and puts, final day only, one path set for all strikes
 # ---------------------------------------------------------------------------
 
-def simulacao_monte_carlo(
-    media: float,
-    std: float,
-    dias: int,
-    num_simulacoes: int,
-    limite_inf: float,
-    limite_sup: float,
-    preco_inicial: float,
-    valor_strike: float,
-) -> float:
-    retornos = np.random.normal(media, std, (dias, num_simulacoes))
-    fator = np.cumprod(1 + retornos, axis=0)
-    precos = np.clip(preco_inicial * fator, limite_inf, limite_sup)
-    precos_finais = precos[-1, :]
-    return float(np.mean(np.maximum(precos_finais - valor_strike, 0)))
-
-
-def simular_calls(dias_simulados, data, limite_inferior, limite_superior):
+REDUCOES = {
+    "Variáveis antitéticas": "antitetica",
+    "Variável de controle (Black-Scholes)": "controle",
+    "Sobol embaralhado": "sobol",
+}
+
+
+def simular_calls(dias_simulados, data, limite_inferior, limite_superior, semente=None,
+                  num_simulacoes=10_000, amostragem=None, tolerancia=None, precisao=np.float64, comparar=False):
+    # Com `comparar`, roda também em float64 (mesma semente) e devolve a comparação.
     media = data["Daily Return"].mean()
     std = data["Daily Return"].std()
     preco_inicial = data["Close"].iloc[-1]
-    num_simulacoes = 10_000
 
-    resultados = []
-    for strike in np.arange(limite_inferior, limite_superior + 0.25, 0.25):
-        valor_justo = simulacao_monte_carlo(
-            media, std, dias_simulados, num_simulacoes,
-            limite_inferior, limite_superior, preco_inicial, float(strike),
-        )
-        resultados.append([round(float(strike), 2), round(valor_justo, 4)])
-    return resultados
+    strikes = np.round(np.arange(limite_inferior, limite_superior + 0.25, 0.25), 2)
+    dinamica = AritmeticoTruncado(media, std, limite_inferior, limite_superior)
+    argumentos = (dinamica, preco_inicial, dias_simulados, strikes, num_simulacoes)
+    opcoes = dict(semente=semente, amostragem=amostragem, tolerancia=tolerancia)
+    comparacao = None
+    if comparar:
+        comparacao = comparar_precisao(precificar_strikes, *argumentos, **opcoes)
+        resultado = comparacao["float32"]
+    else:
+        resultado = precificar_strikes(*argumentos, **opcoes, precisao=precisao)
+    call, put = resultado.valores["call"], resultado.valores["put"]
+    return resultado, comparacao, pd.DataFrame({
+        "Strike": strikes,
+        "Preço Justo": call.media.round(4),
+        "Erro Padrão Call": call.erro_padrao.round(4),
+        "Put": put.media.round(4),
+        "Erro Padrão Put": put.erro_padrao.round(4),
+    })
 
 
 # ---------------------------------------------------------------------------
@@ -65,7 +67,19 @@ tempo_desejado = st.sidebar.slider(
     "Para quantos dias você quer avaliar o preço?",
     min_value=1, max_value=180, value=30,
 )
-simular = st.sidebar.button("Simular")
+semente = st.sidebar.number_input("Semente (0 = nova a cada simulação)", min_value=0, value=0, step=1)
+reducoes = st.sidebar.multiselect("Redução de variância", list(REDUCOES))
+tolerancia = st.sidebar.number_input(
+    "Erro padrão alvo (0 = número fixo de caminhos)", min_value=0.0, value=0.0, step=0.0005, format="%.4f",
+    help="Simula em lotes até o maior erro padrão entre os strikes ficar abaixo deste valor.",
+)
+num_simulacoes = st.sidebar.selectbox(
+    "Máximo de caminhos" if tolerancia else "Número de caminhos", [10_000, 100_000, 1_000_000],
+    format_func=lambda n: f"{n:,}".replace(",", "."),
+)
+float32 = st.sidebar.checkbox("Precisão reduzida (float32)", help="Trajetórias e payoffs em float32: metade da memória por simulação.")
+comparar = st.sidebar.checkbox("Comparar com float64 (mesma semente)", disabled=not float32)
+executar = st.sidebar.button("Simular")
 
 # ---------------------------------------------------------------------------
 # Main content
@@ -83,19 +97,38 @@ col1.metric("Retorno médio diário", f"{media_retornos:.4%}")
 col2.metric("Volatilidade diária (std)", f"{std_retornos:.4%}")
 col3.metric("Preço inicial", f"{float(preco_inicial):.4f}")
 
-if simular:
+if executar:
     st.subheader(f"Preços das Calls — {tipo_ativo} — {tempo_desejado} dias")
     with st.spinner("Calculando preços das calls..."):
-        resultados = simular_calls(tempo_desejado, data, limite_inferior, limite_superior)
+        amostragem = Amostragem(**{REDUCOES[r]: True for r in reducoes})
+        resultado, comparacao, df = simular_calls(
+            tempo_desejado, data, limite_inferior, limite_superior, semente or None, num_simulacoes, amostragem,
+            tolerancia or None, np.float32 if float32 else np.float64, float32 and comparar,
+        )
 
-    df = pd.DataFrame(resultados, columns=["Strike", "Preço Justo"])
+    st.caption(f"{resultado.n_caminhos:,} caminhos em {resultado.segundos:.2f} s; "
+               f"maior erro padrão {df['Erro Padrão Call'].max():.4f}".replace(",", "."))
     st.dataframe(df, use_container_width=True)
 
+    if comparacao:
+        diferencas = diferencas_precisao(comparacao)
+        st.subheader("Precisão: float32 × float64")
+        st.table(pd.DataFrame({
+            "Pico de memória (MB)": [comparacao["pico_float64"] / 1e6, comparacao["pico_float32"] / 1e6],
+            "Tempo (s)": [comparacao["float64"].segundos, comparacao["float32"].segundos],
+        }, index=["float64", "float32"]).round(3))
+        st.write(f"Maior diferença de preço — call: {diferencas['call']:.2e}, put: {diferencas['put']:.2e} "
+                 f"(erro padrão de Monte Carlo até {df['Erro Padrão Call'].max():.4f}).")
+
     fig, ax = plt.subplots(figsize=(10, 4))
-    ax.bar(df["Strike"], df["Preço Justo"], width=0.2, color="steelblue", alpha=0.8)
+    ax.bar(df["Strike"] - 0.05, df["Preço Justo"], yerr=1.96 * df["Erro Padrão Call"], width=0.1,
+           color="steelblue", alpha=0.8, label="Call")
+    ax.bar(df["Strike"] + 0.05, df["Put"], yerr=1.96 * df["Erro Padrão Put"], width=0.1,
+           color="indianred", alpha=0.8, label="Put")
     ax.set_xlabel("Strike")
-    ax.set_ylabel("Preço Justo da Call")
-    ax.set_title(f"Curva de Preços de Calls — {tipo_ativo} ({tempo_desejado} dias)")
+    ax.set_ylabel("Preço Justo")
+    ax.legend()
+    ax.set_title(f"Curva de Preços de Calls e Puts — {tipo_ativo} ({tempo_desejado} dias)")
     ax.grid(axis="y")
     ax.grid(False, axis="x")
     st.pyplot(fig)
@@ -0,0 +1,66 @@
+# Cache binário das planilhas Excel incluídas no repositório.
+# Cada planilha é convertida uma única vez para Parquet, já com as colunas
+# derivadas calculadas pela função `transformar` da página. A conversão só é
+# refeita quando o conteúdo (hash) da planilha ou o código de `transformar`
+# muda; nos demais casos a leitura é só um read_parquet.
+
+import hashlib
+import marshal
+import os
+import threading
+from pathlib import Path
+
+import pandas as pd
+
+from historico import DIRETORIO_DADOS
+
+DIRETORIO_PLANILHAS = DIRETORIO_DADOS / "planilhas"
+
+_trava = threading.Lock()
+_hashes: dict[Path, tuple[int, int, str]] = {}
+
+
+def hash_arquivo(caminho: Path) -> str:
+    """SHA-256 do arquivo, recalculado só quando tamanho ou mtime mudam."""
+    estado = caminho.stat()
+    conhecido = _hashes.get(caminho)
+    if conhecido and conhecido[:2] == (estado.st_mtime_ns, estado.st_size):
+        return conhecido[2]
+    digest = hashlib.sha256()
+    with open(caminho, "rb") as arquivo:
+        for bloco in iter(lambda: arquivo.read(1 << 20), b""):
+            digest.update(bloco)
+    _hashes[caminho] = (estado.st_mtime_ns, estado.st_size, digest.hexdigest())
+    return digest.hexdigest()
+
+
+def _assinatura(caminho: Path, transformar, opcoes: dict) -> str:
+    partes = hashlib.sha256(hash_arquivo(caminho).encode())
+    partes.update(repr(sorted(opcoes.items())).encode())
+    if transformar is not None:
+        partes.update(marshal.dumps(transformar.__code__))
+    return partes.hexdigest()[:20]
+
+
+def carregar_planilha(caminho, transformar=None, **opcoes) -> pd.DataFrame:
+    """Lê `caminho` com pd.read_excel(**opcoes) e aplica `transformar`, via cache Parquet."""
+    origem = Path(caminho)
+    nome = f"{origem.stem}.{transformar.__name__ if transformar else 'bruto'}"
+    destino = DIRETORIO_PLANILHAS / f"{nome}.{_assinatura(origem, transformar, opcoes)}.parquet"
+    if destino.exists():
+        return pd.read_parquet(destino)
+    with _trava:
+        if destino.exists():
+            return pd.read_parquet(destino)
+        df = pd.read_excel(origem, **opcoes)
+        if transformar is not None:
+            df = transformar(df)
+        DIRETORIO_PLANILHAS.mkdir(parents=True, exist_ok=True)
+        temporario = destino.with_name(destino.name + ".tmp")
+        df.to_parquet(temporario)
+        os.replace(temporario, destino)
+        # Versões antigas da mesma planilha/transformação não servem mais.
+        for antigo in DIRETORIO_PLANILHAS.glob(f"{nome}.*.parquet"):
+            if antigo != destino:
+                antigo.unlink(missing_ok=True)
+    return df
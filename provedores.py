@@ -0,0 +1,147 @@
+# Provedores de dados de mercado usados pelo armazenamento em historico.py.
+# O provedor ativo é escolhido pela variável de ambiente IMPACTO_PROVEDOR:
+#   yfinance  — download online (padrão)
+#   csv       — exportações do Investing.com incluídas no repositório
+#   sintetico — GBM com semente fixa, para rodar offline e de forma determinística
+# Os dois últimos permitem testes de carga e benchmarks sem latência de rede.
+
+import os
+import zlib
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+DIRETORIO_CSV = Path(__file__).parent
+
+
+class ProvedorDados:
+    """Interface comum: `baixar` devolve um DataFrame OHLCV por ticker."""
+
+    nome = ""
+
+    def baixar(self, tickers: list[str], inicio: date) -> dict[str, pd.DataFrame]:
+        raise NotImplementedError
+
+
+class ProvedorYFinance(ProvedorDados):
+    nome = "yfinance"
+
+    def baixar(self, tickers, inicio):
+        import yfinance as yf
+        if len(tickers) == 1:
+            data = yf.download(tickers[0], start=inicio, multi_level_index=False, auto_adjust=True, progress=False)
+            return {tickers[0]: data} if not data.empty else {}
+        data = yf.download(tickers, start=inicio, group_by="ticker", auto_adjust=True, progress=False)
+        baixados = set(data.columns.get_level_values(0)) if isinstance(data.columns, pd.MultiIndex) else set()
+        return {ticker: data[ticker] for ticker in tickers if ticker in baixados}
+
+
+class ProvedorSintetico(ProvedorDados):
+    """Preços GBM diários em dias úteis a partir de ORIGEM.
+
+    A série de cada ticker depende só da semente e do nome do ticker, então
+    downloads incrementais estendem sempre a mesma trajetória.
+    """
+
+    nome = "sintetico"
+    ORIGEM = date(2000, 1, 3)
+    # preço inicial, drift anual, volatilidade anual
+    PARAMETROS = {
+        "SB=F": (12.0, 0.03, 0.30),
+        "USDBRL=X": (1.8, 0.04, 0.15),
+        "CL=F": (25.0, 0.04, 0.35),
+    }
+    PARAMETROS_PADRAO = (20.0, 0.0, 0.25)
+
+    def __init__(self, semente: int = 42, fim: date | None = None):
+        self.semente = semente
+        self.fim = fim
+
+    def gerar(self, ticker: str) -> pd.DataFrame:
+        s0, mu, sigma = self.PARAMETROS.get(ticker, self.PARAMETROS_PADRAO)
+        datas = pd.bdate_range(self.ORIGEM, self.fim or date.today())
+        n = len(datas)
+        rng = np.random.default_rng([self.semente, zlib.crc32(ticker.encode())])
+        dt = 1 / 252
+        choques = rng.standard_normal((3, n))
+        log_retornos = (mu - 0.5 * sigma ** 2) * dt + sigma * np.sqrt(dt) * choques[0]
+        close = s0 * np.exp(np.cumsum(log_retornos))
+        abertura = np.concatenate([[s0], close[:-1]]) * np.exp(0.2 * sigma * np.sqrt(dt) * choques[1])
+        amplitude = np.exp(0.5 * sigma * np.sqrt(dt) * np.abs(choques[2]))
+        return pd.DataFrame({
+            "Open": abertura,
+            "High": np.maximum(abertura, close) * amplitude,
+            "Low": np.minimum(abertura, close) / amplitude,
+            "Close": close,
+            "Volume": 0.0,
+        }, index=pd.DatetimeIndex(datas, name="Date"))
+
+    def baixar(self, tickers, inicio):
+        return {ticker: self.gerar(ticker).loc[pd.Timestamp(inicio):] for ticker in tickers}
+
+
+def ler_investing(caminho: Path) -> pd.DataFrame:
+    """Lê uma exportação do Investing.com/B3 (decimal com vírgula, datas dd.mm.aaaa ou dd/mm/aaaa)."""
+    with open(caminho, encoding="utf-8-sig") as arquivo:
+        cabecalho = arquivo.readline()
+    sep = ";" if ";" in cabecalho else ","
+    bruto = pd.read_csv(caminho, sep=sep, decimal=",", thousands=".", encoding="utf-8-sig", index_col=False,
+                        dtype={"Data": str, "Data/Hora": str})
+    bruto = bruto.rename(columns={
+        "Data/Hora": "Data", "Último": "Close", "Ult.": "Close", "Abertura": "Open", "Abert.": "Open",
+        "Máxima": "High", "Max": "High", "Mínima": "Low", "Min": "Low", "Vol.": "Volume", "Vol(Q)": "Volume",
+    })
+    formato = "%d/%m/%Y" if "/" in str(bruto["Data"].iloc[0]) else "%d.%m.%Y"
+    datas = pd.to_datetime(bruto["Data"], format=formato)
+    volume = bruto["Volume"]
+    if volume.dtype == object:
+        # "51,98K" / "1,2M": número com vírgula decimal e sufixo multiplicador
+        partes = volume.str.extract(r"^([\d.,]+)([KMB]?)$")
+        numero = pd.to_numeric(partes[0].str.replace(".", "", regex=False).str.replace(",", ".", regex=False))
+        volume = numero * partes[1].map({"": 1, "K": 1e3, "M": 1e6, "B": 1e9})
+    data = bruto[["Open", "High", "Low", "Close"]].astype("float64").set_index(pd.DatetimeIndex(datas, name="Date"))
+    data["Volume"] = volume.to_numpy(dtype="float64")
+    return data.sort_index()
+
+
+class ProvedorCSV(ProvedorDados):
+    """Exportações locais; tickers sem arquivo caem no provedor sintético."""
+
+    nome = "csv"
+    ARQUIVOS = {
+        "SB=F": ["Dados Históricos - Açúcar NY nº11 Futuros (6).csv"],
+        "USDBRL=X": ["USD_BRL Dados Históricos (2).csv"],
+        "SBV24.NYB": ["sbv24.csv", "SBV24.csv"],
+    }
+
+    def __init__(self, diretorio: Path = DIRETORIO_CSV, reserva: ProvedorDados | None = None):
+        self.diretorio = Path(diretorio)
+        self.reserva = reserva or ProvedorSintetico()
+
+    def ler(self, ticker: str) -> pd.DataFrame:
+        data = None
+        for nome in self.ARQUIVOS[ticker]:
+            lido = ler_investing(self.diretorio / nome)
+            data = lido if data is None else data.combine_first(lido)
+        return data
+
+    def baixar(self, tickers, inicio):
+        locais = [t for t in tickers if t in self.ARQUIVOS]
+        resultado = {ticker: self.ler(ticker).loc[pd.Timestamp(inicio):] for ticker in locais}
+        outros = [t for t in tickers if t not in self.ARQUIVOS]
+        if outros:
+            resultado.update(self.reserva.baixar(outros, inicio))
+        return resultado
+
+
+PROVEDORES = {p.nome: p for p in (ProvedorYFinance, ProvedorCSV, ProvedorSintetico)}
+
+
+def obter_provedor(nome: str | None = None) -> ProvedorDados:
+    nome = nome or os.environ.get("IMPACTO_PROVEDOR", "yfinance")
+    try:
+        return PROVEDORES[nome]()
+    except KeyError:
+        raise ValueError(f"Provedor desconhecido: {nome}. Use um de {', '.join(PROVEDORES)}.") from None
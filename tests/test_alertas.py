@@ -0,0 +1,181 @@
+import socketserver
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import alertas
+from alertas import CONDICOES, Aviso, ConfigSMTP, ServicoAlertas
+from indicadores_incrementais import IndicadoresIncrementais
+
+
+class ServidorSMTPLocal(socketserver.ThreadingTCPServer):
+    """SMTP mínimo em 127.0.0.1 que guarda as mensagens recebidas.
+
+    As `recusar` primeiras respostas a DATA são 451 (falha temporária).
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, recusar: int = 0):
+        self.mensagens: list[str] = []
+        self.conexoes = 0
+        self.recusar = recusar
+        super().__init__(("127.0.0.1", 0), _SessaoSMTP)
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def config(self) -> ConfigSMTP:
+        return ConfigSMTP(host="127.0.0.1", porta=self.server_address[1], seguranca="nenhuma")
+
+
+class _SessaoSMTP(socketserver.StreamRequestHandler):
+    def responder(self, linha: str):
+        self.wfile.write((linha + "\r\n").encode())
+
+    def handle(self):
+        self.server.conexoes += 1
+        self.responder("220 local")
+        while linha := self.rfile.readline():
+            comando = linha.decode().strip().upper()
+            if comando.startswith(("EHLO", "HELO")):
+                self.responder("250 local")
+            elif comando == "DATA":
+                if self.server.recusar:
+                    self.server.recusar -= 1
+                    self.responder("451 tente mais tarde")
+                    continue
+                self.responder("354 fim com <CRLF>.<CRLF>")
+                corpo = []
+                while (linha := self.rfile.readline()) not in (b".\r\n", b""):
+                    corpo.append(linha.decode())
+                self.server.mensagens.append("".join(corpo))
+                self.responder("250 ok")
+            elif comando == "QUIT":
+                self.responder("221 tchau")
+                return
+            else:
+                self.responder("250 ok")
+
+
+@pytest.fixture
+def servidor():
+    servidor = ServidorSMTPLocal()
+    yield servidor
+    servidor.shutdown()
+    servidor.server_close()
+
+
+@pytest.fixture
+def criar_servico():
+    criados = []
+
+    def criar(config, **kwargs):
+        kwargs = {"espera_lote": 0.1, "espera_inicial": 0.02, **kwargs}
+        servico = ServicoAlertas(config, **kwargs)
+        criados.append(servico)
+        return servico
+
+    yield criar
+    for servico in criados:
+        servico.parar()
+
+
+def _aviso(email="a@exemplo.com", ticker="SB=F", data="2025-01-02"):
+    return Aviso(email, ticker, data, ("RSI",), tuple((nome, "Normal") for nome in CONDICOES))
+
+
+def test_agrupa_por_destinatario_sem_bloquear(servidor, criar_servico):
+    entregues = []
+    servico = criar_servico(servidor.config, espera_lote=0.3, ao_entregar=entregues.append)
+    inicio = time.perf_counter()
+    for ticker in ("SB=F", "CL=F", "USDBRL=X"):
+        assert servico.enfileirar(_aviso(ticker=ticker))
+    assert servico.enfileirar(_aviso(email="b@exemplo.com"))
+    assert time.perf_counter() - inicio < 0.05
+    assert servico.aguardar(10)
+    assert len(servidor.mensagens) == 2
+    assert len(entregues) == 4
+    assert "Subject: Alerta de Mercado - SB=F, CL=F, USDBRL=X" in servidor.mensagens[0]
+
+
+def test_aviso_repetido_na_fila_e_ignorado(servidor, criar_servico):
+    servico = criar_servico(servidor.config, espera_lote=0.3)
+    assert servico.enfileirar(_aviso())
+    assert not servico.enfileirar(_aviso())
+    assert servico.aguardar(10)
+    assert servico.entregues == 1
+    # Depois da entrega a chave sai da memória; a repetição é barrada pela assinatura.
+    assert servico.enfileirar(_aviso())
+    assert servico.aguardar(10)
+
+
+def test_reusa_a_conexao_entre_lotes(servidor, criar_servico):
+    servico = criar_servico(servidor.config)
+    for data in ("2025-01-02", "2025-01-03", "2025-01-06"):
+        servico.enfileirar(_aviso(data=data))
+        assert servico.aguardar(10)
+    assert len(servidor.mensagens) == 3
+    assert servidor.conexoes == 1
+
+
+def test_tenta_de_novo_apos_falha_temporaria(criar_servico):
+    instavel = ServidorSMTPLocal(recusar=2)
+    try:
+        servico = criar_servico(instavel.config)
+        servico.enfileirar(_aviso())
+        assert servico.aguardar(10)
+        assert len(instavel.mensagens) == 1
+        assert servico.falhas == 0
+    finally:
+        instavel.shutdown()
+        instavel.server_close()
+
+
+def test_desiste_e_libera_o_aviso_sem_servidor(criar_servico):
+    config = ConfigSMTP(host="127.0.0.1", porta=1, seguranca="nenhuma", timeout=1)
+    entregues = []
+    servico = criar_servico(config, tentativas=2, ao_entregar=entregues.append)
+    servico.enfileirar(_aviso())
+    assert servico.aguardar(10)
+    assert servico.falhas == 1
+    assert not entregues
+    assert servico.enfileirar(_aviso())
+
+
+def _incrementais(n: int = 120) -> IndicadoresIncrementais:
+    # Alta constante: RSI em 100 e estocástico no topo no último candle.
+    close = 20 + 0.1 * np.arange(n)
+    historico = pd.DataFrame({"High": close + 0.05, "Low": close - 0.05, "Close": close},
+                             index=pd.bdate_range("2024-01-01", periods=n))
+    incrementais = IndicadoresIncrementais()
+    incrementais.aplicar(historico)
+    return incrementais
+
+
+def test_avaliar_envia_o_estado_real_uma_vez_por_candle(servidor, criar_servico, tmp_path, monkeypatch):
+    servico = criar_servico(servidor.config, ao_entregar=alertas._registrar_entrega)
+    monkeypatch.setattr(alertas, "ARQUIVO_ASSINATURAS", tmp_path / "alertas.json")
+    monkeypatch.setattr(alertas, "servico", lambda: servico)
+    monkeypatch.setattr(alertas, "sincronizar", lambda ticker: _incrementais())
+    alertas.assinar("a@exemplo.com", "SB=F", ["RSI", "CCI"])
+
+    assert alertas.avaliar_assinaturas() == 1
+    assert servico.aguardar(10)
+    assert "RSI: RSI acima de 70" in servidor.mensagens[0]
+    assert alertas.assinaturas("SB=F")[0]["entregue"]
+    # Mesmo candle e mesmas condições: não sai outro e-mail.
+    assert alertas.avaliar_assinaturas() == 0
+
+
+def test_assinatura_invalida_nao_interrompe_as_demais(criar_servico, servidor, tmp_path, monkeypatch):
+    servico = criar_servico(servidor.config)
+    arquivo = tmp_path / "alertas.json"
+    arquivo.write_text('[{"email": "x@exemplo.com", "ticker": "CL=F"}, 3, '
+                       '{"email": "a@exemplo.com", "ticker": "SB=F", "condicoes": ["RSI"]}]')
+    monkeypatch.setattr(alertas, "ARQUIVO_ASSINATURAS", arquivo)
+    monkeypatch.setattr(alertas, "servico", lambda: servico)
+    monkeypatch.setattr(alertas, "sincronizar", lambda ticker: _incrementais())
+    assert alertas.avaliar_assinaturas() == 1
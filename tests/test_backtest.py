@@ -0,0 +1,35 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import backtest
+from backtest import GRADES, avaliar
+
+
+def _historico(n: int) -> pd.DataFrame:
+    close = 20 + np.cumsum(np.random.default_rng(0).normal(0, 0.3, n))
+    return pd.DataFrame({"Open": close, "High": close + 0.5, "Low": close - 0.5, "Close": close, "Volume": 0.0},
+                        index=pd.bdate_range("2024-01-01", periods=n))
+
+
+@pytest.mark.parametrize("sinal", list(GRADES))
+@pytest.mark.parametrize("n", [0, 1, 3])
+def test_historico_curto_nao_tem_entradas(sinal, n):
+    resultado = avaliar(_historico(n), sinal)
+    assert resultado.entradas.sum() == 0
+    assert np.isnan(resultado.acerto).all()
+    assert len(resultado.tabela()) == resultado.entradas.size
+
+
+def test_backtest_com_ticker_sem_dados(monkeypatch):
+    monkeypatch.setattr(backtest, "carregar_historico", lambda *args, **kwargs: _historico(0))
+    resultado = backtest.backtest("SEM=DADOS", "CCI")
+    assert resultado.ticker == "SEM=DADOS"
+    assert resultado.entradas.sum() == 0
+
+
+@pytest.mark.parametrize("sinal", list(GRADES))
+def test_historico_longo_tem_entradas(sinal):
+    resultado = avaliar(_historico(400), sinal)
+    assert resultado.entradas.shape == (len(GRADES[sinal].janelas), len(GRADES[sinal].limiares), len(resultado.dias))
+    assert resultado.entradas.sum() > 0
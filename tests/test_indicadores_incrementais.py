@@ -0,0 +1,32 @@
+import copy
+
+import numpy as np
+import pandas as pd
+
+from indicadores import calcular_indicadores
+from indicadores_incrementais import TOLERANCIA, IndicadoresIncrementais, _diferencas
+
+
+def _historico(n: int = 300) -> pd.DataFrame:
+    close = 20 + np.cumsum(np.random.default_rng(1).normal(0, 0.3, n))
+    return pd.DataFrame({"Open": close, "High": close + 0.4, "Low": close - 0.4, "Close": close, "Volume": 0.0},
+                        index=pd.bdate_range("2023-01-02", periods=n))
+
+
+def test_incremental_igual_ao_lote():
+    historico = _historico()
+    incrementais = IndicadoresIncrementais().aplicar(historico)
+    assert max(_diferencas(incrementais, calcular_indicadores(historico)).values()) <= TOLERANCIA
+
+
+def test_retomar_do_estado_gravado():
+    historico = _historico()
+    continuo = IndicadoresIncrementais()
+    continuo.aplicar(historico)
+    parcial = IndicadoresIncrementais()
+    parcial.aplicar(historico.iloc[:200])
+    retomado = IndicadoresIncrementais.de_estado(copy.deepcopy(parcial.estado()))
+    novos = retomado.aplicar(historico)
+    assert len(novos) == 100
+    assert retomado.ultima_data == continuo.ultima_data
+    np.testing.assert_allclose(list(retomado.valores.values()), list(continuo.valores.values()), rtol=1e-12)
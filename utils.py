@@ -1,11 +1,14 @@
 import os
 
 import streamlit as st
-import yfinance as yf
+
+from aquecimento import iniciar_aquecimento
+from historico import carregar_historico
 
 
 def require_login():
     """Show login form and stop execution if not authenticated."""
+    iniciar_aquecimento()
     if "logged_in" not in st.session_state:
         st.session_state.logged_in = False
     if not st.session_state.logged_in:
@@ -42,9 +45,9 @@ def show_logo(width=500):
 @st.cache_data(ttl=300)
 def get_prices_title():
     try:
-        dolar = yf.Ticker("USDBRL=X").history(period="2d")["Close"].iloc[-1]
-        acucar = yf.Ticker("SB=F").history(period="2d")["Close"].iloc[-1]
-        petroleo = yf.Ticker("CL=F").history(period="2d")["Close"].iloc[-1]
+        dolar = carregar_historico("USDBRL=X")["Close"].iloc[-1]
+        acucar = carregar_historico("SB=F")["Close"].iloc[-1]
+        petroleo = carregar_historico("CL=F")["Close"].iloc[-1]
         return dolar, acucar, petroleo
     except Exception:
         return None, None, None
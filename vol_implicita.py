@@ -0,0 +1,175 @@
+# Volatilidade implícita em lote e superfície de volatilidade (página Black-Scholes).
+# As cotações vêm de um CSV de cadeia de opções com as colunas
+#     vencimento, strike, tipo (call/put), preco[, subjacente]
+# enviado pela página ou salvo em DIRETORIO_COTACOES/<ativo>.csv. Todas as
+# cotações são invertidas de uma vez (Newton com salvaguarda de bisseção) e as
+# volatilidades alimentam uma superfície interpolada em variância total
+# (w = σ²T) por log-moneyness e prazo. A superfície de cada snapshot (conteúdo
+# do arquivo) é construída uma única vez.
+
+import hashlib
+import io
+import threading
+from dataclasses import dataclass
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from black_scholes import gregas
+from historico import DIRETORIO_DADOS
+from planilhas import hash_arquivo
+
+DIRETORIO_COTACOES = DIRETORIO_DADOS / "cotacoes"
+COLUNAS = ["vencimento", "strike", "tipo", "preco"]
+VOL_MINIMA, VOL_MAXIMA = 1e-4, 5.0
+MAX_SUPERFICIES = 8
+
+_trava = threading.Lock()
+_superficies: dict[tuple, "SuperficieVolatilidade"] = {}
+
+
+def volatilidade_implicita(precos, S, K, T, r, tipo='call', tol: float = 1e-10, max_iter: int = 100) -> np.ndarray:
+    """Volatilidades que reproduzem `precos` em Black-Scholes, para arrays com broadcast.
+
+    Newton na volatilidade, mantendo para cada cotação um intervalo [baixo, alto]
+    que contém a raiz (o preço cresce com σ); passos que saem do intervalo ou
+    com vega desprezível viram bisseção. Cotações fora dos limites de
+    não-arbitragem, ou acima do preço com σ = VOL_MAXIMA, resultam em NaN.
+    """
+    precos, S, K, T, r, call = np.broadcast_arrays(
+        *(np.asarray(x, dtype=float) for x in (precos, S, K, T, r)), np.asarray(tipo) == 'call')
+    desconto = K * np.exp(-r * np.maximum(T, 0))
+    inferior = np.where(call, np.maximum(S - desconto, 0), np.maximum(desconto - S, 0))
+    superior = np.where(call, S, desconto)
+    valido = (T > 0) & (precos > inferior) & (precos < superior)
+
+    sigma = np.full(precos.shape, np.nan)
+    ativos = np.flatnonzero(valido)
+    p, s, k, t, taxa, c = (x.ravel()[ativos] for x in (precos, S, K, T, r, call))
+    baixo = np.full(len(ativos), VOL_MINIMA)
+    alto = np.full(len(ativos), VOL_MAXIMA)
+    # Chute inicial de Brenner-Subrahmanyam (exato no dinheiro).
+    x = np.clip(np.sqrt(2 * np.pi / t) * p / s, 0.05, 2.0)
+    convergiu = np.zeros(len(ativos), dtype=bool)
+    for _ in range(max_iter):
+        pendentes = np.flatnonzero(~convergiu)
+        if not len(pendentes):
+            break
+        g = gregas(s[pendentes], k[pendentes], t[pendentes], taxa[pendentes], x[pendentes])
+        diferenca = np.where(c[pendentes], g.call, g.put) - p[pendentes]
+        acima = diferenca > 0
+        alto[pendentes] = np.where(acima, x[pendentes], alto[pendentes])
+        baixo[pendentes] = np.where(acima, baixo[pendentes], x[pendentes])
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            newton = x[pendentes] - diferenca / g.vega
+        dentro = (newton > baixo[pendentes]) & (newton < alto[pendentes]) & (g.vega > 1e-12)
+        novo = np.where(dentro, newton, 0.5 * (baixo[pendentes] + alto[pendentes]))
+        exato = np.abs(diferenca) < tol * np.maximum(p[pendentes], 1.0)
+        convergiu[pendentes] = exato | (np.abs(novo - x[pendentes]) < tol) | (alto[pendentes] - baixo[pendentes] < tol)
+        x[pendentes] = np.where(exato, x[pendentes], novo)
+    # Raiz presa no limite do intervalo: preço fora do alcance de σ ∈ [VOL_MINIMA, VOL_MAXIMA].
+    x[~convergiu | (x >= VOL_MAXIMA * (1 - 1e-6)) | (x <= VOL_MINIMA * (1 + 1e-6))] = np.nan
+    sigma.ravel()[ativos] = x
+    return sigma
+
+
+@dataclass
+class SuperficieVolatilidade:
+    """Volatilidade por strike e prazo a partir das volatilidades implícitas de um snapshot.
+
+    Em cada vencimento a variância total é interpolada linearmente no
+    log-moneyness log(K/F) (constante fora dos strikes cotados); entre
+    vencimentos, linearmente no prazo com o moneyness fixo. Antes do primeiro
+    e depois do último vencimento a volatilidade é a do vencimento mais próximo.
+    """
+
+    S: float
+    r: float
+    prazos: np.ndarray                 # anos, crescentes
+    moneyness: list[np.ndarray]        # log(K/F) cotados em cada prazo, crescentes
+    variancias: list[np.ndarray]       # σ²T correspondentes
+    pontos: pd.DataFrame               # cotações com a volatilidade implícita
+
+    def _variancia_total(self, k, T):
+        por_prazo = np.stack([np.interp(k, x, w) for x, w in zip(self.moneyness, self.variancias)])
+        if len(self.prazos) == 1:
+            return por_prazo[0] * T / self.prazos[0]
+        i = np.clip(np.searchsorted(self.prazos, T) - 1, 0, len(self.prazos) - 2)
+        t0, t1 = self.prazos[i], self.prazos[i + 1]
+        w0 = np.take_along_axis(por_prazo, i[None], 0)[0]
+        w1 = np.take_along_axis(por_prazo, i[None] + 1, 0)[0]
+        peso = (T - t0) / (t1 - t0)
+        w = w0 + peso * (w1 - w0)
+        # Fora do intervalo de vencimentos: volatilidade constante do extremo.
+        w = np.where(T < t0, w0 * T / t0, w)
+        return np.where(T > t1, w1 * T / t1, w)
+
+    def vol(self, K, T) -> np.ndarray:
+        """Volatilidade para strikes `K` e prazos `T` (anos), com broadcast."""
+        K, T = np.broadcast_arrays(np.asarray(K, dtype=float), np.asarray(T, dtype=float))
+        k = np.log(K / (self.S * np.exp(self.r * T))).ravel()
+        return np.sqrt(np.maximum(self._variancia_total(k, T.ravel()), 0) / T.ravel()).reshape(K.shape)
+
+
+def ler_cotacoes(origem) -> pd.DataFrame:
+    """Cotações de um CSV (caminho ou conteúdo em bytes) com as COLUNAS obrigatórias."""
+    df = pd.read_csv(io.BytesIO(origem) if isinstance(origem, (bytes, bytearray)) else origem)
+    df.columns = df.columns.str.strip().str.lower()
+    faltando = [c for c in COLUNAS if c not in df.columns]
+    if faltando:
+        raise ValueError(f"Colunas ausentes na cadeia de opções: {', '.join(faltando)}")
+    df["vencimento"] = pd.to_datetime(df["vencimento"])
+    df["tipo"] = df["tipo"].str.strip().str.lower()
+    return df
+
+
+def construir_superficie(cotacoes: pd.DataFrame, S: float, r: float, hoje: date) -> SuperficieVolatilidade:
+    df = cotacoes.copy()
+    if "subjacente" not in df.columns:
+        df["subjacente"] = S
+    df["prazo"] = (pd.to_datetime(df["vencimento"]) - pd.Timestamp(hoje)).dt.days / 365
+    df = df[df["prazo"] > 0]
+    df["vol"] = volatilidade_implicita(df["preco"], df["subjacente"], df["strike"], df["prazo"], r, df["tipo"])
+    df = df.dropna(subset=["vol"])
+    # Fora do dinheiro é a cotação mais líquida: call acima do forward, put abaixo.
+    forward = df["subjacente"] * np.exp(r * df["prazo"])
+    df["otm"] = np.where(df["tipo"] == "call", df["strike"] >= forward, df["strike"] < forward)
+    df = df.sort_values("otm", ascending=False).drop_duplicates(["vencimento", "strike"])
+    df = df.sort_values(["prazo", "strike"], ignore_index=True)
+    if df.empty:
+        raise ValueError("Nenhuma cotação válida para calcular a volatilidade implícita.")
+    df["moneyness"] = np.log(df["strike"] / (df["subjacente"] * np.exp(r * df["prazo"])))
+    grupos = list(df.groupby("prazo", sort=True))
+    return SuperficieVolatilidade(
+        S=float(S), r=float(r), prazos=np.array([prazo for prazo, _ in grupos]),
+        moneyness=[g["moneyness"].to_numpy() for _, g in grupos],
+        variancias=[(g["vol"] ** 2 * g["prazo"]).to_numpy() for _, g in grupos],
+        pontos=df,
+    )
+
+
+def superficie(origem, S: float, r: float, hoje: date) -> SuperficieVolatilidade:
+    """Superfície do snapshot `origem` (caminho do CSV ou conteúdo em bytes), construída uma vez por conteúdo."""
+    if isinstance(origem, (bytes, bytearray)):
+        assinatura = hashlib.sha256(origem).hexdigest()
+    else:
+        origem = Path(origem)
+        assinatura = hash_arquivo(origem)
+    chave = (assinatura, float(S), float(r), hoje)
+    with _trava:
+        if chave in _superficies:
+            return _superficies[chave]
+    construida = construir_superficie(ler_cotacoes(origem), S, r, hoje)
+    with _trava:
+        _superficies[chave] = construida
+        while len(_superficies) > MAX_SUPERFICIES:
+            del _superficies[next(iter(_superficies))]
+    return construida
+
+
+def snapshot_local(ativo: str) -> Path | None:
+    """CSV de cotações salvo para `ativo`, se existir."""
+    caminho = DIRETORIO_COTACOES / f"{ativo}.csv"
+    return caminho if caminho.exists() else None